@@ -21,7 +21,7 @@ const Notification = ({ message, type }) => {
 };
 
 const ProfileView = () => {
-    const { token } = useContext(GlobalStateContext);
+    const { token, replaceToken } = useContext(GlobalStateContext);
     const [email, setEmail] = useState('');
     const [currentPassword, setCurrentPassword] = useState('');
     const [newPassword, setNewPassword] = useState('');
@@ -67,7 +67,9 @@ const ProfileView = () => {
             });
             const result = await response.json();
             if (!response.ok) throw new Error(result.error);
-            
+            // A password change signs out other sessions, this one included
+            if (result.token) replaceToken(result.token);
+
             setNotification({ message: 'Profile updated successfully!', type: 'success' });
             setCurrentPassword('');
             setNewPassword('');
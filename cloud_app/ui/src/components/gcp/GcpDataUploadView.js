@@ -82,6 +82,23 @@ const GcpDataUploadView = () => {
       });
   };
 
+  // Polls the background ingestion job until it finishes, reporting progress as it goes.
+  const waitForIngestJob = async (jobId) => {
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      const response = await fetch(`/api/billing/jobs/${jobId}`, { headers: { 'x-access-token': token } });
+      const job = await response.json();
+      if (!response.ok) throw new Error(job.error || job.message);
+
+      if (job.status === 'completed') return job;
+      if (job.status === 'failed') throw new Error(job.error || 'Processing failed.');
+
+      if (job.status === 'running') {
+        setUploadStatus({ message: `Processing... ${job.rows_parsed.toLocaleString()} rows parsed (${Math.round(job.rows_per_second).toLocaleString()} rows/s)`, type: 'loading' });
+      }
+    }
+  };
+
   const handleBillingUpload = async () => {
     if (!uploadFile || !isFileValidated) {
       setUploadStatus({ message: 'Please select and validate a file first.', type: 'error' });
@@ -106,10 +123,13 @@ const GcpDataUploadView = () => {
       });
       const result = await response.json();
       if (!response.ok) throw new Error(result.error);
-      
-      setUploadStatus({ message: result.message, type: 'success' });
-      if (result.new_projects && result.new_projects.length > 0) {
-        setNewProjects(result.new_projects);
+
+      setUploadStatus({ message: result.message, type: 'loading' });
+      const job = await waitForIngestJob(result.job_id);
+
+      setUploadStatus({ message: `Uploaded ${job.rows_inserted} rows successfully for ${selectedMonthUpload.charAt(0).toUpperCase() + selectedMonthUpload.slice(1)}, ${selectedYearUpload}.`, type: 'success' });
+      if (job.new_projects && job.new_projects.length > 0) {
+        setNewProjects(job.new_projects);
       }
       
       setUploadFile(null);
@@ -197,6 +197,14 @@ export const GlobalStateProvider = ({ children }) => {
     resetIdleTimer();
   }, [logout, resetIdleTimer]);
   
+  // Swaps in a token issued by the API, e.g. after a password change revoked the old one
+  const replaceToken = useCallback((newToken) => {
+    if (tokenExpiryTimerRef.current) {
+        clearTimeout(tokenExpiryTimerRef.current);
+    }
+    setAuthSession({ token: newToken, role: userRole, accessible_platforms: userPlatforms }, !!localStorage.getItem("authToken"));
+  }, [setAuthSession, userRole, userPlatforms]);
+
   // 🔹 ADDED: This effect runs when the user logs in or out
   useEffect(() => {
     if (isLoggedIn) {
@@ -296,7 +304,7 @@ export const GlobalStateProvider = ({ children }) => {
   };
 
   const value = {
-    token, userRole, isLoggedIn, isAuthLoading, authError, login, logout, userPlatforms,
+    token, userRole, isLoggedIn, isAuthLoading, authError, login, logout, replaceToken, userPlatforms,
     selectedPlatform, setSelectedPlatform, envFilter, setEnvFilter, selectedYear, setSelectedYear,
     yearlyBillingData, previousYearBillingData, isBillingLoading, triggerRefetch,
     isSidebarCollapsed, setIsSidebarCollapsed, theme, setTheme, dashboardProjectFilter, setDashboardProjectFilter,
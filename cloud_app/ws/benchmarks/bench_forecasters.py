@@ -0,0 +1,70 @@
+"""
+Backtests the forecasting engines on synthetic multi-year project histories.
+
+    python benchmarks/bench_forecasters.py --projects 5000 --months 48 --horizon 3
+
+Runs without a database. Each project gets a random level, trend, yearly
+seasonality and noise, and a random history length. The last `horizon`
+months of every history are held out and forecast from the months before;
+accuracy is reported as the weighted absolute percentage error (WAPE) and
+speed as the fit time per project.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.forecasters import FORECASTERS, backtest
+
+
+def make_histories(rng, projects, months):
+    t = np.arange(months)
+    level = rng.uniform(50, 5000, size=(projects, 1))
+    trend = level * rng.normal(0, 0.01, size=(projects, 1))
+    season = level * rng.uniform(0, 0.4, size=(projects, 1)) * np.sin(
+        2 * np.pi * (t + rng.integers(0, 12, size=(projects, 1))) / 12
+    )
+    noise = level * rng.normal(0, 0.05, size=(projects, months))
+    costs = np.maximum(level + trend * t + season + noise, 0)
+
+    lengths = rng.integers(6, months + 1, size=projects)
+    costs[np.arange(months) >= lengths[:, None]] = 0
+    return costs, lengths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--projects', type=int, default=5000)
+    parser.add_argument('--months', type=int, default=48)
+    parser.add_argument('--horizon', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    costs, lengths = make_histories(rng, args.projects, args.months)
+
+    print(f"projects={args.projects} months<={args.months} horizon={args.horizon}")
+    print(f"{'engine':<16}{'fitted':>8}{'WAPE':>9}{'WAPE*':>9}{'total':>10}{'per project':>14}")
+    # WAPE* compares engines on the projects every engine can fit
+    common = set(range(args.projects))
+    results = {}
+    for name, engine in FORECASTERS.items():
+        start = time.perf_counter()
+        rows, mae, wape = backtest(engine, costs, lengths, args.horizon)
+        elapsed = time.perf_counter() - start
+        results[name] = (rows, wape, elapsed)
+        common &= set(rows.tolist())
+
+    for name, (rows, wape, elapsed) in results.items():
+        shared = np.isin(rows, list(common))
+        per_project = elapsed / max(len(rows), 1) * 1e6
+        print(f"{name:<16}{len(rows):>8}{np.nanmean(wape):>9.3f}{np.nanmean(wape[shared]):>9.3f}"
+              f"{elapsed:>9.3f}s{per_project:>11.1f} us")
+
+
+if __name__ == '__main__':
+    main()
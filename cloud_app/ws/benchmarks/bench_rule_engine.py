@@ -0,0 +1,90 @@
+"""
+Benchmarks the compiled and pandas rule engines against the original row-by-rule loop.
+
+    python benchmarks/bench_rule_engine.py --rows 200000 --rules 300
+
+Runs without a database: rules and billing items are generated in memory.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.periods import MONTHS
+from services.rule_engine import compile_rules, apply_rules_reference
+from services.rule_engine_pandas import apply_rules_frame
+
+
+def make_rules(rng, count, projects, services):
+    rules = []
+    for i in range(count):
+        kind = ('RENAME_PROJECT', 'MOVE_SERVICE', 'DISTRIBUTE_COST')[i % 3]
+        if kind == 'RENAME_PROJECT':
+            config = {'source_project_name': rng.choice(projects), 'new_project_name': f"renamed-{i}"}
+        elif kind == 'MOVE_SERVICE':
+            config = {'from_project': rng.choice(projects), 'to_project': rng.choice(projects),
+                      'services': rng.sample(services, 2)}
+        else:
+            config = {'source_project': rng.choice(projects),
+                      'target_project_names': rng.sample(projects, 3)}
+        start = date(2024, rng.randint(1, 12), 1) if rng.random() < 0.5 else None
+        rules.append(SimpleNamespace(rule_type=kind, config=config, start_date=start, end_date=None))
+    return rules
+
+
+def make_items(rng, count, projects, services):
+    return [{
+        'id': i,
+        'project_id': 1,
+        'project_name': rng.choice(projects),
+        'billing_year': rng.choice((2024, 2025)),
+        'billing_month': rng.choice(MONTHS),
+        'platform': 'GCP',
+        'service_description': rng.choice(services),
+        'sku_description': 'sku',
+        'type': None,
+        'cost': round(rng.uniform(0, 50), 2),
+    } for i in range(count)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--rules', type=int, default=300)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    projects = [f"project-{i}" for i in range(args.projects)]
+    services = [f"service-{i}" for i in range(40)]
+    rules = make_rules(rng, args.rules, projects, services)
+    items = make_items(rng, args.rows, projects, services)
+    project_map = {name: i for i, name in enumerate(projects)}
+
+    expected, reference_time = timed(lambda: apply_rules_reference(items, rules, project_map))
+    result, compiled_time = timed(lambda: compile_rules(rules).apply(items, project_map))
+    assert result == expected, "compiled engine diverged from the reference implementation"
+    frame_result, pandas_time = timed(lambda: apply_rules_frame(items, rules, project_map))
+    assert frame_result == expected, "pandas engine diverged from the reference implementation"
+
+    print(f"rows={args.rows} rules={args.rules} output_rows={len(result)}")
+    print(f"reference: {reference_time:8.3f}s")
+    print(f"compiled:  {compiled_time:8.3f}s")
+    print(f"pandas:    {pandas_time:8.3f}s")
+    print(f"speedup:   {reference_time / compiled_time:8.1f}x compiled, {reference_time / pandas_time:.1f}x pandas")
+
+
+if __name__ == '__main__':
+    main()
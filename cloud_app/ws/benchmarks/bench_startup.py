@@ -0,0 +1,65 @@
+"""
+Measures the cold-start time and memory of importing the app, as a gunicorn worker does.
+
+    python benchmarks/bench_startup.py --runs 5
+
+Each measurement runs in a fresh interpreter. For comparison it also imports
+the app together with pandas and scikit-learn, which is what every worker
+used to load at startup before the analytics code was made lazy and NumPy-only.
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+
+WS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = """
+import resource, sys, time
+sys.path.insert(0, {ws_dir!r})
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+heavy = [m for m in ('numpy', 'pandas', 'sklearn', 'pyarrow') if m in sys.modules]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ','.join(heavy))
+"""
+
+SCENARIOS = [
+    ("import ws", "import ws"),
+    ("import ws + pandas + sklearn", "import ws\nimport pandas\nimport sklearn.linear_model"),
+]
+
+
+def measure(imports, runs):
+    env = dict(os.environ, INGEST_WORKERS="0")
+    times, rss = [], []
+    heavy = ""
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(ws_dir=WS_DIR, imports=imports)],
+            capture_output=True, text=True, check=True, env=env, cwd=WS_DIR,
+        ).stdout.split()
+        times.append(float(output[0]))
+        rss.append(int(output[1]) / 1024)
+        heavy = output[2] if len(output) > 2 else ""
+    return statistics.median(times), statistics.median(rss), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<32}{'import time':>12}{'max RSS':>12}  heavy modules loaded")
+    for label, imports in SCENARIOS:
+        if "sklearn" in imports and importlib.util.find_spec("sklearn") is None:
+            print(f"{label:<32}  (scikit-learn not installed)")
+            continue
+        elapsed, rss, heavy = measure(imports, args.runs)
+        print(f"{label:<32}{elapsed:>11.3f}s{rss:>9.1f} MB  {heavy or '-'}")
+
+
+if __name__ == '__main__':
+    main()
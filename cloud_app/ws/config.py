@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -25,3 +26,49 @@ class Config:
         # Fallback to a simple SQLite database if .env is not configured
         SQLALCHEMY_DATABASE_URI = "sqlite:///app.db"
 
+    # Billing CSV ingestion: number of rows parsed and inserted per batch
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 5000))
+
+    # Background ingestion workers. Uploads are stored in INGEST_UPLOAD_DIR and
+    # processed by INGEST_WORKERS threads per app process (0 disables them).
+    INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", os.path.join(os.getcwd(), "uploads"))
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+    INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", 5))
+    # A running job that hasn't reported progress for this long is requeued;
+    # workers touch their job every INGEST_JOB_HEARTBEAT_SECONDS while it runs
+    INGEST_JOB_STALE_SECONDS = int(os.getenv("INGEST_JOB_STALE_SECONDS", 900))
+    INGEST_JOB_HEARTBEAT_SECONDS = float(os.getenv("INGEST_JOB_HEARTBEAT_SECONDS", 60))
+    # Scan the uploaded month for cost anomalies once a job has been ingested
+    ANOMALY_SCAN_AFTER_INGEST = os.getenv("ANOMALY_SCAN_AFTER_INGEST", "true").lower() == "true"
+    # Levels scanned: "project" totals, "service" and "sku" series per project
+    ANOMALY_SCAN_GRANULARITIES = [
+        g.strip() for g in os.getenv("ANOMALY_SCAN_GRANULARITIES", "project,service").split(",") if g.strip()
+    ]
+
+    # Seconds an authenticated user's role, platforms and assigned projects
+    # are cached per process (0 disables the cache)
+    PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+    # Stateless tokens carry the role, platforms and assigned projects, so
+    # requests are authorized without a query. Revoked tokens are rejected
+    # by other processes within TOKEN_VERSIONS_REFRESH seconds.
+    AUTH_STATELESS_TOKENS = os.getenv("AUTH_STATELESS_TOKENS", "false").lower() == "true"
+    TOKEN_VERSIONS_REFRESH = int(os.getenv("TOKEN_VERSIONS_REFRESH", 30))
+
+    # Password hashing: method and cost in werkzeug's format, how many hashes
+    # may run at once across all app processes on the host (0 for no limit),
+    # the directory holding the lock files that count them, and how long a
+    # request waits for a free slot before a 503
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_LOCK_DIR = os.getenv(
+        "PASSWORD_HASH_LOCK_DIR", os.path.join(tempfile.gettempdir(), "cloud-billing-password-slots")
+    )
+    PASSWORD_HASH_WAIT_SECONDS = float(os.getenv("PASSWORD_HASH_WAIT_SECONDS", 2))
+
+    # Business rule execution: "compiled" (dict lookups) or "pandas" (columnar)
+    RULE_ENGINE = os.getenv("RULE_ENGINE", "compiled")
+
+    # Forecast cache: entries kept in each process, and whether forecasts are
+    # also stored in the database so all app processes share them
+    FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", 1024))
+    FORECAST_CACHE_SHARED = os.getenv("FORECAST_CACHE_SHARED", "true").lower() == "true"
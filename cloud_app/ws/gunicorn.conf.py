@@ -0,0 +1,11 @@
+# Loaded automatically by gunicorn when started from this directory:
+#   gunicorn ws:app
+
+
+def post_worker_init(worker):
+    # Each worker process runs its own background ingest workers (see
+    # services/job_service.py); importing the app doesn't start them.
+    from ws import app
+    from services.job_service import start_ingest_workers
+
+    start_ingest_workers(app)
@@ -0,0 +1,42 @@
+"""Add granularity, service and sku to anomalies
+
+Revision ID: 03ed8b688e5d
+Revises: e9e0d333c5c8
+Create Date: 2026-10-17 14:21:40.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '03ed8b688e5d'
+down_revision = 'e9e0d333c5c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('granularity', sa.String(length=20), nullable=False, server_default='project'))
+        batch_op.add_column(sa.Column('service_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sku_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_anomalies_service_id', 'services', ['service_id'], ['id'])
+        batch_op.create_foreign_key('fk_anomalies_sku_id', 'skus', ['sku_id'], ['id'])
+        batch_op.create_index('ix_anomalies_platform_period_granularity', ['platform', 'period', 'granularity'], unique=False)
+
+    with op.batch_alter_table('anomaly_scan_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('series_scanned', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('anomaly_scan_runs', schema=None) as batch_op:
+        batch_op.drop_column('series_scanned')
+
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.drop_index('ix_anomalies_platform_period_granularity')
+        batch_op.drop_constraint('fk_anomalies_sku_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_anomalies_service_id', type_='foreignkey')
+        batch_op.drop_column('sku_id')
+        batch_op.drop_column('service_id')
+        batch_op.drop_column('granularity')
@@ -0,0 +1,53 @@
+"""Add materialized rule-applied billing tables
+
+Revision ID: 2fb584450644
+Revises: d8bbf1d7eff5
+Create Date: 2026-10-17 08:26:13.590412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2fb584450644'
+down_revision = 'd8bbf1d7eff5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Both tables start empty; each (platform, year) slice is built on first read.
+    op.create_table('billing_rule_applied',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('billing_id', sa.Integer(), nullable=False),
+    sa.Column('is_distributed', sa.Boolean(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('project_name', sa.String(length=100), nullable=True),
+    sa.Column('billing_year', sa.Integer(), nullable=False),
+    sa.Column('billing_month', sa.String(length=10), nullable=False),
+    sa.Column('period', sa.Integer(), nullable=False),
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('service_description', sa.String(length=255), nullable=True),
+    sa.Column('sku_description', sa.String(length=255), nullable=True),
+    sa.Column('type', sa.String(length=50), nullable=True),
+    sa.Column('cost', sa.Float(precision=53), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.create_index('ix_billing_rule_applied_platform_period', ['platform', 'period'], unique=False)
+
+    op.create_table('billing_view_state',
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('billing_year', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('platform', 'billing_year')
+    )
+
+
+def downgrade():
+    op.drop_table('billing_view_state')
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.drop_index('ix_billing_rule_applied_platform_period')
+
+    op.drop_table('billing_rule_applied')
@@ -0,0 +1,26 @@
+"""Add token_version to users
+
+Revision ID: 377014da24dd
+Revises: 03ed8b688e5d
+Create Date: 2026-10-17 15:06:12.530981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '377014da24dd'
+down_revision = '03ed8b688e5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,26 @@
+"""Add attempts to ingest_jobs
+
+Revision ID: 5c1e7a93b2d4
+Revises: 377014da24dd
+Create Date: 2026-10-17 18:42:09.114372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a93b2d4'
+down_revision = '377014da24dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.drop_column('attempts')
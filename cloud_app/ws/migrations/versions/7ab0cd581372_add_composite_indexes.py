@@ -0,0 +1,39 @@
+"""Add composite indexes for billing, anomaly and budget lookups
+
+Revision ID: 7ab0cd581372
+Revises: c97297cf4839
+Create Date: 2026-10-16 11:20:05.637410
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7ab0cd581372'
+down_revision = 'c97297cf4839'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.create_index('ix_billing_data_year_month_platform', ['billing_year', 'billing_month', 'platform'], unique=False)
+        batch_op.create_index('ix_billing_data_project_year_month', ['project_id', 'billing_year', 'billing_month'], unique=False)
+
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.create_index('ix_anomalies_project_year_month', ['project_id', 'billing_year', 'billing_month'], unique=False)
+
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.create_index('ix_budgets_project_year_month', ['project_id', 'year', 'month'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.drop_index('ix_budgets_project_year_month')
+
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.drop_index('ix_anomalies_project_year_month')
+
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.drop_index('ix_billing_data_project_year_month')
+        batch_op.drop_index('ix_billing_data_year_month_platform')
@@ -0,0 +1,37 @@
+"""Add data_versions and forecast_cache tables
+
+Revision ID: 936577445cde
+Revises: ea2b9daa55ac
+Create Date: 2026-10-17 09:14:52.361078
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '936577445cde'
+down_revision = 'ea2b9daa55ac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('forecast_cache',
+    sa.Column('cache_key', sa.String(length=100), nullable=False),
+    sa.Column('data_version', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+
+
+def downgrade():
+    op.drop_table('forecast_cache')
+    op.drop_table('data_versions')
@@ -0,0 +1,124 @@
+"""Add numeric YYYYMM period columns
+
+Revision ID: 9901fd630995
+Revises: 7ab0cd581372
+Create Date: 2026-10-16 13:41:22.184930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9901fd630995'
+down_revision = '7ab0cd581372'
+branch_labels = None
+depends_on = None
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def _table(table_name, year_column, month_column):
+    return sa.table(table_name,
+        sa.column(year_column, sa.Integer),
+        sa.column(month_column, sa.String),
+        sa.column('period', sa.Integer),
+    )
+
+
+def _normalized_month(column):
+    # Older uploads stored months as typed ("Jan", " march", "SEP")
+    return sa.func.lower(sa.func.substr(sa.func.trim(column), 1, 3))
+
+
+def _check_months(table_name, year_column, month_column):
+    """
+    Stops the upgrade, before anything is changed, if some rows have no
+    year or a month that isn't a month name, as their period would be NULL.
+    """
+    table = _table(table_name, year_column, month_column)
+    rows = op.get_bind().execute(
+        sa.select(table.c[year_column], table.c[month_column], sa.func.count())
+            .where(sa.or_(table.c[year_column].is_(None),
+                          sa.func.coalesce(_normalized_month(table.c[month_column]), '').notin_(MONTHS)))
+            .group_by(table.c[year_column], table.c[month_column])
+    ).fetchall()
+    if rows:
+        found = ", ".join(f"{year!r}/{month!r} ({count} rows)" for year, month, count in rows)
+        raise RuntimeError(
+            f"Can't derive a period for some rows of {table_name}: {found}. Fix their "
+            f"{year_column}/{month_column} (a year and a month name such as 'jan') and run the upgrade again."
+        )
+
+
+def _backfill_period(table_name, year_column, month_column):
+    table = _table(table_name, year_column, month_column)
+    # Store months the way the app writes them before deriving the period
+    normalized = _normalized_month(table.c[month_column])
+    op.execute(table.update().where(normalized.in_(MONTHS)).values({month_column: normalized}))
+
+    month_number = sa.case(
+        {name: number for number, name in enumerate(MONTHS, start=1)},
+        value=table.c[month_column],
+    )
+    op.execute(table.update().values(period=table.c[year_column] * 100 + month_number))
+
+
+def upgrade():
+    # period becomes NOT NULL in every table
+    _check_months('billing_data', 'billing_year', 'billing_month')
+    _check_months('billing_staging', 'billing_year', 'billing_month')
+    _check_months('budgets', 'year', 'month')
+    _check_months('anomalies', 'billing_year', 'billing_month')
+
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+
+    _backfill_period('billing_data', 'billing_year', 'billing_month')
+    _backfill_period('billing_staging', 'billing_year', 'billing_month')
+    _backfill_period('budgets', 'year', 'month')
+    _backfill_period('anomalies', 'billing_year', 'billing_month')
+
+    # The period indexes replace the year/month ones, which no query uses any more
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.alter_column('period', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_billing_data_platform_period', ['platform', 'period'], unique=False)
+        batch_op.create_index('ix_billing_data_project_period', ['project_id', 'period'], unique=False)
+        batch_op.drop_index('ix_billing_data_year_month_platform')
+        batch_op.drop_index('ix_billing_data_project_year_month')
+
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.alter_column('period', existing_type=sa.Integer(), nullable=False)
+
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.alter_column('period', existing_type=sa.Integer(), nullable=False)
+
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.alter_column('period', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('anomalies', schema=None) as batch_op:
+        batch_op.drop_column('period')
+
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.drop_column('period')
+
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.drop_column('period')
+
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.create_index('ix_billing_data_project_year_month', ['project_id', 'billing_year', 'billing_month'], unique=False)
+        batch_op.create_index('ix_billing_data_year_month_platform', ['billing_year', 'billing_month', 'platform'], unique=False)
+        batch_op.drop_index('ix_billing_data_project_period')
+        batch_op.drop_index('ix_billing_data_platform_period')
+        batch_op.drop_column('period')
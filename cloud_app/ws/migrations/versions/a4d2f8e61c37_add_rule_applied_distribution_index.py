@@ -0,0 +1,33 @@
+"""Add distribution_index to billing_rule_applied
+
+Revision ID: a4d2f8e61c37
+Revises: 5c1e7a93b2d4
+Create Date: 2026-10-17 19:27:51.306418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d2f8e61c37'
+down_revision = '5c1e7a93b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows have no distribution index; drop the view so every slice
+    # is rebuilt with one on its next read
+    op.execute("DELETE FROM billing_rule_applied")
+    op.execute("DELETE FROM billing_view_state")
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('distribution_index', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_billing_rule_applied_period_billing',
+                              ['period', 'billing_id', 'distribution_index'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.drop_index('ix_billing_rule_applied_period_billing')
+        batch_op.drop_column('distribution_index')
@@ -0,0 +1,41 @@
+"""Add billing_staging table
+
+Revision ID: b07af0d2b6f4
+Revises: de37e0323153
+Create Date: 2026-10-16 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b07af0d2b6f4'
+down_revision = 'de37e0323153'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('billing_staging',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('load_id', sa.String(length=36), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('billing_year', sa.Integer(), nullable=False),
+    sa.Column('billing_month', sa.String(length=10), nullable=False),
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('service_description', sa.String(length=255), nullable=True),
+    sa.Column('sku_description', sa.String(length=255), nullable=True),
+    sa.Column('type', sa.String(length=50), nullable=True),
+    sa.Column('cost', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_billing_staging_load_id'), ['load_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_billing_staging_load_id'))
+
+    op.drop_table('billing_staging')
@@ -0,0 +1,26 @@
+"""Add warnings to ingest_jobs
+
+Revision ID: b3f91c0d7e25
+Revises: a4d2f8e61c37
+Create Date: 2026-10-17 21:05:33.402817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f91c0d7e25'
+down_revision = 'a4d2f8e61c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('warnings', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.drop_column('warnings')
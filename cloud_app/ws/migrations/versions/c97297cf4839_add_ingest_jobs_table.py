@@ -0,0 +1,47 @@
+"""Add ingest_jobs table
+
+Revision ID: c97297cf4839
+Revises: b07af0d2b6f4
+Create Date: 2026-10-16 10:03:47.918264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c97297cf4839'
+down_revision = 'b07af0d2b6f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ingest_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('billing_year', sa.Integer(), nullable=False),
+    sa.Column('billing_month', sa.String(length=10), nullable=False),
+    sa.Column('file_path', sa.String(length=512), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('rows_parsed', sa.Integer(), nullable=False),
+    sa.Column('rows_inserted', sa.Integer(), nullable=False),
+    sa.Column('new_projects', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ingest_jobs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ingest_jobs_status'))
+
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,45 @@
+"""Queue rule-applied view refreshes in ingest_jobs
+
+Revision ID: d81c6f2a4b90
+Revises: b3f91c0d7e25
+Create Date: 2026-10-17 23:14:52.630518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81c6f2a4b90'
+down_revision = 'b3f91c0d7e25'
+branch_labels = None
+depends_on = None
+
+# Columns only upload jobs fill in: (name, type)
+UPLOAD_COLUMNS = [
+    ('platform', sa.String(length=50)),
+    ('billing_year', sa.Integer()),
+    ('billing_month', sa.String(length=10)),
+    ('file_path', sa.String(length=512)),
+]
+
+
+def upgrade():
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=20), nullable=False, server_default='ingest'))
+        batch_op.add_column(sa.Column('first_period', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_period', sa.Integer(), nullable=True))
+        for name, type_ in UPLOAD_COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, nullable=True)
+
+
+def downgrade():
+    jobs = sa.table('ingest_jobs', sa.column('kind'))
+    op.execute(jobs.delete().where(jobs.c.kind != 'ingest'))
+
+    with op.batch_alter_table('ingest_jobs', schema=None) as batch_op:
+        for name, type_ in UPLOAD_COLUMNS:
+            batch_op.alter_column(name, existing_type=type_, nullable=False)
+        batch_op.drop_column('last_period')
+        batch_op.drop_column('first_period')
+        batch_op.drop_column('kind')
@@ -0,0 +1,64 @@
+"""Add billing_monthly_rollup table
+
+Revision ID: d8bbf1d7eff5
+Revises: 9901fd630995
+Create Date: 2026-10-16 15:02:58.770341
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8bbf1d7eff5'
+down_revision = '9901fd630995'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table('billing_monthly_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('period', sa.Integer(), nullable=False),
+    sa.Column('billing_year', sa.Integer(), nullable=False),
+    sa.Column('billing_month', sa.String(length=10), nullable=False),
+    sa.Column('service_description', sa.String(length=255), nullable=True),
+    sa.Column('total_cost', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('line_items', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('billing_monthly_rollup', schema=None) as batch_op:
+        batch_op.create_index('ix_billing_monthly_rollup_platform_period', ['platform', 'period'], unique=False)
+        batch_op.create_index('ix_billing_monthly_rollup_project_period', ['project_id', 'period'], unique=False)
+
+    # Build the rollup for everything uploaded so far
+    billing = sa.table('billing_data',
+        sa.column('project_id', sa.Integer),
+        sa.column('platform', sa.String),
+        sa.column('period', sa.Integer),
+        sa.column('billing_year', sa.Integer),
+        sa.column('billing_month', sa.String),
+        sa.column('service_description', sa.String),
+        sa.column('cost', sa.Numeric),
+    )
+    group_columns = [
+        billing.c.project_id, billing.c.platform, billing.c.period,
+        billing.c.billing_year, billing.c.billing_month, billing.c.service_description,
+    ]
+    op.execute(rollup.insert().from_select(
+        ['project_id', 'platform', 'period', 'billing_year', 'billing_month',
+         'service_description', 'total_cost', 'line_items'],
+        sa.select(*group_columns, sa.func.coalesce(sa.func.sum(billing.c.cost), 0), sa.func.count())
+            .group_by(*group_columns),
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('billing_monthly_rollup', schema=None) as batch_op:
+        batch_op.drop_index('ix_billing_monthly_rollup_project_period')
+        batch_op.drop_index('ix_billing_monthly_rollup_platform_period')
+
+    op.drop_table('billing_monthly_rollup')
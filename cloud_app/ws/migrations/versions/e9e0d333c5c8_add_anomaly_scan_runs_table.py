@@ -0,0 +1,45 @@
+"""Add anomaly_scan_runs table
+
+Revision ID: e9e0d333c5c8
+Revises: 936577445cde
+Create Date: 2026-10-17 11:02:18.664203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9e0d333c5c8'
+down_revision = '936577445cde'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('anomaly_scan_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.String(length=36), nullable=True),
+    sa.Column('platform', sa.String(length=50), nullable=False),
+    sa.Column('billing_year', sa.Integer(), nullable=False),
+    sa.Column('billing_month', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('projects_scanned', sa.Integer(), nullable=False),
+    sa.Column('anomalies_found', sa.Integer(), nullable=False),
+    sa.Column('anomalies_created', sa.Integer(), nullable=False),
+    sa.Column('duration_seconds', sa.Float(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['ingest_jobs.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('anomaly_scan_runs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_anomaly_scan_runs_job_id'), ['job_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('anomaly_scan_runs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_anomaly_scan_runs_job_id'))
+
+    op.drop_table('anomaly_scan_runs')
@@ -0,0 +1,172 @@
+"""Move service and SKU descriptions into services and skus dimension tables
+
+Revision ID: ea2b9daa55ac
+Revises: f6edce09cb00
+Create Date: 2026-10-16 17:10:33.905112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'ea2b9daa55ac'
+down_revision = 'f6edce09cb00'
+branch_labels = None
+depends_on = None
+
+# (dimension table, id column, description column)
+DIMENSIONS = [
+    ('services', 'service_id', 'service_description'),
+    ('skus', 'sku_id', 'sku_description'),
+]
+
+ROLLUP_GROUP_COLUMNS = ['project_id', 'platform', 'period', 'billing_year', 'billing_month']
+
+# Dimension names are matched exactly on MySQL too, instead of by the default
+# case- and accent-insensitive collation
+NAME_COLLATION = 'utf8mb4_0900_bin'
+NAME_TYPE = sa.String(length=255).with_variant(mysql.VARCHAR(length=255, collation=NAME_COLLATION), 'mysql')
+
+
+def _table(name, *columns):
+    return sa.table(name, *[sa.column(column) for column in columns])
+
+
+def _exact(column):
+    """Compares a description column under the dimension tables' collation."""
+    if op.get_bind().dialect.name == 'mysql':
+        return sa.collate(column, NAME_COLLATION)
+    return column
+
+
+def _fill_dimension(dimension, description_column, source_tables):
+    """Inserts every distinct description found in the source tables."""
+    names = sa.union(*[
+        sa.select(_exact(sa.column(description_column)).label('name'))
+            .select_from(sa.table(source))
+            .where(sa.column(description_column).isnot(None))
+        for source in source_tables
+    ]).subquery()
+    op.execute(_table(dimension, 'name').insert().from_select(['name'], sa.select(names.c.name)))
+
+
+def _ids_from_descriptions(table_name):
+    table = _table(table_name, 'service_id', 'sku_id', 'service_description', 'sku_description')
+    values = {}
+    for dimension, id_column, description_column in DIMENSIONS:
+        dim = _table(dimension, 'id', 'name')
+        values[id_column] = sa.select(dim.c.id)\
+            .where(dim.c.name == _exact(table.c[description_column])).scalar_subquery()
+    op.execute(table.update().values(**values))
+
+
+def _descriptions_from_ids(table_name):
+    table = _table(table_name, 'service_id', 'sku_id', 'service_description', 'sku_description')
+    values = {}
+    for dimension, id_column, description_column in DIMENSIONS:
+        dim = _table(dimension, 'id', 'name')
+        values[description_column] = sa.select(dim.c.name)\
+            .where(dim.c.id == table.c[id_column]).scalar_subquery()
+    op.execute(table.update().values(**values))
+
+
+def _rebuild_rollup(service_column):
+    billing = _table('billing_data', *ROLLUP_GROUP_COLUMNS, service_column, 'cost')
+    rollup = _table('billing_monthly_rollup', *ROLLUP_GROUP_COLUMNS, service_column, 'total_cost', 'line_items')
+    group_columns = [billing.c[name] for name in ROLLUP_GROUP_COLUMNS + [service_column]]
+    op.execute(rollup.delete())
+    op.execute(rollup.insert().from_select(
+        ROLLUP_GROUP_COLUMNS + [service_column, 'total_cost', 'line_items'],
+        sa.select(*group_columns, sa.func.coalesce(sa.func.sum(billing.c.cost), 0), sa.func.count())
+            .group_by(*group_columns),
+    ))
+
+
+def _clear_rule_applied_view():
+    # The view is rebuilt lazily on the next read
+    op.execute(_table('billing_rule_applied').delete())
+    op.execute(_table('billing_view_state').delete())
+
+
+def upgrade():
+    op.create_table('services',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', NAME_TYPE, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('skus',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', NAME_TYPE, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+    for dimension, _, description_column in DIMENSIONS:
+        _fill_dimension(dimension, description_column, ['billing_data', 'billing_staging'])
+
+    for table_name in ('billing_data', 'billing_staging'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('service_id', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('sku_id', sa.Integer(), nullable=True))
+        _ids_from_descriptions(table_name)
+
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.create_foreign_key('fk_billing_data_service_id', 'services', ['service_id'], ['id'])
+        batch_op.create_foreign_key('fk_billing_data_sku_id', 'skus', ['sku_id'], ['id'])
+        batch_op.drop_column('sku_description')
+        batch_op.drop_column('service_description')
+
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.drop_column('sku_description')
+        batch_op.drop_column('service_description')
+
+    with op.batch_alter_table('billing_monthly_rollup', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('service_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_billing_monthly_rollup_service_id', 'services', ['service_id'], ['id'])
+        batch_op.drop_column('service_description')
+    _rebuild_rollup('service_id')
+
+    _clear_rule_applied_view()
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('service_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sku_id', sa.Integer(), nullable=True))
+        batch_op.drop_column('sku_description')
+        batch_op.drop_column('service_description')
+
+
+def downgrade():
+    _clear_rule_applied_view()
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('service_description', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('sku_description', sa.String(length=255), nullable=True))
+        batch_op.drop_column('sku_id')
+        batch_op.drop_column('service_id')
+
+    with op.batch_alter_table('billing_monthly_rollup', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('service_description', sa.String(length=255), nullable=True))
+        batch_op.drop_constraint('fk_billing_monthly_rollup_service_id', type_='foreignkey')
+        batch_op.drop_column('service_id')
+
+    for table_name in ('billing_data', 'billing_staging'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('service_description', sa.String(length=255), nullable=True))
+            batch_op.add_column(sa.Column('sku_description', sa.String(length=255), nullable=True))
+        _descriptions_from_ids(table_name)
+
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_billing_data_sku_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_billing_data_service_id', type_='foreignkey')
+        batch_op.drop_column('sku_id')
+        batch_op.drop_column('service_id')
+
+    with op.batch_alter_table('billing_staging', schema=None) as batch_op:
+        batch_op.drop_column('sku_id')
+        batch_op.drop_column('service_id')
+
+    _rebuild_rollup('service_description')
+
+    op.drop_table('skus')
+    op.drop_table('services')
@@ -0,0 +1,25 @@
+"""Index billing_rule_applied by project name and period
+
+Revision ID: f6edce09cb00
+Revises: 2fb584450644
+Create Date: 2026-10-16 16:02:47.513204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6edce09cb00'
+down_revision = '2fb584450644'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.create_index('ix_billing_rule_applied_project_period', ['project_name', 'period'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('billing_rule_applied', schema=None) as batch_op:
+        batch_op.drop_index('ix_billing_rule_applied_project_period')
@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects import mysql
 import datetime
 
 db = SQLAlchemy()
@@ -19,17 +19,14 @@ class User(db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='user')
     accessible_platforms = db.Column(db.JSON, nullable=True)
+    # Bumped whenever the user's access changes; tokens carrying an older
+    # version are rejected
+    token_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relationship to assigned projects
     assigned_projects = db.relationship('Project', secondary=user_project_assignments, lazy='subquery',
         backref=db.backref('assigned_users', lazy=True))
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
 class Project(db.Model):
     __tablename__ = 'projects'
     id = db.Column(db.Integer, primary_key=True)
@@ -46,24 +43,181 @@ class Project(db.Model):
     budgets = db.relationship('Budget', backref='project', lazy=True, cascade="all, delete-orphan")
 
 
+# Dimension names are matched exactly, so descriptions differing only in case,
+# accents or trailing spaces get their own rows on MySQL too
+DIMENSION_NAME_COLLATION = 'utf8mb4_0900_bin'
+DimensionName = db.String(255).with_variant(mysql.VARCHAR(255, collation=DIMENSION_NAME_COLLATION), 'mysql')
+
+class Service(db.Model):
+    """Dimension table of billing service descriptions, referenced by id from billing rows."""
+    __tablename__ = 'services'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(DimensionName, unique=True, nullable=False)
+
+class Sku(db.Model):
+    """Dimension table of billing SKU descriptions, referenced by id from billing rows."""
+    __tablename__ = 'skus'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(DimensionName, unique=True, nullable=False)
+
 class Billing(db.Model):
     __tablename__ = 'billing_data'
+    __table_args__ = (
+        db.Index('ix_billing_data_platform_period', 'platform', 'period'),
+        db.Index('ix_billing_data_project_period', 'project_id', 'period'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
     billing_year = db.Column(db.Integer, nullable=False)
     billing_month = db.Column(db.String(10), nullable=False)
+    # Year and month as a sortable YYYYMM integer, see services/periods.py
+    period = db.Column(db.Integer, nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=True)
+    sku_id = db.Column(db.Integer, db.ForeignKey('skus.id'), nullable=True)
+    type = db.Column(db.String(50))
+    cost = db.Column(db.Numeric(10, 2))
+
+class BillingStaging(db.Model):
+    """Rows of an in-progress upload, swapped into billing_data once fully parsed."""
+    __tablename__ = 'billing_staging'
+    id = db.Column(db.Integer, primary_key=True)
+    load_id = db.Column(db.String(36), nullable=False, index=True)
+    project_id = db.Column(db.Integer, nullable=False)
+    billing_year = db.Column(db.Integer, nullable=False)
+    billing_month = db.Column(db.String(10), nullable=False)
+    period = db.Column(db.Integer, nullable=False)
     platform = db.Column(db.String(50), nullable=False)
-    service_description = db.Column(db.String(255))
-    sku_description = db.Column(db.String(255))
+    service_id = db.Column(db.Integer, nullable=True)
+    sku_id = db.Column(db.Integer, nullable=True)
     type = db.Column(db.String(50))
     cost = db.Column(db.Numeric(10, 2))
 
+class BillingMonthlyRollup(db.Model):
+    """Monthly cost per project and service, refreshed whenever a month is uploaded."""
+    __tablename__ = 'billing_monthly_rollup'
+    __table_args__ = (
+        db.Index('ix_billing_monthly_rollup_platform_period', 'platform', 'period'),
+        db.Index('ix_billing_monthly_rollup_project_period', 'project_id', 'period'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    period = db.Column(db.Integer, nullable=False)
+    billing_year = db.Column(db.Integer, nullable=False)
+    billing_month = db.Column(db.String(10), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=True)
+    total_cost = db.Column(db.Numeric(14, 2), nullable=False)
+    line_items = db.Column(db.Integer, nullable=False)
+
+class BillingRuleApplied(db.Model):
+    """Billing line items with business rules applied, materialized per platform and year."""
+    __tablename__ = 'billing_rule_applied'
+    __table_args__ = (
+        db.Index('ix_billing_rule_applied_platform_period', 'platform', 'period'),
+        db.Index('ix_billing_rule_applied_project_period', 'project_name', 'period'),
+        db.Index('ix_billing_rule_applied_period_billing', 'period', 'billing_id', 'distribution_index'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # Source billing_data row; distributed rows share their source's id
+    billing_id = db.Column(db.Integer, nullable=False)
+    is_distributed = db.Column(db.Boolean, nullable=False, default=False)
+    # Position among the rows made from the same source row (0 unless distributed)
+    distribution_index = db.Column(db.Integer, nullable=False, default=0)
+    project_id = db.Column(db.Integer, nullable=True)
+    project_name = db.Column(db.String(100), nullable=True)
+    billing_year = db.Column(db.Integer, nullable=False)
+    billing_month = db.Column(db.String(10), nullable=False)
+    period = db.Column(db.Integer, nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    service_id = db.Column(db.Integer, nullable=True)
+    sku_id = db.Column(db.Integer, nullable=True)
+    type = db.Column(db.String(50))
+    cost = db.Column(db.Float(precision=53))
+
+class BillingViewState(db.Model):
+    """Marks which (platform, year) slices of billing_rule_applied have been built."""
+    __tablename__ = 'billing_view_state'
+    platform = db.Column(db.String(50), primary_key=True)
+    billing_year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+class IngestJob(db.Model):
+    """
+    A queued background job, processed by the ingest worker pool: a billing
+    CSV upload ('ingest'), or a recompute of the rule-applied view after a
+    business rule changed ('view_refresh').
+    """
+    __tablename__ = 'ingest_jobs'
+    id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='ingest', server_default='ingest')
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    # Upload jobs only
+    platform = db.Column(db.String(50), nullable=True)
+    billing_year = db.Column(db.Integer, nullable=True)
+    billing_month = db.Column(db.String(10), nullable=True)
+    file_path = db.Column(db.String(512), nullable=True)
+    # View refresh jobs only: the period range to recompute (None: open-ended)
+    first_period = db.Column(db.Integer, nullable=True)
+    last_period = db.Column(db.Integer, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    rows_parsed = db.Column(db.Integer, nullable=False, default=0)
+    rows_inserted = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped by every claim; a worker only writes to the job while it's the current one
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    new_projects = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    # Problems that didn't stop the upload, e.g. a failed view refresh
+    warnings = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class AnomalyScanRun(db.Model):
+    """One anomaly scan of a month and platform, run after an upload is ingested."""
+    __tablename__ = 'anomaly_scan_runs'
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(36), db.ForeignKey('ingest_jobs.id'), nullable=True, index=True)
+    platform = db.Column(db.String(50), nullable=False)
+    billing_year = db.Column(db.Integer, nullable=False)
+    billing_month = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    projects_scanned = db.Column(db.Integer, nullable=False, default=0)
+    # Service and SKU series scored by the drill-down scans
+    series_scanned = db.Column(db.Integer, nullable=False, default=0)
+    anomalies_found = db.Column(db.Integer, nullable=False, default=0)
+    anomalies_created = db.Column(db.Integer, nullable=False, default=0)
+    duration_seconds = db.Column(db.Float, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class DataVersion(db.Model):
+    """Counter bumped whenever a dataset (e.g. 'billing') changes, used to invalidate caches."""
+    __tablename__ = 'data_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class ForecastCacheEntry(db.Model):
+    """A computed forecast shared between app processes, valid for one billing data version."""
+    __tablename__ = 'forecast_cache'
+    cache_key = db.Column(db.String(100), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
 class Budget(db.Model):
     __tablename__ = 'budgets'
+    __table_args__ = (
+        db.Index('ix_budgets_project_year_month', 'project_id', 'year', 'month'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
     year = db.Column(db.Integer, nullable=False)
     month = db.Column(db.String(10), nullable=False)
+    period = db.Column(db.Integer, nullable=False)
     amount = db.Column(db.Numeric(12, 2), nullable=False)
     platform = db.Column(db.String(50), nullable=False)
 
@@ -77,10 +231,19 @@ class ExchangeRate(db.Model):
 
 class Anomaly(db.Model):
     __tablename__ = 'anomalies'
+    __table_args__ = (
+        db.Index('ix_anomalies_project_year_month', 'project_id', 'billing_year', 'billing_month'),
+        db.Index('ix_anomalies_platform_period_granularity', 'platform', 'period', 'granularity'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    # 'project' for a project's total, 'service' or 'sku' for one of its series
+    granularity = db.Column(db.String(20), nullable=False, default='project', server_default='project')
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=True)
+    sku_id = db.Column(db.Integer, db.ForeignKey('skus.id'), nullable=True)
     billing_year = db.Column(db.Integer, nullable=False)
     billing_month = db.Column(db.String(10), nullable=False)
+    period = db.Column(db.Integer, nullable=False)
     anomalous_cost = db.Column(db.Numeric(12, 2), nullable=False)
     average_cost = db.Column(db.Numeric(12, 2), nullable=False)
     is_acknowledged = db.Column(db.Boolean, default=False, nullable=False)
@@ -88,6 +251,8 @@ class Anomaly(db.Model):
     platform = db.Column(db.String(50), nullable=False)
 
     project = db.relationship('Project')
+    service = db.relationship('Service')
+    sku = db.relationship('Sku')
 
 class BusinessRule(db.Model):
     __tablename__ = 'business_rules'
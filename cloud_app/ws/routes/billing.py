@@ -1,72 +1,257 @@
-from flask import Blueprint, request, jsonify, current_app
-from models import db, Billing, Project
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from models import db, AnomalyScanRun, Billing, BillingRuleApplied, IngestJob, Project
+from routes.request_args import list_arg
+from services.access_scope import get_access_scope
 from services.auth_service import token_required, role_required
-from services.billing_service import apply_business_rules
-import csv
-import io
+from services.billing_view_service import (
+    ITEM_FIELDS, after_cursor, cursor_for, ensure_view_built, slices_with_data, view_columns, view_item,
+    view_order, view_query,
+)
+from services.dimension_service import service_ids
+from services.export_service import FORMATS as EXPORT_FORMATS, RAW, RULE_APPLIED, export_query, iter_export
+from services.job_service import enqueue_ingest_job
+from services.periods import MONTHS, parse_period, year_range
+import datetime
 
 billing_bp = Blueprint("billing", __name__)
 
 
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+# Rows fetched from the database cursor and written out per streamed chunk
+STREAM_CHUNK_ROWS = 500
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json-stream": "application/json",
+}
+
+
+def _requested_periods():
+    """
+    First and last period requested through `year` (that year and the one
+    before) and/or a `from`/`to` month range. Raises ValueError with a message
+    for the client when the parameters are missing or malformed.
+    """
+    year_str = request.args.get("year")
+    from_str = request.args.get("from")
+    to_str = request.args.get("to")
+
+    if year_str:
+        try:
+            current_year = int(year_str)
+        except ValueError:
+            raise ValueError("Invalid year format")
+        first_period, _ = year_range(current_year - 1)
+        _, last_period = year_range(current_year)
+    elif from_str and to_str:
+        first_period = last_period = None
+    else:
+        raise ValueError("Year is a required parameter")
+
+    try:
+        if from_str:
+            start = parse_period(from_str)
+            first_period = start if first_period is None else max(start, first_period)
+        if to_str:
+            end = parse_period(to_str)
+            last_period = end if last_period is None else min(end, last_period)
+    except ValueError:
+        raise ValueError("Invalid month range, expected YYYY-MM")
+    return first_period, last_period
+
+
+def _ensure_views(platform, first_period, last_period):
+    """
+    Makes sure the requested years are materialized with business rules
+    applied. Only years with billing data are built, so an open-ended range
+    doesn't create empty slices.
+    """
+    for p, year in slices_with_data(first_period, last_period, platform):
+        ensure_view_built(p, year)
+
+
+def _stream_items(rows, fields, ndjson):
+    """Serializes view rows as NDJSON lines or as one JSON array, a chunk at a time."""
+    dumps = current_app.json.dumps
+    separator = "\n" if ndjson else ","
+    started = False
+    if not ndjson:
+        yield "["
+
+    chunk = []
+    for row in rows:
+        chunk.append(dumps(view_item(row, fields)))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield (separator if started else "") + separator.join(chunk)
+            started = True
+            chunk = []
+    if chunk:
+        yield (separator if started else "") + separator.join(chunk)
+        started = True
+
+    if not ndjson:
+        yield "]"
+    elif started:
+        yield "\n"
+
+
+def _stream_response(rows, fields, stream_format):
+    return Response(
+        stream_with_context(_stream_items(rows, fields, stream_format == "ndjson")),
+        mimetype=STREAM_FORMATS[stream_format],
+    )
+
+
 @billing_bp.route("/api/billing/services", methods=["GET"])
 @token_required
 def get_billing_services(current_user):
+    """
+    Billing line items with business rules applied.
+
+    Optional query parameters narrow the result on the server:
+      project / service   names to include (repeated or comma-separated)
+      from / to           month range as YYYY-MM, within or instead of `year`
+      fields              item keys to return (comma-separated)
+      limit / cursor      page through the result; the response becomes
+                          {"items": [...], "next_cursor": ...}
+      format              `ndjson` or `json-stream` to stream the items from a
+                          database cursor instead of building the whole array
+                          (an `Accept: application/x-ndjson` header also selects
+                          NDJSON)
+    Without `limit` or `cursor` the response is the plain array of items.
+    """
     platform = request.args.get("platform")
-    year_str = request.args.get("year")
+    try:
+        first_period, last_period = _requested_periods()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fields = list_arg("fields") or list(ITEM_FIELDS)
+    unknown = [f for f in fields if f not in ITEM_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
 
-    if not year_str:
-        return jsonify({"error": "Year is a required parameter"}), 400
-    
+    paginate = "limit" in request.args or "cursor" in request.args
     try:
-        current_year = int(year_str)
-        previous_year = current_year - 1
-        years_to_fetch = [current_year, previous_year]
+        limit = min(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
     except ValueError:
-        return jsonify({"error": "Invalid year format"}), 400
+        return jsonify({"error": "limit must be an integer"}), 400
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            cursor_condition = after_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    stream_format = request.args.get("format")
+    if not stream_format and request.accept_mimetypes.best == STREAM_FORMATS["ndjson"]:
+        stream_format = "ndjson"
+    if stream_format in (None, "json"):
+        stream_format = None
+    elif stream_format not in STREAM_FORMATS:
+        return jsonify({"error": f"Unknown format '{stream_format}'"}), 400
+    elif paginate:
+        return jsonify({"error": "Streaming formats cannot be combined with limit or cursor"}), 400
 
-    query = db.session.query(Billing, Project.project_name.label("project_name")).join(
-        Project, Billing.project_id == Project.id
+    def empty():
+        if stream_format:
+            return _stream_response([], fields, stream_format)
+        return jsonify({"items": [], "next_cursor": None} if paginate else []), 200
+
+    scope = get_access_scope(current_user)
+    if first_period > last_period or scope.is_empty or (platform and not scope.allows_platform(platform)):
+        return empty()
+
+    query = view_query().filter(
+        BillingRuleApplied.period.between(first_period, last_period),
+        scope.predicate(project_name=BillingRuleApplied.project_name, platform=BillingRuleApplied.platform),
     )
 
     if platform:
-        query = query.filter(Billing.platform == platform)
-    
-    query = query.filter(Billing.billing_year.in_(years_to_fetch))
-
-    services = query.all()
-
-    result = [
-        {
-            "id": s.Billing.id,
-            "project_id": s.Billing.project_id,
-            "project_name": s.project_name,
-            "billing_year": s.Billing.billing_year,
-            "billing_month": s.Billing.billing_month,
-            "platform": s.Billing.platform,
-            "service_description": s.Billing.service_description,
-            "sku_description": s.Billing.sku_description,
-            "type": s.Billing.type,
-            "cost": float(s.Billing.cost),
-        }
-        for s in services
-    ]
-
-    # Get a map of project names to their IDs
-    project_map = {p.project_name: p.id for p in Project.query.all()}
-    
-    # Pass the project_map to the business rule function
-    processed_result = apply_business_rules(result, project_map)
-
-    if current_user.role == 'user':
-        assigned_project_names = {p.project_name for p in current_user.assigned_projects}
-        if not assigned_project_names:
-            return jsonify([]), 200 
-        
-        final_result = [item for item in processed_result if item['project_name'] in assigned_project_names]
+        query = query.filter(BillingRuleApplied.platform == platform)
+
+    project_names = list_arg("project")
+    if project_names:
+        query = query.filter(BillingRuleApplied.project_name.in_(project_names))
+
+    services = list_arg("service")
+    if services:
+        query = query.filter(BillingRuleApplied.service_id.in_(service_ids(services)))
+
+    _ensure_views(platform, first_period, last_period)
+
+    query = query.with_entities(*view_columns(fields)).order_by(*view_order())
+    if stream_format:
+        return _stream_response(query.yield_per(STREAM_CHUNK_ROWS), fields, stream_format)
+    if not paginate:
+        return jsonify([view_item(row, fields) for row in query]), 200
+
+    if cursor:
+        query = query.filter(cursor_condition)
+    rows = query.limit(limit + 1).all()
+    next_cursor = cursor_for(rows[limit - 1]) if len(rows) > limit else None
+    return jsonify({
+        "items": [view_item(row, fields) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }), 200
+
+
+@billing_bp.route("/api/billing/export", methods=["GET"])
+@token_required
+def export_billing(current_user):
+    """
+    Billing data as an Arrow IPC stream (`format=arrow`, the default) or a
+    Parquet file (`format=parquet`). `source=raw` exports billing_data as
+    uploaded, `source=rule_applied` (the default) with business rules applied.
+    Accepts the same platform, year, from/to, project and service filters as
+    /api/billing/services.
+    """
+    source = request.args.get("source", RULE_APPLIED)
+    file_format = request.args.get("format", "arrow")
+    if source not in (RAW, RULE_APPLIED):
+        return jsonify({"error": f"Unknown source '{source}'"}), 400
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown format '{file_format}'"}), 400
+
+    platform = request.args.get("platform")
+    try:
+        first_period, last_period = _requested_periods()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    scope = get_access_scope(current_user)
+    if source == RAW:
+        period_col, platform_col, project_col, service_col, id_col = (
+            Billing.period, Billing.platform, Project.project_name, Billing.service_id, Billing.id)
+        in_scope = scope.predicate(project_id=Billing.project_id, platform=Billing.platform)
     else:
-        final_result = processed_result
+        period_col, platform_col, project_col, service_col, id_col = (
+            BillingRuleApplied.period, BillingRuleApplied.platform, BillingRuleApplied.project_name,
+            BillingRuleApplied.service_id, BillingRuleApplied.id)
+        in_scope = scope.predicate(project_name=BillingRuleApplied.project_name, platform=BillingRuleApplied.platform)
+
+    query = export_query(source).filter(period_col.between(first_period, last_period), in_scope)
+    if platform:
+        query = query.filter(platform_col == platform)
+    project_names = list_arg("project")
+    if project_names:
+        query = query.filter(project_col.in_(project_names))
+    services = list_arg("service")
+    if services:
+        query = query.filter(service_col.in_(service_ids(services)))
+
+    if source == RULE_APPLIED and first_period <= last_period:
+        _ensure_views(platform, first_period, last_period)
 
-    return jsonify(final_result), 200
+    mimetype, extension = EXPORT_FORMATS[file_format]
+    return Response(
+        stream_with_context(iter_export(query.order_by(id_col), source, file_format)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=billing_{source}.{extension}"},
+    )
 
 
 @billing_bp.route("/api/billing/upload_csv", methods=["POST"])
@@ -86,69 +271,73 @@ def upload_csv(current_user):
         return jsonify({"error": "Month and Year for the upload are required"}), 400
 
     try:
-        Billing.query.filter_by(
-            billing_year=int(selected_year),
-            billing_month=selected_month,
-            platform=platform
-        ).delete()
-        db.session.commit()
-
-        stream = io.StringIO(file.stream.read().decode("utf-8"))
-        reader = csv.DictReader(stream)
-        
-        all_data = list(reader)
-        if not all_data:
-            return jsonify({"message": "CSV file is empty."}), 200
-
-        new_project_names = set()
-        existing_projects = {p.project_name for p in Project.query.all()}
-
-        for row in all_data:
-            project_name_from_csv = row.get("Project name")
-            if project_name_from_csv and project_name_from_csv not in existing_projects:
-                new_project_names.add(project_name_from_csv)
-        
-        if new_project_names:
-            for name in new_project_names:
-                new_project = Project(project_name=name)
-                db.session.add(new_project)
-            db.session.commit()
-            existing_projects.update(new_project_names)
-
-        project_map = {p.project_name: p.id for p in Project.query.all()}
-        
-        billing_rows_to_add = []
-        for row in all_data:
-            project_name_from_csv = row.get("Project name")
-            project_id = project_map.get(project_name_from_csv)
-
-            if not project_id:
-                continue 
-            
-            billing = Billing(
-                project_id=project_id,
-                billing_year=int(selected_year),
-                billing_month=selected_month,
-                platform=platform,
-                service_description=row.get("Service description"),
-                sku_description=row.get("SKU description"),
-                type=row.get("Credit type"),
-                cost=float(row.get("Cost ($)", 0.0)),
-            )
-            billing_rows_to_add.append(billing)
-
-        db.session.bulk_save_objects(billing_rows_to_add)
-        db.session.commit()
-
-        return (
-            jsonify({
-                "message": f"Uploaded {len(billing_rows_to_add)} rows successfully for {selected_month.capitalize()}, {selected_year}.",
-                "new_projects": list(new_project_names),
-            }),
-            200,
-        )
+        year = int(selected_year)
+    except ValueError:
+        return jsonify({"error": "Invalid year format"}), 400
+    if selected_month not in MONTHS:
+        return jsonify({"error": "Invalid month"}), 400
 
+    try:
+        job = enqueue_ingest_job(
+            file,
+            platform=platform,
+            year=year,
+            month=selected_month,
+            user=current_user,
+            upload_dir=current_app.config["INGEST_UPLOAD_DIR"],
+        )
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"CSV Upload failed: {e}")
-        return jsonify({"error": "An internal error occurred during file processing."}), 500
\ No newline at end of file
+        return jsonify({"error": "An internal error occurred while storing the file."}), 500
+
+    return (
+        jsonify({
+            "message": f"Upload for {selected_month.capitalize()}, {selected_year} received and queued for processing.",
+            "job_id": job.id,
+            "status": job.status,
+        }),
+        202,
+    )
+
+
+@billing_bp.route("/api/billing/jobs/<job_id>", methods=["GET"])
+@token_required
+@role_required(roles=["admin", "superadmin"])
+def get_ingest_job(current_user, job_id):
+    job = IngestJob.query.get_or_404(job_id)
+
+    end_time = job.finished_at or datetime.datetime.utcnow()
+    elapsed = (end_time - job.started_at).total_seconds() if job.started_at else 0
+    rows_per_second = job.rows_parsed / elapsed if elapsed > 0 else 0
+    scan = AnomalyScanRun.query.filter_by(job_id=job.id).order_by(db.desc(AnomalyScanRun.id)).first()
+
+    return jsonify({
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "platform": job.platform,
+        "year": job.billing_year,
+        "month": job.billing_month,
+        "first_period": job.first_period,
+        "last_period": job.last_period,
+        "rows_parsed": job.rows_parsed,
+        "rows_inserted": job.rows_inserted,
+        "rows_per_second": round(rows_per_second, 1),
+        "elapsed_seconds": round(elapsed, 3),
+        "new_projects": job.new_projects or [],
+        "error": job.error,
+        "warnings": job.warnings or [],
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "anomaly_scan": {
+            "status": scan.status,
+            "projects_scanned": scan.projects_scanned,
+            "series_scanned": scan.series_scanned,
+            "anomalies_found": scan.anomalies_found,
+            "anomalies_created": scan.anomalies_created,
+            "duration_seconds": round(scan.duration_seconds or 0, 3),
+            "error": scan.error,
+        } if scan else None,
+    })
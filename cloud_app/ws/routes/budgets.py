@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from models import db, Budget, Project
+from services.access_scope import get_access_scope
 from services.auth_service import token_required, role_required
 from services.audit_service import log_action
+from services.periods import MONTHS, to_period
 
 budgets_bp = Blueprint("budgets", __name__)
 
@@ -10,15 +12,15 @@ budgets_bp = Blueprint("budgets", __name__)
 @token_required
 def get_budgets_for_year(current_user, year):
     """Fetches all budgets for a given year."""
-    # Base query for all budgets in the specified year
-    query = Budget.query.filter_by(year=year)
+    scope = get_access_scope(current_user)
+    if scope.is_empty:
+        return jsonify([]), 200  # Return empty if user has no projects
 
-    # If the user has a 'user' role, filter by their assigned projects
-    if current_user.role == 'user':
-        assigned_project_ids = [p.id for p in current_user.assigned_projects]
-        if not assigned_project_ids:
-            return jsonify([]), 200  # Return empty if user has no projects
-        query = query.filter(Budget.project_id.in_(assigned_project_ids))
+    # Budgets in the specified year, limited to the projects and platforms the user can see
+    query = Budget.query.filter(
+        Budget.year == year,
+        scope.predicate(project_id=Budget.project_id, platform=Budget.platform),
+    )
 
     budgets = query.all()
     
@@ -43,6 +45,8 @@ def save_budget(current_user):
 
     if not all([project_id, year, month, amount is not None]):
         return jsonify({"error": "Missing required fields"}), 400
+    if month not in MONTHS:
+        return jsonify({"error": "Invalid month"}), 400
 
     # Find the project to link in the audit log
     project = Project.query.get(project_id)
@@ -65,7 +69,9 @@ def save_budget(current_user):
             project_id=project_id,
             year=year,
             month=month,
-            amount=amount
+            period=to_period(year, month),
+            amount=amount,
+            platform=project.platform
         )
         db.session.add(budget)
 
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from models import db, BusinessRule
 from services.auth_service import token_required, role_required
+from services.job_service import enqueue_view_refresh_job
+from services.periods import period_from_date
 from datetime import datetime
 
 business_rules_bp = Blueprint("business_rules", __name__)
@@ -9,6 +11,21 @@ def date_from_iso(date_string):
     """Helper to convert ISO date string to Python date object, handles None."""
     return datetime.fromisoformat(date_string.split('T')[0]).date() if date_string else None
 
+def rule_periods(rule):
+    """First and last billing period a rule can affect (None when open-ended)."""
+    return (
+        period_from_date(rule.start_date) if rule.start_date else None,
+        period_from_date(rule.end_date) if rule.end_date else None,
+    )
+
+def queue_rule_refresh(user, *ranges):
+    """Queues a recompute of the rule-applied billing view over the union of period ranges."""
+    lows = [low for low, _ in ranges]
+    highs = [high for _, high in ranges]
+    first_period = None if None in lows else min(lows)
+    last_period = None if None in highs else max(highs)
+    return enqueue_view_refresh_job(first_period, last_period, user)
+
 @business_rules_bp.route("/api/business-rules", methods=["GET"])
 @token_required
 @role_required(roles=['admin', 'superadmin'])
@@ -51,7 +68,11 @@ def create_rule(current_user):
     
     db.session.add(new_rule)
     db.session.commit()
-    return jsonify({'message': 'Rule created successfully', 'id': new_rule.id}), 201
+
+    response = {'message': 'Rule created successfully', 'id': new_rule.id}
+    if new_rule.is_active:
+        response['refresh_job_id'] = queue_rule_refresh(current_user, rule_periods(new_rule)).id
+    return jsonify(response), 201
 
 
 @business_rules_bp.route("/api/business-rules/<int:rule_id>", methods=["PUT"])
@@ -60,6 +81,7 @@ def create_rule(current_user):
 def update_rule(current_user, rule_id):
     rule = BusinessRule.query.get_or_404(rule_id)
     data = request.get_json()
+    previous_range = rule_periods(rule)
 
     if 'is_active' in data:
         rule.is_active = data['is_active']
@@ -71,4 +93,7 @@ def update_rule(current_user, rule_id):
         rule.end_date = date_from_iso(data.get('end_date'))
         
     db.session.commit()
-    return jsonify({'message': 'Rule updated successfully'})
\ No newline at end of file
+
+    # Both the periods the rule used to cover and the ones it covers now change
+    job = queue_rule_refresh(current_user, previous_range, rule_periods(rule))
+    return jsonify({'message': 'Rule updated successfully', 'refresh_job_id': job.id})
\ No newline at end of file
@@ -1,78 +1,70 @@
-from flask import Blueprint, jsonify
-from models import db, Billing, Project
+import hashlib
+from flask import Blueprint, jsonify, request
+from models import db, BillingMonthlyRollup, Project
+from services.access_scope import get_access_scope
 from services.auth_service import token_required
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-import numpy as np
-from collections import defaultdict
+from services.periods import period_month_name
+from services.forecast_cache import cached_forecast
+
+# The NumPy-based forecasting modules (services/forecast_service.py and
+# services/forecasters.py) are imported inside the handlers, so they are only
+# loaded by a worker once it serves its first forecast rather than at startup.
 
 forecasting_bp = Blueprint("forecasting", __name__)
 
-def generate_forecast_for_project(project_id):
+
+def _selected_engine():
+    """The engine named by the `engine` query parameter. Raises ValueError if unknown."""
+    from services.forecasters import get_forecaster
+    return get_forecaster(request.args.get("engine")).name
+
+
+def generate_forecast_for_project(project_id, engine=None):
     """Helper function to generate a 3-month forecast for a single project."""
-    history_limit = 12
-    billing_entries = db.session.query(
-        Billing.billing_year,
-        Billing.billing_month,
-        db.func.sum(Billing.cost).label('total_cost')
-    ).filter(Billing.project_id == project_id)\
-     .group_by(Billing.billing_year, Billing.billing_month)\
-     .order_by(db.desc(Billing.billing_year), db.desc(Billing.billing_month))\
-     .limit(history_limit)\
-     .all()
+    from services.forecast_service import forecast_all_projects
 
-    if len(billing_entries) < 3:
+    points = forecast_all_projects([project_id], engine=engine).get(project_id)
+    if not points:
         return None # Not enough data
 
-    df = pd.DataFrame(billing_entries, columns=['year', 'month_str', 'cost'])
-    month_map = { 'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12 }
-    df['month'] = df['month_str'].map(month_map)
-    df = df.sort_values(by=['year', 'month']).reset_index()
-    df['time_index'] = df.index
-
-    X = df['time_index'].values.reshape(-1, 1)
-    y = df['cost'].values.astype(float)
-
-    model = LinearRegression()
-    model.fit(X, y)
-
-    last_index = df['time_index'].max()
-    future_indices = np.array([last_index + 1, last_index + 2, last_index + 3]).reshape(-1, 1)
-    predicted_costs = model.predict(future_indices)
-    
-    last_month_num = df.iloc[-1]['month']
-    last_year = df.iloc[-1]['year']
-    month_keys = list(month_map.keys())
-    
-    forecast_data = []
-    for i in range(3):
-        next_month_index = (last_month_num + i) % 12
-        next_year = last_year if (last_month_num + i) < 12 else last_year + 1
-        forecast_data.append({
-            'year': int(next_year),
-            'month_str': month_keys[next_month_index],
-            'cost': max(0, predicted_costs[i])
-        })
-    return forecast_data
+    return [
+        {'year': period // 100, 'month_str': period_month_name(period), 'cost': cost}
+        for period, cost in points
+    ]
 
 @forecasting_bp.route("/api/forecasting/project/<int:project_id>/<int:year>", methods=['GET'])
 @token_required
 def get_project_forecast(current_user, project_id, year):
+    try:
+        engine = _selected_engine()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    scope = get_access_scope(current_user)
+    Project.query.filter(
+        Project.id == project_id,
+        scope.predicate(project_id=Project.id, platform=Project.platform),
+    ).first_or_404()
+
     # This endpoint is still used for fetching historical data for the chart
     history_limit = 12
     billing_entries = db.session.query(
-        Billing.billing_year,
-        Billing.billing_month,
-        db.func.sum(Billing.cost).label('total_cost')
-    ).filter(Billing.project_id == project_id)\
-     .group_by(Billing.billing_year, Billing.billing_month)\
-     .order_by(db.desc(Billing.billing_year), db.desc(Billing.billing_month))\
+        BillingMonthlyRollup.billing_year,
+        BillingMonthlyRollup.billing_month,
+        db.func.sum(BillingMonthlyRollup.total_cost).label('total_cost')
+    ).filter(BillingMonthlyRollup.project_id == project_id)\
+     .group_by(BillingMonthlyRollup.period, BillingMonthlyRollup.billing_year, BillingMonthlyRollup.billing_month)\
+     .order_by(db.desc(BillingMonthlyRollup.period))\
      .limit(history_limit)\
      .all()
 
-    df = pd.DataFrame(billing_entries, columns=['year', 'month_str', 'cost'])
-    historical_data = df.to_dict(orient='records')
-    forecast_data = generate_forecast_for_project(project_id)
+    historical_data = [
+        {'year': billing_year, 'month_str': billing_month, 'cost': total_cost}
+        for billing_year, billing_month, total_cost in billing_entries
+    ]
+    forecast_data = cached_forecast(
+        f"project:{project_id}:{engine}", lambda: generate_forecast_for_project(project_id, engine)
+    )
 
     if not forecast_data:
         return jsonify({'historical': historical_data, 'forecast': []})
@@ -86,23 +78,29 @@ def get_project_forecast(current_user, project_id, year):
 @forecasting_bp.route("/api/forecasting/all/<int:year>", methods=['GET'])
 @token_required
 def get_all_projects_forecast(current_user, year):
-    # Get all project IDs
-    projects = Project.query.all()
-    project_ids = [p.id for p in projects]
-
-    # Dictionary to sum up the forecasts for each future month
-    aggregated_forecast = defaultdict(lambda: {'cost': 0})
-
-    for pid in project_ids:
-        project_forecast = generate_forecast_for_project(pid)
-        if project_forecast:
-            for forecast_month in project_forecast:
-                month_key = f"{forecast_month['year']}-{forecast_month['month_str']}"
-                aggregated_forecast[month_key]['cost'] += forecast_month['cost']
-                aggregated_forecast[month_key]['year'] = forecast_month['year']
-                aggregated_forecast[month_key]['month_str'] = forecast_month['month_str']
-    
-    # Convert the aggregated dictionary to a list
-    final_forecast = list(aggregated_forecast.values())
-
-    return jsonify({'forecast': final_forecast})
\ No newline at end of file
+    from services.forecast_service import forecast_all_projects, aggregate_forecasts
+
+    try:
+        engine = _selected_engine()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Every project's monthly totals come from one grouped query and all the
+    # trends are fitted together, see services/forecast_service.py. A
+    # restricted user gets the forecast of the projects in their scope,
+    # cached under a key naming those projects.
+    scope = get_access_scope(current_user)
+    if scope.unrestricted:
+        project_ids, cache_key = None, f"all:{engine}"
+    else:
+        project_ids = sorted(project_id for (project_id,) in db.session.query(Project.id).filter(
+            scope.predicate(project_id=Project.id, platform=Project.platform)))
+        if not project_ids:
+            return jsonify({'forecast': []})
+        digest = hashlib.sha1(",".join(map(str, project_ids)).encode()).hexdigest()
+        cache_key = f"all:{engine}:{digest}"
+
+    forecast = cached_forecast(
+        cache_key, lambda: aggregate_forecasts(forecast_all_projects(project_ids, engine=engine))
+    )
+    return jsonify({'forecast': forecast})
@@ -1,13 +1,16 @@
 from flask import Blueprint, request, jsonify
-from models import db, Project, User, Billing
+from models import db, Project, BillingMonthlyRollup
+from services.access_scope import get_access_scope
 from services.auth_service import token_required, role_required
+from services.periods import MONTHS, year_range, period_month_name
 
 projects_bp = Blueprint("projects", __name__)
 
 @projects_bp.route("/api/projects/meta/all", methods=["GET"])
 @token_required
 def get_all_project_meta(current_user):
-    projects = Project.query.all()
+    scope = get_access_scope(current_user)
+    projects = Project.query.filter(scope.predicate(project_id=Project.id, platform=Project.platform)).all()
     meta_data = {
         p.project_name: {
             "id": p.id,
@@ -40,7 +43,11 @@ def update_project_meta(current_user):
 @projects_bp.route("/api/project/<int:project_id>", methods=['GET'])
 @token_required
 def get_project_details(current_user, project_id):
-    project = Project.query.get_or_404(project_id)
+    scope = get_access_scope(current_user)
+    project = Project.query.filter(
+        Project.id == project_id,
+        scope.predicate(project_id=Project.id, platform=Project.platform),
+    ).first_or_404()
     year = request.args.get('year', type=int)
 
     if not year:
@@ -50,13 +57,16 @@ def get_project_details(current_user, project_id):
     assigned_users = [{'id': u.id, 'username': u.username} for u in project.assigned_users]
 
     # Get monthly cost history for the year
-    months = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
-    cost_history = {month: 0 for month in months}
-    
-    billing_entries = Billing.query.filter_by(project_id=project.id, billing_year=year).all()
-    for entry in billing_entries:
-        if entry.billing_month in cost_history:
-            cost_history[entry.billing_month] += float(entry.cost)
+    cost_history = {month: 0 for month in MONTHS}
+
+    first_period, last_period = year_range(year)
+    monthly_totals = db.session.query(BillingMonthlyRollup.period, db.func.sum(BillingMonthlyRollup.total_cost))\
+        .filter(BillingMonthlyRollup.project_id == project.id,
+                BillingMonthlyRollup.period.between(first_period, last_period))\
+        .group_by(BillingMonthlyRollup.period)\
+        .all()
+    for period, total_cost in monthly_totals:
+        cost_history[period_month_name(period)] += float(total_cost or 0)
 
     # Assemble the response
     project_details = {
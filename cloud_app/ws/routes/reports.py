@@ -1,16 +1,14 @@
 from flask import Blueprint, request, jsonify
-from models import db, Billing, Project
+from models import db, BillingMonthlyRollup, Project
+from routes.request_args import list_arg
+from services.access_scope import get_access_scope
 from services.auth_service import token_required
+from services.cost_cube import DIMENSIONS, FILTERS, cube_query, rollup_rows
+from services.periods import QUARTERS, parse_period, quarter_range, year_range
 from sqlalchemy import func
 
 reports_bp = Blueprint("reports", __name__)
 
-QUARTERS = {
-    'Q1': ['jan', 'feb', 'mar'],
-    'Q2': ['apr', 'may', 'jun'],
-    'Q3': ['jul', 'aug', 'sep'],
-    'Q4': ['oct', 'nov', 'dec']
-}
 
 @reports_bp.route("/api/reports/grouped_cost", methods=['GET'])
 @token_required
@@ -28,20 +26,22 @@ def get_grouped_cost_report(current_user):
 
     query = db.session.query(
         group_by_column.label('group_name'),
-        func.sum(Billing.cost).label('total_cost')
-    ).join(Project, Billing.project_id == Project.id)\
-     .filter(Billing.billing_year == year)\
+        func.sum(BillingMonthlyRollup.total_cost).label('total_cost')
+    ).join(Project, BillingMonthlyRollup.project_id == Project.id)\
      .group_by('group_name')\
      .order_by(db.desc('total_cost'))
 
     if quarter and quarter in QUARTERS:
-        query = query.filter(Billing.billing_month.in_(QUARTERS[quarter]))
-
-    if current_user.role == 'user':
-        assigned_project_ids = [p.id for p in current_user.assigned_projects]
-        if not assigned_project_ids:
-            return jsonify([])
-        query = query.filter(Billing.project_id.in_(assigned_project_ids))
+        first_period, last_period = quarter_range(year, quarter)
+    else:
+        first_period, last_period = year_range(year)
+    scope = get_access_scope(current_user)
+    if scope.is_empty:
+        return jsonify([])
+    query = query.filter(
+        BillingMonthlyRollup.period.between(first_period, last_period),
+        scope.predicate(project_id=BillingMonthlyRollup.project_id, platform=BillingMonthlyRollup.platform),
+    )
 
     results = query.all()
 
@@ -63,4 +63,49 @@ def get_grouped_cost_report(current_user):
     # Sort again after aggregation
     output.sort(key=lambda x: x['totalCost'], reverse=True)
     
-    return jsonify(output)
\ No newline at end of file
+    return jsonify(output)
+
+
+@reports_bp.route("/api/reports/cube", methods=['GET'])
+@token_required
+def get_cost_cube(current_user):
+    """
+    Cost grouped by several dimensions at once, with subtotals.
+
+    Query parameters:
+      groupBy             dimensions to group by, in order (team, owner,
+                          environment, platform, service, month)
+      year [+ quarter]    the period to report on, or
+      from / to           a month range as YYYY-MM
+      team, owner, environment, platform, service
+                          values to keep (repeated or comma-separated;
+                          'Unassigned' matches a missing value)
+      rollup              'false' to leave out the subtotal rows
+    """
+    dimensions = list_arg('groupBy')
+    unknown = [d for d in dimensions if d not in DIMENSIONS]
+    if not dimensions or unknown or len(set(dimensions)) != len(dimensions):
+        return jsonify({"error": f"groupBy must list distinct dimensions from: {', '.join(DIMENSIONS)}"}), 400
+
+    year = request.args.get('year', type=int)
+    quarter = request.args.get('quarter')
+    try:
+        if request.args.get('from') and request.args.get('to'):
+            first_period, last_period = parse_period(request.args['from']), parse_period(request.args['to'])
+        elif year:
+            first_period, last_period = quarter_range(year, quarter) if quarter in QUARTERS else year_range(year)
+        else:
+            return jsonify({"error": "Either year or from and to are required"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid month range, expected YYYY-MM"}), 400
+
+    filters = {name: list_arg(name) for name in FILTERS}
+    filters = {name: values for name, values in filters.items() if values}
+    subtotals = request.args.get('rollup', 'true').lower() != 'false'
+
+    scope = get_access_scope(current_user)
+    rows = [] if scope.is_empty else cube_query(dimensions, first_period, last_period, filters, scope)
+    return jsonify({
+        'dimensions': dimensions,
+        'rows': rollup_rows(dimensions, rows, subtotals),
+    })
@@ -0,0 +1,11 @@
+from flask import request
+
+# Query string parsing shared by the route modules
+
+
+def list_arg(name):
+    """Values of a query parameter given either repeated or comma-separated."""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(v.strip() for v in raw.split(",") if v.strip())
+    return values
@@ -1,12 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, User, Project
-from services.auth_service import token_required, role_required
-import jwt
-import datetime
+from services.auth_service import token_required, role_required, invalidate_principal, issue_token, revoke_tokens
+from services.password_service import (
+    PasswordPoolBusy, hash_password, verify_password, needs_rehash, login_metrics,
+)
+import time
 
 users_bp = Blueprint("users", __name__)
 
 
+@users_bp.errorhandler(PasswordPoolBusy)
+def password_pool_busy(e):
+    return jsonify({"error": "The server is busy, please try again shortly"}), 503, {"Retry-After": "1"}
+
+
 @users_bp.route("/api/setup_admin", methods=["POST"])
 def setup_admin():
     if User.query.filter_by(username='admin').first():
@@ -18,23 +25,32 @@ def setup_admin():
         email='admin@example.com',
         accessible_platforms=['GCP', 'AWS']
     )
-    admin_user.set_password('admin123')
+    admin_user.password_hash = hash_password('admin123')
     db.session.add(admin_user)
     db.session.commit()
     return jsonify({"message": "Admin user 'admin' with password 'admin123' created."}), 201
 
 @users_bp.route("/api/login", methods=["POST"])
 def login():
+    start = time.perf_counter()
     data = request.get_json()
+    password = data.get("password") or ""
     user = User.query.filter_by(username=data.get("username")).first()
-    if not user or not user.check_password(data.get("password")):
+    try:
+        valid = user is not None and verify_password(user.password_hash, password)
+        if valid and needs_rehash(user.password_hash):
+            # Upgrade hashes made with an older method or cost
+            user.password_hash = hash_password(password)
+            db.session.commit()
+    except PasswordPoolBusy:
+        login_metrics.record('rejected', time.perf_counter() - start)
+        raise
+    if not valid:
+        login_metrics.record('failed', time.perf_counter() - start)
         return jsonify({"error": "Invalid username or password"}), 401
     
-    token = jwt.encode({
-        'public_id': user.id,
-        'role': user.role,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
-    }, 'b3baf4d212b79b3af923ce0151480584', algorithm="HS256")
+    token = issue_token(user)
+    login_metrics.record('succeeded', time.perf_counter() - start)
     
     return jsonify({
         "token": token, 
@@ -46,25 +62,46 @@ def login():
 @token_required
 def update_profile(current_user):
     data = request.get_json()
+    user = db.session.get(User, current_user.id)
     
-    if 'email' in data and data['email'] != current_user.email:
-        if User.query.filter(User.id != current_user.id, User.email == data['email']).first():
+    if 'email' in data and data['email'] != user.email:
+        if User.query.filter(User.id != user.id, User.email == data['email']).first():
             return jsonify({'error': 'Email address already in use'}), 409
-        current_user.email = data['email']
+        user.email = data['email']
 
-    if 'new_password' in data and data['new_password']:
-        if 'current_password' not in data or not current_user.check_password(data['current_password']):
+    password_changed = bool(data.get('new_password'))
+    if password_changed:
+        if 'current_password' not in data or not verify_password(user.password_hash, data['current_password']):
             return jsonify({'error': 'Your current password is incorrect'}), 401
-        current_user.set_password(data['new_password'])
+        user.password_hash = hash_password(data['new_password'])
+        # Sign out every other session; the caller gets a fresh token below
+        revoke_tokens(user)
 
     try:
         db.session.commit()
-        return jsonify({'message': 'Profile updated successfully'})
+        invalidate_principal(user.id)
+        response = {'message': 'Profile updated successfully'}
+        if password_changed:
+            response['token'] = issue_token(user)
+        return jsonify(response)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@users_bp.route("/api/login/metrics", methods=["GET"])
+@token_required
+@role_required(roles=['admin', 'superadmin'])
+def get_login_metrics(current_user):
+    """Login counts, throughput and latency for this app process, and the password hashing setup."""
+    return jsonify({
+        **login_metrics.snapshot(),
+        'password_hash_method': current_app.config['PASSWORD_HASH_METHOD'].split(':', 1)[0],
+        'password_hash_workers': current_app.config['PASSWORD_HASH_WORKERS'],
+        'password_hash_wait_seconds': current_app.config['PASSWORD_HASH_WAIT_SECONDS'],
+    })
+
+
 @users_bp.route("/api/users", methods=["GET"])
 @token_required
 @role_required(roles=['admin', 'superadmin'])
@@ -105,7 +142,7 @@ def create_user(current_user):
         role=data.get('role', 'user'),
         accessible_platforms=data.get('accessible_platforms', [])
     )
-    new_user.set_password(data.get('password'))
+    new_user.password_hash = hash_password(data.get('password'))
     db.session.add(new_user)
     db.session.commit()
     return jsonify({'message': 'New user created successfully'}), 201
@@ -121,6 +158,12 @@ def update_user(current_user, user_id):
     if current_user.role == 'admin' and user_to_update.role == 'superadmin':
         return jsonify({'error': 'Permission denied to edit this user'}), 403
 
+    def access(user):
+        return (user.role, sorted(user.accessible_platforms or []), sorted(p.id for p in user.assigned_projects))
+
+    access_before = access(user_to_update)
+    password_changed = False
+
     if 'email' in data and data['email'] != user_to_update.email:
         if User.query.filter(User.id != user_id, User.email == data['email']).first():
             return jsonify({'error': 'Email address already in use'}), 409
@@ -133,7 +176,8 @@ def update_user(current_user, user_id):
         user_to_update.role = new_role
 
     if 'password' in data and data['password']:
-        user_to_update.set_password(data['password'])
+        user_to_update.password_hash = hash_password(data['password'])
+        password_changed = True
     
     if 'accessible_platforms' in data:
         user_to_update.accessible_platforms = data['accessible_platforms']
@@ -148,8 +192,14 @@ def update_user(current_user, user_id):
     elif 'role' in data and data['role'] != 'user':
         user_to_update.assigned_projects = []
 
+    # Tokens carry the user's access, so only changes to it (or a new
+    # password) sign them out
+    if password_changed or access(user_to_update) != access_before:
+        revoke_tokens(user_to_update)
+
     try:
         db.session.commit()
+        invalidate_principal(user_id)
         return jsonify({'message': 'User has been updated'})
     except Exception as e:
         db.session.rollback()
@@ -170,4 +220,5 @@ def delete_user(current_user, user_id):
 
     db.session.delete(user_to_delete)
     db.session.commit()
+    invalidate_principal(user_id)
     return jsonify({'message': 'User has been deleted'})
\ No newline at end of file
@@ -1,12 +1,12 @@
 from models import db, User
-from werkzeug.security import generate_password_hash
+from services.password_service import hash_password
 from ws import app
 
 with app.app_context():
     if not User.query.filter_by(username="admin").first():
         admin = User(
             username="admin",
-            password_hash=generate_password_hash("password"),
+            password_hash=hash_password("password"),
             role="superadmin",
         )
         db.session.add(admin)
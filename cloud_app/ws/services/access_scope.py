@@ -0,0 +1,70 @@
+from models import db
+
+# What an authenticated user may read, resolved once per request from their
+# principal and applied inside every read query as a SQL predicate, so a
+# narrow scope also means a narrow, index-driven query.
+#
+#   - role 'user' sees only their assigned projects; other roles see all
+#   - everyone but a superadmin is limited to their accessible platforms,
+#     unless that list is empty (no platform restriction)
+
+
+class AccessScope:
+    """The projects and platforms a user may read. None means unrestricted."""
+
+    def __init__(self, project_ids=None, platforms=None, principal=None):
+        self.project_ids = frozenset(project_ids) if project_ids is not None else None
+        self.platforms = tuple(platforms) if platforms is not None else None
+        self._principal = principal
+
+    @property
+    def unrestricted(self):
+        return self.project_ids is None and self.platforms is None
+
+    @property
+    def is_empty(self):
+        """True if the scope can't match anything."""
+        return (self.project_ids is not None and not self.project_ids) or \
+            (self.platforms is not None and not self.platforms)
+
+    @property
+    def project_names(self):
+        """Names of the projects in scope, for tables keyed by project name."""
+        return self._principal.project_names if self._principal is not None else frozenset()
+
+    def allows_platform(self, platform):
+        return self.platforms is None or platform in self.platforms
+
+    def allows_project(self, project):
+        return (self.project_ids is None or project.id in self.project_ids) and \
+            self.allows_platform(project.platform)
+
+    def predicate(self, project_id=None, platform=None, project_name=None):
+        """
+        SQL condition limiting a query to the scope, given its project id (or
+        project name) and platform columns. True for an unrestricted scope.
+        """
+        if self.is_empty:
+            return db.false()
+        clauses = []
+        if self.project_ids is not None:
+            if project_name is not None:
+                clauses.append(project_name.in_(sorted(self.project_names)))
+            elif project_id is not None:
+                clauses.append(project_id.in_(sorted(self.project_ids)))
+            else:
+                raise ValueError("A project-restricted scope needs a project id or name column")
+        if self.platforms is not None:
+            if platform is None:
+                raise ValueError("A platform-restricted scope needs a platform column")
+            clauses.append(platform.in_(self.platforms))
+        return db.and_(*clauses) if clauses else db.true()
+
+
+def get_access_scope(principal):
+    """Resolves the access scope of an authenticated principal."""
+    project_ids = principal.project_ids if principal.role == 'user' else None
+    platforms = None
+    if principal.role != 'superadmin' and principal.accessible_platforms:
+        platforms = principal.accessible_platforms
+    return AccessScope(project_ids, platforms, principal)
@@ -0,0 +1,316 @@
+import datetime
+import logging
+import time
+from models import db, Billing, BillingMonthlyRollup, Anomaly, AnomalyScanRun, Project
+from services.periods import to_period, shift_period
+
+# Cost anomaly detection. A month is scanned for a whole platform at once: one
+# grouped query reads the monthly costs of every series for the month and the
+# HISTORY_MONTHS before it, the statistics are computed for all series
+# together with NumPy, and the anomalies already recorded for the month are
+# fetched in a single query.
+#
+# Project totals are compared against the mean and standard deviation of
+# their history. The drill-down granularities score each (project, service)
+# series from the rollup and each (project, service, SKU) series from the
+# billing data against the median and MAD of their history, which a single
+# earlier spike can't inflate.
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MONTHS = 6
+MIN_HISTORY = 3
+# A cost is anomalous above mean + STD_FACTOR * std of its history ...
+STD_FACTOR = 2
+# ... and at least MIN_INCREASE above the mean
+MIN_INCREASE = 50
+# Relative std used when the history has no variance
+FALLBACK_STD_RATIO = 0.1
+
+GRANULARITIES = ('project', 'service', 'sku')
+DEFAULT_GRANULARITIES = ('project', 'service')
+# A series cost is anomalous above median + ROBUST_Z * MAD_SCALE * MAD of its
+# history, i.e. a modified z-score above ROBUST_Z ...
+ROBUST_Z = 3.5
+# ... where MAD_SCALE * MAD estimates the standard deviation of normal data,
+MAD_SCALE = 1.4826
+# and at least MIN_INCREASE and MIN_RELATIVE_INCREASE above the median. The
+# MAD of a few months understates the spread of steady series, which would
+# otherwise flag small fluctuations in large ones.
+MIN_RELATIVE_INCREASE = 0.25
+
+
+def group_mean_std(groups, values, group_count):
+    """Per-group count, mean and sample standard deviation (ddof=1, NaN below 2 values)."""
+    import numpy as np
+
+    counts = np.bincount(groups, minlength=group_count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.bincount(groups, weights=values, minlength=group_count) / counts
+        squares = np.bincount(groups, weights=(values - means[groups]) ** 2, minlength=group_count)
+        stds = np.sqrt(squares / (counts - 1))
+    return counts, means, np.where(counts > 1, stds, np.nan)
+
+
+def check_for_anomalies(year, month, platform):
+    """
+    Analyzes the latest billing data for a given month and year to find
+    anomalies, recording any new ones. Returns a summary of the scan.
+    """
+    # Loaded on first use to keep NumPy out of worker startup
+    import numpy as np
+
+    period = to_period(year, month)
+    rows = db.session.query(
+        BillingMonthlyRollup.project_id,
+        BillingMonthlyRollup.period,
+        db.func.sum(BillingMonthlyRollup.total_cost),
+    ).join(Project).filter(
+        Project.platform == platform,
+        BillingMonthlyRollup.period.between(shift_period(period, -HISTORY_MONTHS), period),
+    ).group_by(BillingMonthlyRollup.project_id, BillingMonthlyRollup.period).all()
+
+    summary = {'platform': platform, 'period': period, 'projects_scanned': 0,
+               'anomalies_found': 0, 'anomalies_created': 0}
+    if not rows:
+        return summary
+
+    project_col = np.array([r[0] for r in rows], dtype=np.int64)
+    period_col = np.array([r[1] for r in rows], dtype=np.int64)
+    cost_col = np.array([float(r[2] or 0) for r in rows])
+
+    project_ids, groups = np.unique(project_col, return_inverse=True)
+    current = period_col == period
+    latest = np.full(len(project_ids), np.nan)
+    latest[groups[current]] = cost_col[current]
+
+    counts, averages, stds = group_mean_std(groups[~current], cost_col[~current], len(project_ids))
+    stds = np.where((stds == 0) | np.isnan(stds), averages * FALLBACK_STD_RATIO, stds)
+    thresholds = averages + STD_FACTOR * stds
+
+    scanned = ~np.isnan(latest)
+    with np.errstate(invalid='ignore'):
+        flagged = scanned & (counts >= MIN_HISTORY) & (latest > thresholds) & (latest - averages > MIN_INCREASE)
+    summary['projects_scanned'] = int(scanned.sum())
+    summary['anomalies_found'] = int(flagged.sum())
+    if not flagged.any():
+        return summary
+
+    flagged_ids = [int(pid) for pid in project_ids[flagged]]
+    existing = {pid for (pid,) in db.session.query(Anomaly.project_id).filter(
+        Anomaly.project_id.in_(flagged_ids),
+        Anomaly.billing_year == year,
+        Anomaly.billing_month == month,
+        Anomaly.granularity == 'project',
+    )}
+
+    new_anomalies = [
+        Anomaly(
+            project_id=int(pid),
+            billing_year=year,
+            billing_month=month,
+            period=period,
+            platform=platform,
+            anomalous_cost=float(cost),
+            average_cost=float(average),
+        )
+        for pid, cost, average in zip(project_ids[flagged], latest[flagged], averages[flagged])
+        if int(pid) not in existing
+    ]
+    db.session.add_all(new_anomalies)
+    db.session.commit()
+
+    summary['anomalies_created'] = len(new_anomalies)
+    return summary
+
+
+def median_mad(history):
+    """
+    Row-wise median and median absolute deviation of a (series x months)
+    matrix with NaN for missing months. Rows need at least one value.
+    """
+    import numpy as np
+
+    medians = np.nanmedian(history, axis=1)
+    return medians, np.nanmedian(np.abs(history - medians[:, None]), axis=1)
+
+
+def robust_spikes(keys, period_col, cost_col, period):
+    """
+    Scores monthly costs of many series at once. `keys` holds one row of
+    integer ids per cost, identifying its series; `period_col` and `cost_col`
+    hold the month and cost. Series with a cost in `period` and at least
+    MIN_HISTORY of the HISTORY_MONTHS before it are compared against the
+    median and MAD of those months. Returns the number of series with a cost
+    in `period` and the keys, costs and medians of the anomalous ones.
+    """
+    import numpy as np
+
+    # Group rows by key; lexsort is much faster than np.unique(axis=0)
+    order = np.lexsort(keys.T[::-1])
+    ordered = keys[order]
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = (ordered[1:] != ordered[:-1]).any(axis=1)
+    series = ordered[starts]
+    groups = np.empty(len(keys), dtype=np.int64)
+    groups[order] = np.cumsum(starts) - 1
+    # 0 for the scanned month, 1..HISTORY_MONTHS for the months before it
+    months_back = (period // 100 - period_col // 100) * 12 + period % 100 - period_col % 100
+
+    current = months_back == 0
+    latest = np.full(len(series), np.nan)
+    latest[groups[current]] = cost_col[current]
+    scored = np.flatnonzero(~np.isnan(latest))
+
+    # History matrix (scored series x months back), NaN where a month is missing
+    position = np.full(len(series), -1)
+    position[scored] = np.arange(len(scored))
+    past = (months_back > 0) & (months_back <= HISTORY_MONTHS) & (position[groups] >= 0)
+    history = np.full((len(scored), HISTORY_MONTHS), np.nan)
+    history[position[groups[past]], months_back[past] - 1] = cost_col[past]
+
+    enough = np.count_nonzero(~np.isnan(history), axis=1) >= MIN_HISTORY
+    candidates, history = scored[enough], history[enough]
+    if not len(candidates):
+        return len(scored), series[:0], np.empty(0), np.empty(0)
+
+    medians, mads = median_mad(history)
+    scales = np.where(mads > 0, MAD_SCALE * mads, medians * FALLBACK_STD_RATIO)
+    costs = latest[candidates]
+    flagged = (
+        (costs > medians + ROBUST_Z * scales)
+        & (costs - medians > MIN_INCREASE)
+        & (costs > medians * (1 + MIN_RELATIVE_INCREASE))
+    )
+    return len(scored), series[candidates[flagged]], costs[flagged], medians[flagged]
+
+
+def _series_costs(granularity, platform, period):
+    """
+    Monthly cost per series for the scanned month and its history, grouped in
+    the database. Rows are (project_id, service_id, sku_id, period, cost), with
+    0 for a missing service or SKU and for the SKU of service-level series.
+    """
+    if granularity == 'service':
+        source = BillingMonthlyRollup
+        keys = [source.project_id, db.func.coalesce(source.service_id, 0)]
+        columns = keys + [db.literal(0)]
+        cost = source.total_cost
+    elif granularity == 'sku':
+        source = Billing
+        keys = [source.project_id, db.func.coalesce(source.service_id, 0), db.func.coalesce(source.sku_id, 0)]
+        columns = keys
+        cost = source.cost
+    else:
+        raise ValueError(f"Unknown anomaly granularity '{granularity}'")
+
+    return db.session.query(
+        *columns, source.period, db.func.coalesce(db.func.sum(cost), 0),
+    ).filter(
+        source.platform == platform,
+        source.period.between(shift_period(period, -HISTORY_MONTHS), period),
+    ).group_by(*keys, source.period).all()
+
+
+def check_for_series_anomalies(year, month, platform, granularity='service'):
+    """
+    Scores every (project, service) or (project, service, SKU) series of a
+    platform for a month against the median and MAD of its history, recording
+    new anomalies. Returns a summary of the scan.
+    """
+    import numpy as np
+
+    period = to_period(year, month)
+    rows = _series_costs(granularity, platform, period)
+
+    summary = {'platform': platform, 'period': period, 'granularity': granularity,
+               'series_scanned': 0, 'anomalies_found': 0, 'anomalies_created': 0}
+    if not rows:
+        return summary
+
+    columns = list(zip(*rows))
+    keys = np.column_stack([np.array(col, dtype=np.int64) for col in columns[:3]])
+    scanned, flagged_keys, costs, medians = robust_spikes(
+        keys, np.array(columns[3], dtype=np.int64), np.array(columns[4], dtype=float), period,
+    )
+    summary['series_scanned'] = scanned
+    summary['anomalies_found'] = len(flagged_keys)
+    if not len(flagged_keys):
+        return summary
+
+    existing = {tuple(key) for key in db.session.query(
+        Anomaly.project_id, db.func.coalesce(Anomaly.service_id, 0), db.func.coalesce(Anomaly.sku_id, 0),
+    ).filter(
+        Anomaly.platform == platform,
+        Anomaly.period == period,
+        Anomaly.granularity == granularity,
+    )}
+
+    now = datetime.datetime.utcnow()
+    new_anomalies = [
+        {
+            'project_id': int(project_id),
+            'granularity': granularity,
+            'service_id': int(service_id) or None,
+            'sku_id': int(sku_id) or None,
+            'billing_year': year,
+            'billing_month': month,
+            'period': period,
+            'platform': platform,
+            'anomalous_cost': round(float(cost), 2),
+            'average_cost': round(float(median), 2),
+            'is_acknowledged': False,
+            'timestamp': now,
+        }
+        for (project_id, service_id, sku_id), cost, median
+        in zip(flagged_keys.tolist(), costs, medians)
+        if (project_id, service_id, sku_id) not in existing
+    ]
+    if new_anomalies:
+        db.session.execute(Anomaly.__table__.insert(), new_anomalies)
+    db.session.commit()
+
+    summary['anomalies_created'] = len(new_anomalies)
+    return summary
+
+
+def run_anomaly_scan(year, month, platform, job_id=None, granularities=DEFAULT_GRANULARITIES):
+    """
+    Scans a month and platform at each of the given granularities ('project',
+    'service', 'sku') and records the run (duration, projects and series
+    scanned, anomalies found) in `anomaly_scan_runs`. A failing scan is
+    recorded rather than raised. Returns the run.
+    """
+    run = AnomalyScanRun(
+        job_id=job_id,
+        platform=platform,
+        billing_year=year,
+        billing_month=month,
+        status='running',
+        started_at=datetime.datetime.utcnow(),
+    )
+    start = time.perf_counter()
+    try:
+        run.projects_scanned = run.series_scanned = 0
+        run.anomalies_found = run.anomalies_created = 0
+        for granularity in granularities:
+            if granularity == 'project':
+                summary = check_for_anomalies(year, month, platform)
+                run.projects_scanned = summary['projects_scanned']
+            else:
+                summary = check_for_series_anomalies(year, month, platform, granularity)
+                run.series_scanned += summary['series_scanned']
+            run.anomalies_found += summary['anomalies_found']
+            run.anomalies_created += summary['anomalies_created']
+        run.status = 'completed'
+    except Exception as e:
+        logger.exception("Anomaly scan for %s %s %s failed", platform, month, year)
+        db.session.rollback()
+        run.status = 'failed'
+        run.error = str(e)
+
+    run.duration_seconds = time.perf_counter() - start
+    run.finished_at = datetime.datetime.utcnow()
+    db.session.add(run)
+    db.session.commit()
+    return run
@@ -1,7 +1,189 @@
+import datetime
+import threading
+import time
 from functools import wraps
 from flask import request, jsonify, current_app
 import jwt
-from models import User
+from models import db, User, Project, user_project_assignments
+
+# The user behind a token is resolved to a Principal (role, accessible
+# platforms and assigned projects) with a single query, and kept in a
+# per-process cache for PRINCIPAL_CACHE_TTL seconds. Changes made through the
+# user routes invalidate the cached entry in the process that made them;
+# other processes pick them up when their entry expires.
+#
+# With AUTH_STATELESS_TOKENS, login puts the principal into the token itself
+# and requests are authorized from its claims without a query. Every token
+# carries the user's token_version, which is bumped whenever their access
+# changes. Each process keeps the current version of every user in memory,
+# reloaded every TOKEN_VERSIONS_REFRESH seconds with one query, and rejects
+# tokens carrying an older version. Tokens of users it doesn't know yet go
+# through the database path.
+
+TOKEN_LIFETIME = datetime.timedelta(minutes=30)
+
+_lock = threading.Lock()
+_principals = {}
+# Bumped on every invalidation, so a principal loaded before a change isn't
+# cached after it
+_generation = 0
+
+# user id -> current token_version, and when it's next reloaded
+_token_versions = {}
+_token_versions_expire = 0.0
+
+
+class Principal:
+    """The authenticated user as seen by the API routes."""
+
+    __slots__ = ('id', 'username', 'role', 'accessible_platforms', 'project_ids', '_project_names',
+                 'token_version')
+
+    def __init__(self, id, username, role, accessible_platforms=(), project_ids=(), project_names=None,
+                 token_version=1):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.accessible_platforms = tuple(accessible_platforms or ())
+        self.project_ids = frozenset(project_ids)
+        self._project_names = frozenset(project_names) if project_names is not None else None
+        self.token_version = token_version
+
+    @property
+    def project_names(self):
+        """Names of the assigned projects, looked up on first use for principals read from a token."""
+        if self._project_names is None:
+            names = db.session.query(Project.project_name).filter(Project.id.in_(self.project_ids)) \
+                if self.project_ids else []
+            self._project_names = frozenset(name for (name,) in names)
+        return self._project_names
+
+
+def load_principal(user_id):
+    """Reads a user's principal from the database, or returns None if the user doesn't exist."""
+    rows = db.session.query(
+        User.id, User.username, User.role, User.accessible_platforms, User.token_version,
+        Project.id, Project.project_name,
+    ).outerjoin(
+        user_project_assignments, user_project_assignments.c.user_id == User.id,
+    ).outerjoin(
+        Project, Project.id == user_project_assignments.c.project_id,
+    ).filter(User.id == user_id).all()
+    if not rows:
+        return None
+
+    user_id, username, role, platforms, token_version = rows[0][:5]
+    assigned = [(project_id, name) for *_, project_id, name in rows if project_id is not None]
+    return Principal(
+        user_id, username, role, platforms,
+        project_ids=[project_id for project_id, _ in assigned],
+        project_names=[name for _, name in assigned],
+        token_version=token_version,
+    )
+
+
+def get_principal(user_id):
+    """Returns the cached principal for a user, loading it on a miss. None if the user doesn't exist."""
+    now = time.monotonic()
+    with _lock:
+        entry = _principals.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+        generation = _generation
+
+    principal = load_principal(user_id)
+    ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', 0)
+    with _lock:
+        if generation == _generation:
+            if principal is not None and ttl > 0:
+                _principals[user_id] = (now + ttl, principal)
+            if principal is not None:
+                _token_versions[user_id] = principal.token_version
+    return principal
+
+
+def invalidate_principal(user_id):
+    """Drops a user's cached principal and token version, e.g. after their role or projects change."""
+    global _generation
+    with _lock:
+        _principals.pop(user_id, None)
+        _token_versions.pop(user_id, None)
+        _generation += 1
+
+
+def clear_principal_cache():
+    """Drops every cached principal and token version in this process."""
+    global _generation, _token_versions_expire
+    with _lock:
+        _principals.clear()
+        _token_versions.clear()
+        _token_versions_expire = 0.0
+        _generation += 1
+
+
+def revoke_tokens(user):
+    """Bumps a user's token_version so the tokens issued so far are rejected. Commit, then invalidate."""
+    user.token_version = (user.token_version or 1) + 1
+
+
+def issue_token(user):
+    """Signs a login token for a user, carrying the full principal in stateless mode."""
+    claims = {
+        'public_id': user.id,
+        'role': user.role,
+        'ver': user.token_version or 1,
+        'exp': datetime.datetime.utcnow() + TOKEN_LIFETIME,
+    }
+    if current_app.config.get('AUTH_STATELESS_TOKENS'):
+        claims.update({
+            'stateless': True,
+            'username': user.username,
+            'platforms': list(user.accessible_platforms or []),
+            'projects': sorted(p.id for p in user.assigned_projects),
+        })
+    return jwt.encode(claims, current_app.config['SECRET_KEY'], algorithm="HS256")
+
+
+def _current_token_version(user_id):
+    """The user's token_version as last loaded, or None if this process doesn't know the user."""
+    global _token_versions_expire
+    now = time.monotonic()
+    with _lock:
+        if now < _token_versions_expire:
+            return _token_versions.get(user_id)
+        generation = _generation
+
+    versions = dict(db.session.query(User.id, User.token_version).all())
+    refresh = current_app.config.get('TOKEN_VERSIONS_REFRESH', 30)
+    with _lock:
+        if generation == _generation:
+            _token_versions.clear()
+            _token_versions.update(versions)
+            _token_versions_expire = now + refresh
+    return versions.get(user_id)
+
+
+def _principal_from_token(data):
+    """
+    Resolves a token's claims to a principal. Returns None for a revoked
+    token or a user that no longer exists.
+    """
+    user_id, version = data['public_id'], data.get('ver')
+    if data.get('stateless') and current_app.config.get('AUTH_STATELESS_TOKENS'):
+        current_version = _current_token_version(user_id)
+        if current_version is not None:
+            if version != current_version:
+                return None
+            return Principal(
+                user_id, data.get('username'), data['role'], data.get('platforms'),
+                project_ids=data.get('projects', ()), token_version=version,
+            )
+
+    principal = get_principal(user_id)
+    if principal is None or (version is not None and version != principal.token_version):
+        return None
+    return principal
+
 
 def token_required(f):
     @wraps(f)
@@ -13,13 +195,13 @@ def token_required(f):
 
         try:
             data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.filter_by(id=data['public_id']).first()
+            current_user = _principal_from_token(data)
             if not current_user:
-                 return jsonify({'message': 'User not found!'}), 401
+                 return jsonify({'message': 'User not found or token revoked!'}), 401
         except Exception as e:
             return jsonify({'message': f'Token is invalid! {e}'}), 401
-        
-        # Pass the authenticated user object to the route function
+
+        # Pass the authenticated principal to the route function
         return f(current_user, *args, **kwargs)
 
     return decorated
@@ -34,4 +216,3 @@ def role_required(roles):
             return f(current_user, *args, **kwargs)
         return decorated_function
     return decorator
-
@@ -0,0 +1,220 @@
+import datetime
+from sqlalchemy.exc import IntegrityError
+from models import db, Billing, Project, BillingMonthlyRollup, BillingRuleApplied, BillingViewState, Service, Sku
+from services.billing_service import get_rule_applier
+from services.periods import year_range
+
+# Maintains `billing_rule_applied`, the billing line items with business
+# rules already applied. Reads of /api/billing/services become a plain
+# indexed select on this table instead of re-running the rule engine over
+# two years of raw data on every request.
+#
+# Each (platform, year) slice is built the first time it is read and marked
+# in `billing_view_state`. Afterwards only the affected periods are
+# recomputed: the uploaded month after an ingest, and a rule's date range
+# when the rule is created or changed (by a queued job, see
+# services/job_service.py). Rules only look at an item's own
+# fields, so any range of periods can be recomputed independently.
+
+DEFAULT_BATCH_SIZE = 5000
+
+VIEW_COLUMNS = (
+    "billing_id", "is_distributed", "distribution_index", "project_id", "project_name", "billing_year",
+    "billing_month", "period", "platform", "service_id", "sku_id", "type", "cost",
+)
+
+# Order of the view's rows, and the key of a page cursor. Unlike the row id it
+# survives a slice being rebuilt, so paging keeps its place across uploads.
+ORDER_COLUMNS = ("period", "billing_id", "distribution_index")
+
+
+def _raw_batches(platform, first_period, last_period, batch_size):
+    """Yields raw billing items as dicts, in id order, one batch at a time."""
+    last_id = 0
+    while True:
+        rows = db.session.query(Billing, Project.project_name, Service.name, Sku.name)\
+            .join(Project, Billing.project_id == Project.id)\
+            .outerjoin(Service, Billing.service_id == Service.id)\
+            .outerjoin(Sku, Billing.sku_id == Sku.id)\
+            .filter(Billing.platform == platform,
+                    Billing.period.between(first_period, last_period),
+                    Billing.id > last_id)\
+            .order_by(Billing.id)\
+            .limit(batch_size)\
+            .all()
+        if not rows:
+            return
+        last_id = rows[-1].Billing.id
+        yield [{
+            "id": billing.id,
+            "billing_id": billing.id,
+            "project_id": billing.project_id,
+            "project_name": project_name,
+            "billing_year": billing.billing_year,
+            "billing_month": billing.billing_month,
+            "period": billing.period,
+            "platform": billing.platform,
+            # Rules match on service names; the view stores the ids
+            "service_id": billing.service_id,
+            "service_description": service_name,
+            "sku_id": billing.sku_id,
+            "sku_description": sku_name,
+            "type": billing.type,
+            "cost": float(billing.cost),
+        } for billing, project_name, service_name, sku_name in rows]
+
+
+def _rebuild(platform, first_period, last_period, batch_size):
+    """Recomputes one platform's view rows for a period range, without committing."""
+    view = BillingRuleApplied.__table__
+    apply_rules = get_rule_applier()
+    project_map = {name: pid for pid, name in db.session.query(Project.id, Project.project_name)}
+
+    db.session.execute(view.delete().where(
+        view.c.platform == platform,
+        view.c.period.between(first_period, last_period),
+    ))
+
+    for batch in _raw_batches(platform, first_period, last_period, batch_size):
+        rows = []
+        made_from = {}
+        for item in apply_rules(batch, project_map):
+            row = {column: item.get(column) for column in VIEW_COLUMNS}
+            row["is_distributed"] = item["id"] != item["billing_id"]
+            row["distribution_index"] = made_from.get(item["billing_id"], 0)
+            made_from[item["billing_id"]] = row["distribution_index"] + 1
+            rows.append(row)
+        if rows:
+            db.session.execute(view.insert(), rows)
+
+
+def ensure_view_built(platform, year, batch_size=DEFAULT_BATCH_SIZE):
+    """Builds the (platform, year) slice of the view if it hasn't been built yet."""
+    if db.session.get(BillingViewState, (platform, year)):
+        return
+
+    try:
+        db.session.add(BillingViewState(platform=platform, billing_year=year))
+        db.session.flush()
+    except IntegrityError:
+        # Another request is building (or has built) this slice
+        db.session.rollback()
+        return
+
+    first_period, last_period = year_range(year)
+    _rebuild(platform, first_period, last_period, batch_size)
+    db.session.commit()
+
+
+def refresh_view_range(first_period=None, last_period=None, platform=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recomputes the already-built parts of the view that fall within a period
+    range (open-ended when a bound is None), optionally for one platform only.
+    Slices that were never built are left to be built on first read.
+    """
+    states = BillingViewState.query
+    if platform:
+        states = states.filter_by(platform=platform)
+
+    for state in states.all():
+        year_first, year_last = year_range(state.billing_year)
+        low = max(year_first, first_period) if first_period else year_first
+        high = min(year_last, last_period) if last_period else year_last
+        if low > high:
+            continue
+
+        _rebuild(state.platform, low, high, batch_size)
+        state.refreshed_at = datetime.datetime.utcnow()
+        db.session.commit()
+
+
+def mark_view_stale(platform, year):
+    """Forgets that a (platform, year) slice was built, so it is rebuilt on its next read."""
+    db.session.rollback()
+    BillingViewState.query.filter_by(platform=platform, billing_year=year).delete()
+    db.session.commit()
+
+
+def mark_range_stale(first_period=None, last_period=None):
+    """Forgets every built slice overlapping a period range (open-ended when a bound is None)."""
+    db.session.rollback()
+    states = BillingViewState.query
+    if first_period:
+        states = states.filter(BillingViewState.billing_year >= first_period // 100)
+    if last_period:
+        states = states.filter(BillingViewState.billing_year <= last_period // 100)
+    states.delete()
+    db.session.commit()
+
+
+def slices_with_data(first_period, last_period, platform=None):
+    """(platform, year) slices that have billing data within a period range, from the rollup."""
+    rollup = BillingMonthlyRollup
+    query = db.session.query(rollup.platform, rollup.billing_year)\
+        .filter(rollup.period.between(first_period, last_period))
+    if platform:
+        query = query.filter(rollup.platform == platform)
+    return sorted(query.distinct().all())
+
+
+ITEM_FIELDS = (
+    "id", "project_id", "project_name", "billing_year", "billing_month", "platform",
+    "service_description", "sku_description", "type", "cost",
+)
+
+
+DIMENSION_FIELDS = {
+    "service_description": Service.name,
+    "sku_description": Sku.name,
+}
+
+
+def view_query():
+    """Query over the view joined to the service and SKU dimension tables."""
+    return db.session.query(BillingRuleApplied)\
+        .outerjoin(Service, BillingRuleApplied.service_id == Service.id)\
+        .outerjoin(Sku, BillingRuleApplied.sku_id == Sku.id)
+
+
+def view_order():
+    """Columns `view_query` results are ordered by."""
+    return [BillingRuleApplied.__table__.c[name] for name in ORDER_COLUMNS]
+
+
+def after_cursor(cursor):
+    """Condition selecting the view rows after a page cursor. Raises ValueError for a malformed cursor."""
+    key = [int(part) for part in cursor.split(":")]
+    if len(key) != len(ORDER_COLUMNS):
+        raise ValueError(cursor)
+    return db.tuple_(*view_order()) > tuple(key)
+
+
+def cursor_for(row):
+    """Page cursor pointing just after a view row."""
+    return ":".join(str(getattr(row, name)) for name in ORDER_COLUMNS)
+
+
+def view_columns(fields):
+    """Columns of `view_query` needed to produce the given item fields."""
+    view = BillingRuleApplied.__table__
+    names = set(ORDER_COLUMNS)
+    columns = []
+    for field in fields:
+        if field == "id":
+            names.update(("billing_id", "is_distributed", "project_name"))
+        elif field in DIMENSION_FIELDS:
+            columns.append(DIMENSION_FIELDS[field].label(field))
+        else:
+            names.add(field)
+    return [view.c[name] for name in sorted(names)] + columns
+
+
+def view_item(row, fields=ITEM_FIELDS):
+    """Formats a view row the way /api/billing/services has always returned items."""
+    item = {}
+    for field in fields:
+        if field == "id":
+            item["id"] = f"dist-{row.billing_id}-{row.project_name}" if row.is_distributed else row.billing_id
+        else:
+            item[field] = getattr(row, field)
+    return item
@@ -0,0 +1,81 @@
+from models import db, BillingMonthlyRollup, Project, Service
+
+# Multi-dimensional cost report answered from the monthly rollup. One grouped
+# query returns the cost of every combination of the requested dimensions;
+# ROLLUP-style subtotals (each prefix of the dimensions, down to the grand
+# total) are then summed in Python, so every database gets the same result.
+
+UNASSIGNED = 'Unassigned'
+
+# Dimension name -> column it groups by
+DIMENSIONS = {
+    'team': Project.team,
+    'owner': Project.owner,
+    'environment': Project.environment,
+    'platform': BillingMonthlyRollup.platform,
+    'service': Service.name,
+    'month': BillingMonthlyRollup.period,
+}
+
+# Dimensions that can also be used as filters (months are filtered by range)
+FILTERS = ('team', 'owner', 'environment', 'platform', 'service')
+
+
+def _label(dimension, value):
+    if value is None:
+        return UNASSIGNED
+    if dimension == 'month':
+        return f"{value // 100}-{value % 100:02d}"
+    return value
+
+
+def cube_query(dimensions, first_period, last_period, filters=None, scope=None):
+    """
+    Cost per combination of `dimensions` for the periods in range, as rows of
+    (*dimension values, cost). `filters` maps dimension names to the values to
+    keep; 'Unassigned' matches a missing value.
+    """
+    rollup = BillingMonthlyRollup
+    columns = [DIMENSIONS[d] for d in dimensions]
+    query = db.session.query(*columns, db.func.sum(rollup.total_cost))\
+        .join(Project, rollup.project_id == Project.id)\
+        .outerjoin(Service, rollup.service_id == Service.id)\
+        .filter(rollup.period.between(first_period, last_period))
+
+    if scope is not None:
+        query = query.filter(scope.predicate(project_id=rollup.project_id, platform=rollup.platform))
+    for dimension, values in (filters or {}).items():
+        column = DIMENSIONS[dimension]
+        condition = column.in_([v for v in values if v != UNASSIGNED])
+        if UNASSIGNED in values:
+            condition = db.or_(condition, column.is_(None))
+        query = query.filter(condition)
+
+    return query.group_by(*columns).all()
+
+
+def rollup_rows(dimensions, rows, subtotals=True):
+    """
+    Turns (*dimension values, cost) rows into report rows, ordered by
+    dimension values. With `subtotals`, each group is preceded by its
+    subtotal row, in which the dimensions below the group's level are None,
+    and the first row is the grand total. `level` is the number of
+    dimensions a row is grouped by.
+    """
+    depth = len(dimensions)
+    totals = {}
+    for row in rows:
+        key = tuple(_label(d, v) for d, v in zip(dimensions, row[:depth]))
+        cost = float(row[depth] or 0)
+        for level in range(0 if subtotals else depth, depth + 1):
+            totals[key[:level]] = totals.get(key[:level], 0.0) + cost
+
+    output = []
+    for key in sorted(totals):
+        values = key + (None,) * (depth - len(key))
+        output.append({
+            **dict(zip(dimensions, values)),
+            'cost': round(totals[key], 2),
+            'level': len(key),
+        })
+    return output
@@ -0,0 +1,33 @@
+from sqlalchemy.exc import IntegrityError
+from models import db, DataVersion
+
+# Version counters for datasets that caches are derived from. Anything
+# computed from billing data is stored together with the billing version it
+# was computed at, and is valid only while that version is current.
+
+BILLING = 'billing'
+
+
+def current_data_version(name=BILLING):
+    """Current version of a dataset; 0 if it has never changed."""
+    version = db.session.query(DataVersion.version).filter(DataVersion.name == name).scalar()
+    return version or 0
+
+
+def bump_data_version(name=BILLING):
+    """Increments a dataset's version inside the caller's transaction."""
+    versions = DataVersion.__table__
+    bumped = db.session.execute(
+        versions.update().where(versions.c.name == name)
+            .values(version=versions.c.version + 1, updated_at=db.func.now())
+    ).rowcount
+    if bumped:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(versions.insert().values(name=name, version=1, updated_at=db.func.now()))
+    except IntegrityError:
+        # Created concurrently; count this change on top of it
+        db.session.execute(
+            versions.update().where(versions.c.name == name).values(version=versions.c.version + 1)
+        )
@@ -0,0 +1,69 @@
+from sqlalchemy.exc import IntegrityError
+from models import db, Service, Sku
+
+# Service and SKU descriptions repeat on every billing line item, so they are
+# stored once in the `services` and `skus` dimension tables and billing rows
+# carry integer ids. During ingest a `DimensionCache` maps names to ids,
+# looking up or creating only the names it hasn't seen yet, one batch at a time.
+
+
+class DimensionCache:
+    """Get-or-create cache of name -> id for a dimension model (Service or Sku)."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def resolve(self, names):
+        """Makes sure every (non-empty) name has an id, creating missing rows."""
+        missing = {name for name in names if name and name not in self.ids}
+        if not missing:
+            return
+
+        self._load(missing)
+        missing -= self.ids.keys()
+        if not missing:
+            return
+
+        table = self.model.__table__
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert(), [{"name": name} for name in sorted(missing)])
+        except IntegrityError:
+            # Some names were created concurrently by another upload. The
+            # failed insert rolled back all of them, so create the others one
+            # at a time.
+            for name in sorted(missing):
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(table.insert(), [{"name": name}])
+                except IntegrityError:
+                    pass
+        self._load(missing)
+
+        unresolved = missing - self.ids.keys()
+        if unresolved:
+            raise RuntimeError(
+                f"Could not create {self.model.__tablename__} rows for: {', '.join(sorted(unresolved))}"
+            )
+
+    def get(self, name):
+        return self.ids.get(name) if name else None
+
+    def _load(self, names):
+        model = self.model
+        for dimension_id, name in db.session.query(model.id, model.name).filter(model.name.in_(names)):
+            self.ids[name] = dimension_id
+
+
+def service_cache():
+    return DimensionCache(Service)
+
+
+def sku_cache():
+    return DimensionCache(Sku)
+
+
+def service_ids(names):
+    """Subquery of the ids of services with the given names, for filtering billing rows."""
+    return db.select(Service.id).where(Service.name.in_(names))
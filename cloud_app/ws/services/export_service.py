@@ -0,0 +1,143 @@
+from models import db, Billing, Project, BillingRuleApplied, Service, Sku
+
+# Columnar export of billing data as an Apache Arrow IPC stream or Parquet.
+# Rows are read from a database cursor and converted into record batches one
+# batch at a time, so memory stays bounded and the response can be streamed.
+# Costs keep their decimal precision and the repetitive text columns
+# (project, service, SKU, ...) are dictionary encoded.
+#
+# pyarrow is imported lazily so that it is only loaded by processes that
+# actually serve exports.
+
+RAW = "raw"
+RULE_APPLIED = "rule_applied"
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+DEFAULT_BATCH_SIZE = 10000
+
+DICTIONARY_COLUMNS = (
+    "project_name", "billing_month", "platform", "service_description", "sku_description", "type",
+)
+
+
+def _schema(source):
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    if source == RAW:
+        # billing_data.cost is Numeric(10, 2)
+        leading = [("id", pa.int64())]
+        cost = pa.decimal128(10, 2)
+    else:
+        # Distributed costs are fractions of the source cost, keep more places
+        leading = [("billing_id", pa.int64()), ("is_distributed", pa.bool_())]
+        cost = pa.decimal128(18, 6)
+
+    return pa.schema(leading + [
+        ("project_id", pa.int64()),
+        ("project_name", text),
+        ("billing_year", pa.int32()),
+        ("billing_month", text),
+        ("period", pa.int32()),
+        ("platform", text),
+        ("service_description", text),
+        ("sku_description", text),
+        ("type", text),
+        ("cost", cost),
+    ])
+
+
+def export_query(source):
+    """Base query selecting the exported columns, in schema order, for a source."""
+    if source == RAW:
+        return db.session.query(
+            Billing.id, Billing.project_id, Project.project_name, Billing.billing_year,
+            Billing.billing_month, Billing.period, Billing.platform, Service.name, Sku.name,
+            Billing.type, Billing.cost,
+        ).join(Project, Billing.project_id == Project.id)\
+            .outerjoin(Service, Billing.service_id == Service.id)\
+            .outerjoin(Sku, Billing.sku_id == Sku.id)
+
+    view = BillingRuleApplied
+    return db.session.query(
+        view.billing_id, view.is_distributed, view.project_id, view.project_name, view.billing_year,
+        view.billing_month, view.period, view.platform, Service.name, Sku.name, view.type, view.cost,
+    ).outerjoin(Service, view.service_id == Service.id)\
+        .outerjoin(Sku, view.sku_id == Sku.id)
+
+
+def _record_batch(rows, schema):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if field.name in DICTIONARY_COLUMNS:
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        elif field.name == "cost" and field.type.scale == 6:
+            # The view stores floats; round to the decimal's scale before casting
+            floats = pa.array(values, type=pa.float64())
+            arrays.append(pc.cast(pc.round(floats, field.type.scale), field.type, safe=False))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.record_batch(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last call."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export(query, source, file_format, batch_size=DEFAULT_BATCH_SIZE):
+    """Yields the encoded export of `query` (from `export_query`) as chunks of bytes."""
+    import pyarrow as pa
+
+    schema = _schema(source)
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(output, schema)
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+
+    rows = []
+    for row in query.yield_per(batch_size):
+        rows.append(row)
+        if len(rows) >= batch_size:
+            writer.write_batch(_record_batch(rows, schema))
+            rows = []
+            yield sink.take()
+    if rows:
+        writer.write_batch(_record_batch(rows, schema))
+    writer.close()
+    yield sink.take()
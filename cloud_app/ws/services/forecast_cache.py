@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, ForecastCacheEntry
+from services.data_version import BILLING, current_data_version
+
+# Forecasts only change when new billing data is ingested, so they are cached
+# against the billing data version (services/data_version.py), which every
+# upload bumps. Each process keeps an LRU of recent forecasts; with
+# FORECAST_CACHE_SHARED the forecasts are also stored in the `forecast_cache`
+# table so a forecast computed by one gunicorn worker is reused by the others.
+# Entries from an older data version are simply never matched again.
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def _local_get(key):
+    with _lock:
+        if key not in _entries:
+            return False, None
+        _entries.move_to_end(key)
+        return True, _entries[key]
+
+
+def _local_put(key, value, max_entries):
+    with _lock:
+        _entries[key] = value
+        _entries.move_to_end(key)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+
+
+def _shared_get(cache_key, version):
+    entry = db.session.get(ForecastCacheEntry, cache_key)
+    if entry is None or entry.data_version != version:
+        return False, None
+    return True, entry.payload
+
+
+def _shared_put(cache_key, version, value):
+    entry = db.session.get(ForecastCacheEntry, cache_key)
+    if entry is None:
+        entry = ForecastCacheEntry(cache_key=cache_key)
+        db.session.add(entry)
+    entry.data_version = version
+    entry.payload = value
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process stored the same forecast first
+        db.session.rollback()
+
+
+def cached_forecast(cache_key, compute):
+    """
+    Returns the forecast cached under `cache_key` for the current billing data
+    version, calling `compute()` (which must return JSON-serializable data)
+    and caching its result on a miss.
+    """
+    version = current_data_version(BILLING)
+    local_key = (cache_key, version)
+    shared = current_app.config.get('FORECAST_CACHE_SHARED', False)
+
+    found, value = _local_get(local_key)
+    if found:
+        return value
+
+    if shared:
+        found, value = _shared_get(cache_key, version)
+    if not found:
+        value = compute()
+        if shared:
+            _shared_put(cache_key, version, value)
+
+    _local_put(local_key, value, current_app.config.get('FORECAST_CACHE_SIZE', 1024))
+    return value
+
+
+def clear_local_cache():
+    """Empties this process's forecast LRU."""
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,109 @@
+import numpy as np
+from models import db, BillingMonthlyRollup
+from services.forecasters import DEFAULT_ENGINE, get_forecaster
+from services.periods import shift_period, period_month_name
+
+# Batched cost forecasting. Monthly totals for every project are read with a
+# single grouped query on the rollup and arranged into a (projects x months)
+# matrix, which a forecasting engine (services/forecasters.py) fits for all
+# projects at once. The default linear engine gives the same least-squares
+# fit as one regression per project over its last 12 months with data.
+
+HISTORY_LIMIT = 12
+MIN_HISTORY = 3
+HORIZON = 3
+
+
+def monthly_totals(project_ids=None):
+    """
+    Monthly cost per project from the rollup, as three parallel arrays
+    (project ids, periods, costs) sorted by project and then period.
+    """
+    rollup = BillingMonthlyRollup
+    query = db.session.query(
+        rollup.project_id, rollup.period, db.func.sum(rollup.total_cost)
+    )
+    if project_ids is not None:
+        query = query.filter(rollup.project_id.in_(project_ids))
+    rows = query.group_by(rollup.project_id, rollup.period)\
+        .order_by(rollup.project_id, rollup.period)\
+        .all()
+
+    project_col = np.array([r[0] for r in rows], dtype=np.int64)
+    period_col = np.array([r[1] for r in rows], dtype=np.int64)
+    cost_col = np.array([float(r[2]) for r in rows], dtype=float)
+    return project_col, period_col, cost_col
+
+
+def history_matrix(project_col, period_col, cost_col, history_limit=HISTORY_LIMIT, calendar=False):
+    """
+    Arranges sorted monthly totals into a matrix holding each project's last
+    `history_limit` months, oldest first and left-aligned. By default only
+    months with data are kept; with `calendar` every calendar month from the
+    project's first to its last is a column, 0 where it has no cost. Returns
+    (project ids, last period per project, costs, months per project).
+    """
+    project_ids, starts, counts = np.unique(project_col, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(project_ids)), counts)
+    last_rows = starts + counts - 1
+
+    if calendar:
+        months = (period_col // 100) * 12 + period_col % 100
+        spans = months[last_rows] - months[starts] + 1
+        lengths = np.minimum(spans, history_limit)
+        column = months - (months[last_rows] - lengths + 1)[group]
+    else:
+        lengths = np.minimum(counts, history_limit)
+        column = np.arange(len(project_col)) - starts[group] - (counts - lengths)[group]
+    keep = column >= 0
+
+    costs = np.zeros((len(project_ids), lengths.max(initial=0)))
+    costs[group[keep], column[keep]] = cost_col[keep]
+    return project_ids, period_col[last_rows], costs, lengths
+
+
+def forecast_all_projects(project_ids=None, horizon=HORIZON, engine=None):
+    """
+    Forecasts the next `horizon` months for every project with at least
+    MIN_HISTORY months of data, using the named engine (see
+    services/forecasters.py). Projects with too little history for the engine
+    get the linear trend. Returns {project_id: [(period, cost), ...]}.
+    """
+    forecaster = get_forecaster(engine)
+    project_col, period_col, cost_col = monthly_totals(project_ids)
+    if not len(project_col):
+        return {}
+
+    fallback = get_forecaster(DEFAULT_ENGINE)
+    forecasts = {}
+    pending = None
+    for current in (forecaster, fallback) if forecaster is not fallback else (forecaster,):
+        ids, last_periods, costs, lengths = history_matrix(
+            project_col, period_col, cost_col, current.history_limit, current.calendar_history
+        )
+        if pending is None:
+            pending = np.ones(len(ids), dtype=bool)
+        fits = pending & (lengths >= max(current.min_history, MIN_HISTORY))
+        if not fits.any():
+            continue
+        predicted = current.forecast(costs[fits], lengths[fits], horizon)
+        for project_id, last_period, values in zip(ids[fits], last_periods[fits], predicted):
+            forecasts[int(project_id)] = [
+                (shift_period(int(last_period), step + 1), float(value)) for step, value in enumerate(values)
+            ]
+        pending &= ~fits
+
+    # Keep project order stable whichever engine produced the forecast
+    return dict(sorted(forecasts.items()))
+
+
+def aggregate_forecasts(forecasts):
+    """Sums per-project forecasts by month, in the order the months first appear."""
+    totals = {}
+    for points in forecasts.values():
+        for period, cost in points:
+            totals[period] = totals.get(period, 0) + cost
+    return [
+        {'cost': cost, 'year': period // 100, 'month_str': period_month_name(period)}
+        for period, cost in totals.items()
+    ]
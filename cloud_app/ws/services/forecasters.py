@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Forecasting engines. Every engine works on a batch of projects at once: the
+# input is a (projects x months) matrix of monthly costs, oldest first and
+# left-aligned, plus the number of months each row actually holds. Engines
+# return a (projects x horizon) matrix of forecasts, clipped at zero.
+#
+# Engines are chosen per request by name (see FORECASTERS). Each declares the
+# months of history it reads and the minimum it needs; projects with less
+# history than an engine needs are forecast with the linear trend instead.
+# Seasonal engines read calendar-aligned history (`calendar_history`), where
+# a month without costs is a 0; the others read only the months with data.
+
+SEASON_LENGTH = 12
+
+
+class Forecaster(ABC):
+    """Base class for forecasting engines."""
+
+    name = None
+    # Most recent months of history passed to the engine
+    history_limit = 12
+    # Fewest months the engine can fit
+    min_history = 3
+    # Whether column i of the history is always the same calendar month
+    # relative to the last one (missing months filled with 0)
+    calendar_history = False
+
+    @abstractmethod
+    def forecast(self, costs, lengths, horizon):
+        """Forecasts `horizon` months for each row of a (projects x months) cost matrix."""
+
+
+def linear_trend_forecast(costs, lengths, horizon):
+    """
+    Least-squares line through each row's first `lengths[i]` values (at x =
+    0, 1, ...), extrapolated `horizon` steps past the last one and clipped at
+    zero. Every row needs at least two values.
+    """
+    x = np.arange(costs.shape[1], dtype=float)
+    mask = x < lengths[:, None]
+    xs = np.where(mask, x, 0.0)
+    ys = np.where(mask, costs, 0.0)
+
+    n = lengths.astype(float)
+    mean_x = xs.sum(axis=1) / n
+    mean_y = ys.sum(axis=1) / n
+    # Centered sums keep the fit numerically stable
+    sxx = np.where(mask, (xs - mean_x[:, None]) ** 2, 0.0).sum(axis=1)
+    sxy = np.where(mask, (xs - mean_x[:, None]) * (ys - mean_y[:, None]), 0.0).sum(axis=1)
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+
+    future_x = n[:, None] + np.arange(horizon)
+    return np.maximum(intercept[:, None] + slope[:, None] * future_x, 0.0)
+
+
+class LinearForecaster(Forecaster):
+    """Straight-line trend over the last 12 months with data."""
+
+    name = 'linear'
+
+    def forecast(self, costs, lengths, horizon):
+        return linear_trend_forecast(costs, lengths, horizon)
+
+
+class SeasonalNaiveForecaster(Forecaster):
+    """Repeats the cost of the same month one season (a year) earlier."""
+
+    name = 'seasonal_naive'
+    history_limit = SEASON_LENGTH
+    min_history = SEASON_LENGTH
+    calendar_history = True
+
+    def forecast(self, costs, lengths, horizon):
+        rows = np.arange(len(lengths))[:, None]
+        steps = np.arange(horizon)
+        columns = lengths[:, None] - SEASON_LENGTH + steps % SEASON_LENGTH
+        return np.maximum(costs[rows, columns], 0.0)
+
+
+class HoltWintersForecaster(Forecaster):
+    """
+    Additive Holt-Winters exponential smoothing (level, trend and a yearly
+    seasonal component) with fixed smoothing factors. Initialized from the
+    first two seasons, so it needs at least two years of history.
+    """
+
+    name = 'holt_winters'
+    history_limit = 4 * SEASON_LENGTH
+    min_history = 2 * SEASON_LENGTH
+    calendar_history = True
+
+    def __init__(self, alpha=0.3, beta=0.05, gamma=0.2):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+    def forecast(self, costs, lengths, horizon):
+        m = SEASON_LENGTH
+        first = costs[:, :m].mean(axis=1)
+        second = costs[:, m:2 * m].mean(axis=1)
+        trend = (second - first) / m
+        # Seasonal offsets from the detrended first season; the level starts
+        # at the trend line's value for its last month
+        offsets = np.arange(m) - (m - 1) / 2
+        seasonal = costs[:, :m] - (first[:, None] + trend[:, None] * offsets)
+        level = first + trend * (m - 1) / 2
+
+        # Smooth every row through its own months; rows that have run out of
+        # history keep their final state.
+        for t in range(m, costs.shape[1]):
+            active = t < lengths
+            if not active.any():
+                break
+            season = seasonal[:, t % m]
+            new_level = self.alpha * (costs[:, t] - season) + (1 - self.alpha) * (level + trend)
+            new_trend = self.beta * (new_level - level) + (1 - self.beta) * trend
+            new_season = self.gamma * (costs[:, t] - new_level) + (1 - self.gamma) * season
+            level = np.where(active, new_level, level)
+            trend = np.where(active, new_trend, trend)
+            seasonal[:, t % m] = np.where(active, new_season, season)
+
+        steps = np.arange(1, horizon + 1)
+        season_index = (lengths[:, None] + steps - 1) % m
+        seasonal_part = np.take_along_axis(seasonal, season_index, axis=1)
+        return np.maximum(level[:, None] + trend[:, None] * steps + seasonal_part, 0.0)
+
+
+FORECASTERS = {
+    engine.name: engine
+    for engine in (LinearForecaster(), SeasonalNaiveForecaster(), HoltWintersForecaster())
+}
+
+DEFAULT_ENGINE = LinearForecaster.name
+
+
+def get_forecaster(name=None):
+    """Looks up an engine by name. Raises ValueError for unknown names."""
+    try:
+        return FORECASTERS[name or DEFAULT_ENGINE]
+    except KeyError:
+        raise ValueError(f"Unknown forecasting engine '{name}'")
+
+
+def backtest(engine, costs, lengths, horizon):
+    """
+    Holds out the last `horizon` months of each row and forecasts them from
+    the months before (up to the engine's history limit). Returns the rows the
+    engine could fit with their mean absolute error and weighted absolute
+    percentage error (total absolute error over total actual cost; NaN where
+    the held-out costs are all zero).
+    """
+    train_lengths = lengths - horizon
+    rows = np.flatnonzero(train_lengths >= engine.min_history)
+    if not len(rows):
+        return rows, np.empty(0), np.empty(0)
+
+    used = np.minimum(train_lengths[rows], engine.history_limit)
+    start = train_lengths[rows] - used
+    offsets = np.minimum(start[:, None] + np.arange(used.max()), costs.shape[1] - 1)
+    train = np.take_along_axis(costs[rows], offsets, axis=1)
+    predicted = engine.forecast(train, used, horizon)
+
+    actual_index = train_lengths[rows][:, None] + np.arange(horizon)
+    actual = np.take_along_axis(costs[rows], actual_index, axis=1)
+    errors = np.abs(predicted - actual)
+    totals = actual.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wape = np.where(totals > 0, errors.sum(axis=1) / totals, np.nan)
+    return rows, errors.mean(axis=1), wape
@@ -0,0 +1,209 @@
+import csv
+import io
+import logging
+import uuid
+from itertools import islice
+from sqlalchemy import select
+from models import db, Billing, BillingStaging, Project
+from services.data_version import bump_data_version
+from services.dimension_service import service_cache, sku_cache
+from services.periods import to_period
+from services.rollup_service import refresh_monthly_rollup
+from services.billing_view_service import mark_view_stale, refresh_view_range
+
+# Streaming ingestion for billing CSV exports. The upload is decoded
+# incrementally and parsed in fixed-size batches, and every batch is written
+# with a single Core-level executemany INSERT, so memory use depends on the
+# batch size rather than on the size of the file.
+#
+# Rows are first loaded into `billing_staging` under a unique load id. Only
+# once the whole file has been parsed is the month/platform partition of
+# `billing_data` replaced, in one short transaction, so readers never see a
+# half-loaded or empty month.
+#
+# Service and SKU descriptions are stored as ids into the `services` and
+# `skus` dimension tables (see services/dimension_service.py).
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+STAGED_COLUMNS = (
+    "project_id", "billing_year", "billing_month", "period", "platform",
+    "service_id", "sku_id", "type", "cost",
+)
+
+
+def iter_csv_batches(binary_stream, batch_size=DEFAULT_BATCH_SIZE, encoding="utf-8-sig"):
+    """Yields lists of at most `batch_size` CSV rows (as dicts) from a binary stream."""
+    text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline="")
+    try:
+        reader = csv.DictReader(text_stream)
+        while True:
+            batch = list(islice(reader, batch_size))
+            if not batch:
+                break
+            yield batch
+    finally:
+        # Detach so closing the wrapper doesn't close the caller's stream.
+        text_stream.detach()
+
+
+def _resolve_project_ids(batch, project_map, platform, new_project_names):
+    """Creates any projects in the batch that don't exist yet and updates `project_map`."""
+    missing = set()
+    for row in batch:
+        name = row.get("Project name")
+        if name and name not in project_map:
+            missing.add(name)
+
+    if not missing:
+        return
+
+    for name in missing:
+        db.session.add(Project(project_name=name, platform=platform))
+    db.session.flush()
+
+    for project_id, name in db.session.query(Project.id, Project.project_name)\
+            .filter(Project.project_name.in_(missing)):
+        project_map[name] = project_id
+    new_project_names.update(missing)
+
+
+def stage_billing_csv(binary_stream, load_id, platform, year, month,
+                      batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Streams a billing CSV into `billing_staging` under `load_id`.
+    Returns a dict with the number of rows parsed and staged, and the names
+    of any projects created along the way. If given, `progress` is called
+    with the running (rows_parsed, rows_staged) totals after every batch.
+    """
+    staging_table = BillingStaging.__table__
+    period = to_period(year, month)
+    project_map = {name: pid for pid, name in db.session.query(Project.id, Project.project_name)}
+    new_project_names = set()
+    services = service_cache()
+    skus = sku_cache()
+    rows_parsed = 0
+    rows_staged = 0
+
+    for batch in iter_csv_batches(binary_stream, batch_size):
+        rows_parsed += len(batch)
+        _resolve_project_ids(batch, project_map, platform, new_project_names)
+        services.resolve(row.get("Service description") for row in batch)
+        skus.resolve(row.get("SKU description") for row in batch)
+
+        rows = []
+        for row in batch:
+            project_id = project_map.get(row.get("Project name"))
+            if not project_id:
+                continue
+
+            rows.append({
+                "load_id": load_id,
+                "project_id": project_id,
+                "billing_year": year,
+                "billing_month": month,
+                "period": period,
+                "platform": platform,
+                "service_id": services.get(row.get("Service description")),
+                "sku_id": skus.get(row.get("SKU description")),
+                "type": row.get("Credit type"),
+                "cost": float(row.get("Cost ($)", 0.0)),
+            })
+
+        if rows:
+            db.session.execute(staging_table.insert(), rows)
+            rows_staged += len(rows)
+        db.session.commit()
+
+        if progress:
+            progress(rows_parsed, rows_staged)
+
+    return {
+        "rows_parsed": rows_parsed,
+        "rows_staged": rows_staged,
+        "new_projects": sorted(new_project_names),
+    }
+
+
+def swap_staged_month(load_id, platform, year, month):
+    """
+    Replaces the month/platform partition of `billing_data` with the rows
+    staged under `load_id`, refreshes its monthly rollup and bumps the billing
+    data version, in a single transaction.
+    """
+    billing_table = Billing.__table__
+    staging_table = BillingStaging.__table__
+
+    try:
+        db.session.execute(billing_table.delete().where(
+            billing_table.c.platform == platform,
+            billing_table.c.period == to_period(year, month),
+        ))
+        db.session.execute(billing_table.insert().from_select(
+            STAGED_COLUMNS,
+            select(*[staging_table.c[name] for name in STAGED_COLUMNS])
+                .where(staging_table.c.load_id == load_id),
+        ))
+        db.session.execute(staging_table.delete().where(staging_table.c.load_id == load_id))
+        refresh_monthly_rollup(platform, to_period(year, month))
+        bump_data_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def discard_staged_load(load_id):
+    """Removes whatever was staged under `load_id` by a failed upload."""
+    staging_table = BillingStaging.__table__
+    db.session.rollback()
+    db.session.execute(staging_table.delete().where(staging_table.c.load_id == load_id))
+    db.session.commit()
+
+
+def ingest_billing_csv(binary_stream, platform, year, month,
+                       batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Loads a billing CSV for the given month and platform, replacing any data
+    previously uploaded for that month only if the whole file parses, then
+    refreshes that month of the rule-applied view. An empty file leaves the
+    existing month untouched; a file none of whose rows can be stored (e.g.
+    none has a project name) is refused with a ValueError. Once the month is
+    swapped in the upload has succeeded: if the view refresh fails, the view
+    slice is left to be rebuilt on its next read and the failure is returned
+    in `warnings`.
+    """
+    load_id = str(uuid.uuid4())
+    try:
+        result = stage_billing_csv(
+            binary_stream, load_id, platform, year, month, batch_size, progress
+        )
+        if result["rows_parsed"] and not result["rows_staged"]:
+            raise ValueError(
+                f"None of the {result['rows_parsed']} rows has a project name; "
+                f"the existing {month} {year} data was left unchanged"
+            )
+        if result["rows_staged"]:
+            swap_staged_month(load_id, platform, year, month)
+    except Exception:
+        discard_staged_load(load_id)
+        raise
+
+    warnings = []
+    if result["rows_staged"]:
+        period = to_period(year, month)
+        try:
+            refresh_view_range(period, period, platform=platform, batch_size=batch_size)
+        except Exception as e:
+            logger.exception("Refreshing the billing view for %s %s %s failed", platform, month, year)
+            mark_view_stale(platform, year)
+            warnings.append(f"Billing view not refreshed, it will be rebuilt on its next read: {e}")
+
+    return {
+        "rows_parsed": result["rows_parsed"],
+        "rows_inserted": result["rows_staged"],
+        "new_projects": result["new_projects"],
+        "warnings": warnings,
+    }
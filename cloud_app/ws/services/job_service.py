@@ -0,0 +1,287 @@
+import datetime
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from flask import current_app
+from models import db, IngestJob
+from services.anomaly_service import DEFAULT_GRANULARITIES, run_anomaly_scan
+from services.billing_view_service import mark_range_stale, refresh_view_range
+from services.ingest_service import ingest_billing_csv
+
+# Background processing for billing uploads. The upload endpoint only stores
+# the file and inserts a row into `ingest_jobs`; a small pool of worker
+# threads claims queued jobs from that table and runs the ingestion. Because
+# the queue lives in the application database, no external broker is needed
+# and every gunicorn worker can safely run its own pool: a job is claimed
+# with a conditional UPDATE, so only one worker ever processes it.
+#
+# Every claim bumps the job's `attempts`, and the worker writes progress and
+# the final status only where `attempts` still matches its own claim. While
+# the job runs, a heartbeat thread keeps `updated_at` fresh (also through the
+# month swap, the view refresh and the anomaly scan, which report no
+# progress), so a job is only reclaimed once its worker is really gone. A
+# worker whose job was reclaimed anyway stops at its next progress report
+# and leaves the job to the new owner.
+#
+# Once a job's data is in, the same worker scans the uploaded month and
+# platform for cost anomalies (see services/anomaly_service.py).
+#
+# The same queue runs 'view_refresh' jobs, which recompute the rule-applied
+# billing view over a period range after a business rule changed. That can
+# mean every built year of every platform, far too long for the request.
+
+logger = logging.getLogger(__name__)
+
+_wake_event = threading.Event()
+_workers = []
+
+
+class JobReclaimed(Exception):
+    """Raised when another worker has claimed the job this worker was running."""
+
+
+def enqueue_ingest_job(file_storage, platform, year, month, user, upload_dir):
+    """Saves the uploaded file and queues it for ingestion. Returns the new job."""
+    os.makedirs(upload_dir, exist_ok=True)
+    job_id = str(uuid.uuid4())
+    file_path = os.path.abspath(os.path.join(upload_dir, f"{job_id}.csv"))
+    file_storage.save(file_path)
+
+    job = IngestJob(
+        id=job_id,
+        status='queued',
+        platform=platform,
+        billing_year=year,
+        billing_month=month,
+        file_path=file_path,
+        created_by=user.id if user else None,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _wake_event.set()
+    return job
+
+
+def enqueue_view_refresh_job(first_period, last_period, user):
+    """Queues a recompute of the rule-applied view over a period range. Returns the new job."""
+    job = IngestJob(
+        id=str(uuid.uuid4()),
+        kind='view_refresh',
+        status='queued',
+        first_period=first_period,
+        last_period=last_period,
+        created_by=user.id if user else None,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _wake_event.set()
+    return job
+
+
+def claim_next_job(stale_after_seconds):
+    """
+    Atomically claims the oldest queued job, or a running job whose worker
+    stopped reporting progress. Returns the job, or None if there is nothing to do.
+    """
+    jobs = IngestJob.__table__
+    now = datetime.datetime.utcnow()
+    stale_cutoff = now - datetime.timedelta(seconds=stale_after_seconds)
+    claimable = db.or_(
+        jobs.c.status == 'queued',
+        db.and_(jobs.c.status == 'running', jobs.c.updated_at < stale_cutoff),
+    )
+
+    candidate_ids = db.session.execute(
+        db.select(jobs.c.id).where(claimable).order_by(jobs.c.created_at).limit(5)
+    ).scalars().all()
+
+    for job_id in candidate_ids:
+        claimed = db.session.execute(
+            jobs.update()
+                .where(jobs.c.id == job_id, claimable)
+                .values(status='running', started_at=now, updated_at=now, attempts=jobs.c.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(IngestJob, job_id)
+    return None
+
+
+def _owned(job):
+    """Condition matching the job only while the claim `job` was loaded with is still current."""
+    jobs = IngestJob.__table__
+    return db.and_(jobs.c.id == job.id, jobs.c.attempts == job.attempts)
+
+
+def touch_job(job):
+    """Refreshes a claimed job's updated_at on a separate connection. False if it was reclaimed."""
+    jobs = IngestJob.__table__
+    with db.engine.begin() as connection:
+        return connection.execute(
+            jobs.update().where(_owned(job)).values(updated_at=datetime.datetime.utcnow())
+        ).rowcount == 1
+
+
+@contextmanager
+def _heartbeat(job, interval):
+    """Touches the job every `interval` seconds until the block exits."""
+    app = current_app._get_current_object()
+    stop = threading.Event()
+
+    def beat():
+        with app.app_context():
+            while not stop.wait(interval):
+                try:
+                    if not touch_job(job):
+                        return
+                except Exception:
+                    logger.exception("Heartbeat for ingest job %s failed", job.id)
+
+    thread = threading.Thread(target=beat, name=f"ingest-heartbeat-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _finish_job(job, outcome):
+    """Records a job's outcome. False if another worker reclaimed the job meanwhile."""
+    jobs = IngestJob.__table__
+    now = datetime.datetime.utcnow()
+    finished = db.session.execute(
+        jobs.update().where(_owned(job)).values(finished_at=now, updated_at=now, **outcome)
+    ).rowcount
+    db.session.commit()
+    if not finished:
+        logger.warning("Ingest job %s was reclaimed by another worker", job.id)
+    return bool(finished)
+
+
+def run_ingest_job(job, batch_size, scan_anomalies=True, anomaly_granularities=DEFAULT_GRANULARITIES,
+                   heartbeat_seconds=60):
+    """
+    Runs the ingestion for a claimed job, recording progress as it goes, then
+    (if `scan_anomalies`) scans the uploaded month for anomalies at the given
+    granularities. If another worker reclaims the job meanwhile, stops
+    without touching it and returns None.
+    """
+    jobs = IngestJob.__table__
+
+    def report_progress(rows_parsed, rows_staged):
+        updated = db.session.execute(jobs.update().where(_owned(job)).values(
+            rows_parsed=rows_parsed,
+            rows_inserted=rows_staged,
+            updated_at=datetime.datetime.utcnow(),
+        )).rowcount
+        db.session.commit()
+        if not updated:
+            raise JobReclaimed(job.id)
+
+    with _heartbeat(job, heartbeat_seconds):
+        try:
+            with open(job.file_path, 'rb') as f:
+                result = ingest_billing_csv(
+                    f,
+                    platform=job.platform,
+                    year=job.billing_year,
+                    month=job.billing_month,
+                    batch_size=batch_size,
+                    progress=report_progress,
+                )
+            outcome = {
+                'status': 'completed',
+                'rows_parsed': result['rows_parsed'],
+                'rows_inserted': result['rows_inserted'],
+                'new_projects': result['new_projects'],
+                'warnings': result['warnings'] or None,
+            }
+        except JobReclaimed:
+            logger.warning("Ingest job %s was reclaimed by another worker", job.id)
+            return None
+        except Exception as e:
+            logger.exception("Ingest job %s failed", job.id)
+            db.session.rollback()
+            outcome = {'status': 'failed', 'error': str(e)}
+
+        if not _finish_job(job, outcome):
+            return None
+
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+
+        job = db.session.get(IngestJob, job.id, populate_existing=True)
+        if scan_anomalies and job.status == 'completed' and job.rows_parsed:
+            run_anomaly_scan(job.billing_year, job.billing_month, job.platform, job_id=job.id,
+                             granularities=anomaly_granularities)
+    return job
+
+
+def run_view_refresh_job(job, batch_size, heartbeat_seconds=60):
+    """
+    Recomputes the rule-applied view over a claimed refresh job's period
+    range. If the refresh fails, the slices it covers are rebuilt on their
+    next read instead of serving rows made with the old rules. Returns None
+    if another worker reclaimed the job meanwhile.
+    """
+    with _heartbeat(job, heartbeat_seconds):
+        try:
+            refresh_view_range(job.first_period, job.last_period, batch_size=batch_size)
+            outcome = {'status': 'completed'}
+        except Exception as e:
+            logger.exception("View refresh job %s failed", job.id)
+            mark_range_stale(job.first_period, job.last_period)
+            outcome = {'status': 'failed', 'error': str(e)}
+
+        if not _finish_job(job, outcome):
+            return None
+    return db.session.get(IngestJob, job.id, populate_existing=True)
+
+
+def process_next_job(app):
+    """Claims and runs a single job. Returns True if a job was processed."""
+    with app.app_context():
+        job = claim_next_job(app.config['INGEST_JOB_STALE_SECONDS'])
+        if not job:
+            return False
+        if job.kind == 'view_refresh':
+            run_view_refresh_job(job, app.config['INGEST_BATCH_SIZE'], app.config['INGEST_JOB_HEARTBEAT_SECONDS'])
+        else:
+            run_ingest_job(job, app.config['INGEST_BATCH_SIZE'], app.config['ANOMALY_SCAN_AFTER_INGEST'],
+                           app.config['ANOMALY_SCAN_GRANULARITIES'], app.config['INGEST_JOB_HEARTBEAT_SECONDS'])
+        return True
+
+
+def _worker_loop(app, poll_interval):
+    while True:
+        try:
+            if process_next_job(app):
+                continue
+        except Exception:
+            logger.exception("Ingest worker iteration failed")
+        # Woken early by uploads to this process; the timeout picks up jobs
+        # queued through other processes.
+        _wake_event.wait(poll_interval)
+        _wake_event.clear()
+
+
+def start_ingest_workers(app):
+    """Starts the configured number of daemon worker threads for this process."""
+    if _workers:
+        return
+    for i in range(app.config['INGEST_WORKERS']):
+        worker = threading.Thread(
+            target=_worker_loop,
+            args=(app, app.config['INGEST_POLL_INTERVAL']),
+            name=f"ingest-worker-{i}",
+            daemon=True,
+        )
+        worker.start()
+        _workers.append(worker)
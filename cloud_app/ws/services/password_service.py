@@ -0,0 +1,159 @@
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows: slots are limited per process only
+    fcntl = None
+
+# Password hashing is deliberately slow, so the number of hashes running at
+# once is capped for all app processes on the host together: each hash holds
+# one of PASSWORD_HASH_WORKERS slots, which are lock files in
+# PASSWORD_HASH_LOCK_DIR taken with flock. A request that can't get a slot
+# within PASSWORD_HASH_WAIT_SECONDS fails with PasswordPoolBusy (a 503), so
+# during a login storm password work takes at most that many cores, and the
+# logins beyond it give their gunicorn worker back quickly instead of
+# holding it while queueing for CPU. 0 slots disables the limit.
+#
+# The hash method and cost come from PASSWORD_HASH_METHOD, in werkzeug's
+# format (e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"). Hashes made
+# with another method keep working and are upgraded at the next login.
+
+# How often a waiting request retries the slots
+SLOT_POLL_SECONDS = 0.01
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when no password hashing slot frees up in time."""
+
+
+_lock = threading.Lock()
+# Fallback slots when flock isn't available: (slot count, semaphore)
+_local_slots = None
+
+
+def _try_lock_file(directory, index):
+    fd = os.open(os.path.join(directory, f"slot-{index}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _acquire_slot(slots, deadline):
+    """Takes a free slot, waiting until `deadline`. Returns a release callback, or None on timeout."""
+    global _local_slots
+    if fcntl is None:
+        with _lock:
+            if _local_slots is None or _local_slots[0] != slots:
+                _local_slots = (slots, threading.BoundedSemaphore(slots))
+            semaphore = _local_slots[1]
+        if not semaphore.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            return None
+        return semaphore.release
+
+    directory = current_app.config['PASSWORD_HASH_LOCK_DIR']
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        for index in range(slots):
+            fd = _try_lock_file(directory, index)
+            if fd is not None:
+                return lambda: os.close(fd)  # closing the file releases the lock
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(SLOT_POLL_SECONDS)
+
+
+@contextmanager
+def hash_slot():
+    """
+    Holds one of the host's password hashing slots for the duration of the
+    block. Raises PasswordPoolBusy if none frees up within
+    PASSWORD_HASH_WAIT_SECONDS.
+    """
+    slots = current_app.config['PASSWORD_HASH_WORKERS']
+    if slots <= 0:
+        yield
+        return
+
+    release = _acquire_slot(slots, time.monotonic() + current_app.config['PASSWORD_HASH_WAIT_SECONDS'])
+    if release is None:
+        raise PasswordPoolBusy("Too many password checks in progress")
+    try:
+        yield
+    finally:
+        release()
+
+
+def hash_password(password):
+    """Hashes a password with the configured method."""
+    with hash_slot():
+        return generate_password_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(password_hash, password):
+    """Checks a password against its stored hash."""
+    with hash_slot():
+        return check_password_hash(password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # werkzeug fills in default parameters ("scrypt" is stored as
+    # "scrypt:32768:8:1"), so compare against a hash it actually made
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with a method or cost other than the configured one."""
+    return password_hash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+class LoginMetrics:
+    """Login counts and recent latencies for this process."""
+
+    OUTCOMES = ('succeeded', 'failed', 'rejected')
+
+    def __init__(self, window_seconds=60, samples=1000):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.OUTCOMES, 0)
+        # (finished at, seconds taken) of the most recent logins
+        self._recent = deque(maxlen=samples)
+
+    def record(self, outcome, seconds):
+        with self._lock:
+            self._counts[outcome] += 1
+            self._recent.append((time.monotonic(), seconds))
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+            recent = list(self._recent)
+
+        since = time.monotonic() - self.window_seconds
+        in_window = sorted(seconds for finished, seconds in recent if finished >= since)
+
+        def percentile(q):
+            return round(in_window[min(int(q * len(in_window)), len(in_window) - 1)] * 1000, 1) \
+                if in_window else None
+
+        return {
+            **counts,
+            'window_seconds': self.window_seconds,
+            'logins_in_window': len(in_window),
+            'logins_per_second': round(len(in_window) / self.window_seconds, 3),
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)},
+        }
+
+
+login_metrics = LoginMetrics()
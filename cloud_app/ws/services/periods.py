@@ -0,0 +1,66 @@
+# Helpers for billing periods. Months are stored as short names ('jan') in
+# the original columns; every table also carries an integer `period` in
+# YYYYMM form so that ordering and range filters ("last 12 months", "Q3")
+# are simple indexed comparisons.
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+QUARTERS = {
+    'Q1': (1, 3),
+    'Q2': (4, 6),
+    'Q3': (7, 9),
+    'Q4': (10, 12),
+}
+
+
+def month_number(month):
+    """Returns 1-12 for a month name like 'jan' (case-insensitive). Raises ValueError otherwise."""
+    return MONTHS.index(month.lower()) + 1
+
+
+def to_period(year, month):
+    """Builds a YYYYMM period from a year and a month name or number."""
+    month_num = month if isinstance(month, int) else month_number(month)
+    return int(year) * 100 + month_num
+
+
+def split_period(period):
+    """Returns the (year, month number) of a YYYYMM period."""
+    return period // 100, period % 100
+
+
+def period_month_name(period):
+    return MONTHS[period % 100 - 1]
+
+
+def shift_period(period, months):
+    """Moves a period forwards (or backwards, if negative) by a number of months."""
+    year, month = split_period(period)
+    index = year * 12 + (month - 1) + months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def year_range(year):
+    """Returns the first and last period of a year."""
+    return year * 100 + 1, year * 100 + 12
+
+
+def quarter_range(year, quarter):
+    """Returns the first and last period of a quarter such as 'Q2'."""
+    first, last = QUARTERS[quarter]
+    return year * 100 + first, year * 100 + last
+
+
+def period_from_date(d):
+    return d.year * 100 + d.month
+
+
+def parse_period(text):
+    """Parses 'YYYY-MM' (or 'YYYYMM') into a period. Raises ValueError if malformed."""
+    year, _, month = text.strip().partition('-')
+    if not month:
+        year, month = text[:4], text[4:]
+    month = int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month in period '{text}'")
+    return int(year) * 100 + month
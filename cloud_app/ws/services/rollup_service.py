@@ -0,0 +1,49 @@
+from models import db, Billing, BillingMonthlyRollup
+
+# Maintains `billing_monthly_rollup`, the per (project, platform, period,
+# service) cost totals that reports, forecasting, anomaly detection and the
+# project detail page read instead of re-summing raw SKU line items.
+
+ROLLUP_COLUMNS = (
+    "project_id", "platform", "period", "billing_year", "billing_month",
+    "service_id", "total_cost", "line_items",
+)
+
+
+def rollup_select(*criteria):
+    """SELECT producing rollup rows from `billing_data` rows matching `criteria`."""
+    billing = Billing.__table__
+    return db.select(
+        billing.c.project_id,
+        billing.c.platform,
+        billing.c.period,
+        billing.c.billing_year,
+        billing.c.billing_month,
+        billing.c.service_id,
+        db.func.coalesce(db.func.sum(billing.c.cost), 0),
+        db.func.count(),
+    ).where(*criteria).group_by(
+        billing.c.project_id,
+        billing.c.platform,
+        billing.c.period,
+        billing.c.billing_year,
+        billing.c.billing_month,
+        billing.c.service_id,
+    )
+
+
+def refresh_monthly_rollup(platform, period):
+    """
+    Rebuilds the rollup rows for one month of one platform. Runs inside the
+    caller's transaction so the rollup changes together with `billing_data`.
+    """
+    billing = Billing.__table__
+    rollup = BillingMonthlyRollup.__table__
+    db.session.execute(rollup.delete().where(
+        rollup.c.platform == platform,
+        rollup.c.period == period,
+    ))
+    db.session.execute(rollup.insert().from_select(
+        ROLLUP_COLUMNS,
+        rollup_select(billing.c.platform == platform, billing.c.period == period),
+    ))
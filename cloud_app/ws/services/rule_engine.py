@@ -0,0 +1,272 @@
+from datetime import date
+from services.periods import MONTHS, period_from_date, shift_period
+
+# Compiled execution of business rules. Instead of testing every billing item
+# against every rule, the active rules are compiled once into dictionaries
+# keyed by the project name they act on, with each rule's date range turned
+# into an inclusive YYYYMM interval. Routing an item is then a dictionary
+# lookup, and because billing data repeats the same (project, service, month)
+# combinations many times over, the outcome of each combination is memoized.
+#
+# The results are identical to `apply_rules_reference`, the original
+# row-by-rule loop, which is kept for differential tests and benchmarks.
+
+RENAME_PROJECT = 'RENAME_PROJECT'
+MOVE_SERVICE = 'MOVE_SERVICE'
+DISTRIBUTE_COST = 'DISTRIBUTE_COST'
+
+
+def _period_bounds(rule):
+    """
+    Converts a rule's start and end dates into the first and last period it
+    covers (None when open-ended). Items are dated to the 1st of their month,
+    so a rule starting mid-month only covers the following months.
+    """
+    low = high = None
+    if rule.start_date:
+        low = period_from_date(rule.start_date)
+        if rule.start_date.day > 1:
+            low = shift_period(low, 1)
+    if rule.end_date:
+        high = period_from_date(rule.end_date)
+    return low, high
+
+
+def _in_range(period, low, high):
+    return (low is None or period >= low) and (high is None or period <= high)
+
+
+def _as_set(values):
+    try:
+        return frozenset(values)
+    except TypeError:
+        return values
+
+
+class CompiledRules:
+    """Active business rules compiled into lookup tables. Build with `compile_rules`."""
+
+    def __init__(self, rules):
+        self.renames = {}
+        self.moves = {}
+        self.distributions = {}
+        self.distribute_count = 0
+
+        for order, rule in enumerate(rules):
+            config = rule.config or {}
+            low, high = _period_bounds(rule)
+
+            if rule.rule_type == RENAME_PROJECT:
+                self.renames.setdefault(config.get('source_project_name'), []).append(
+                    (order, low, high, config.get('new_project_name'))
+                )
+            elif rule.rule_type == MOVE_SERVICE:
+                self.moves.setdefault(config.get('from_project'), []).append(
+                    (order, low, high, _as_set(config.get('services', [])), config.get('to_project'))
+                )
+            elif rule.rule_type == DISTRIBUTE_COST:
+                self.distributions.setdefault(config.get('source_project'), []).append(
+                    (self.distribute_count, low, high, list(config.get('target_project_names', [])))
+                )
+                self.distribute_count += 1
+
+        self._periods = {}
+        self._routes = {}
+        self._buckets = {}
+
+    def _period(self, year, month):
+        key = (year, month)
+        if key not in self._periods:
+            try:
+                month_index = MONTHS.index(month)
+                date(year, month_index + 1, 1)
+                self._periods[key] = year * 100 + month_index + 1
+            except (ValueError, TypeError):
+                self._periods[key] = None
+        return self._periods[key]
+
+    def _route(self, name, service, period):
+        """Returns (matched, final project name) after rename and move rules."""
+        key = (name, service, period)
+        if key in self._routes:
+            return self._routes[key]
+
+        matched = False
+        # Rules apply in order and may chain (A -> B, then B -> C), so each
+        # step only considers rules positioned after the last one applied.
+        position = -1
+        while True:
+            for order, low, high, new_name in self.renames.get(name, ()):
+                if order > position and _in_range(period, low, high):
+                    name, position, matched = new_name, order, True
+                    break
+            else:
+                break
+
+        position = -1
+        while True:
+            for order, low, high, services, to_project in self.moves.get(name, ()):
+                if order > position and _in_range(period, low, high) and service in services:
+                    name, position, matched = to_project, order, True
+                    break
+            else:
+                break
+
+        self._routes[key] = (matched, name)
+        return matched, name
+
+    def _bucket(self, name, period):
+        """Index of the first distribution rule that claims an item, or None."""
+        key = (name, period)
+        if key not in self._buckets:
+            self._buckets[key] = None
+            for index, low, high, _ in self.distributions.get(name, ()):
+                if _in_range(period, low, high):
+                    self._buckets[key] = index
+                    break
+        return self._buckets[key]
+
+    def apply(self, data, project_map):
+        """Applies the rules to a list of billing item dicts, returning a new list."""
+        targets = [None] * self.distribute_count
+        for rules in self.distributions.values():
+            for index, _, _, target_names in rules:
+                targets[index] = target_names
+
+        buckets = [[] for _ in range(self.distribute_count)]
+        remaining = []
+
+        for item in data:
+            period = self._period(item.get('billing_year'), item.get('billing_month'))
+            if period is None:
+                remaining.append(item)
+                continue
+
+            matched, name = self._route(item.get('project_name'), item.get('service_description'), period)
+            if matched:
+                item = item.copy()
+                item['project_name'] = name
+
+            bucket = self._bucket(name, period) if self.distributions else None
+            if bucket is None:
+                remaining.append(item)
+            else:
+                buckets[bucket].append(item)
+
+        final_data = []
+        for index, items in enumerate(buckets):
+            target_names = targets[index]
+            if not target_names:
+                continue
+            num_targets = len(target_names)
+            for source_item in items:
+                cost_per_target = source_item.get('cost', 0) / num_targets
+                source_id = source_item.get('id', '')
+                for target_name in target_names:
+                    new_item = source_item.copy()
+                    new_item['project_name'] = target_name
+                    new_item['cost'] = cost_per_target
+                    new_item['id'] = f"dist-{source_id}-{target_name}"
+                    new_item['project_id'] = project_map.get(target_name)
+                    final_data.append(new_item)
+
+        final_data.extend(remaining)
+        return final_data
+
+
+def compile_rules(rules):
+    """Compiles business rules (ordered by precedence) into a `CompiledRules`."""
+    return CompiledRules(rules)
+
+
+def apply_rules_reference(data, rules, project_map):
+    """
+    The original row-by-rule implementation of the rule engine. Kept as the
+    reference for differential tests and benchmarks; not used to serve requests.
+    """
+    if not data:
+        return []
+    if not rules:
+        return data
+
+    rename_rules = [r for r in rules if r.rule_type == RENAME_PROJECT]
+    move_rules = [r for r in rules if r.rule_type == MOVE_SERVICE]
+    distribute_rules = [r for r in rules if r.rule_type == DISTRIBUTE_COST]
+
+    initial_transformed_data = []
+    for item in data:
+        processed_item = item.copy()
+
+        try:
+            item_month_index = MONTHS.index(item.get('billing_month'))
+            item_date = date(item.get('billing_year'), item_month_index + 1, 1)
+        except (ValueError, TypeError):
+            initial_transformed_data.append(processed_item)
+            continue
+
+        for rule in rename_rules:
+            if (rule.start_date and item_date < rule.start_date) or \
+               (rule.end_date and item_date > rule.end_date):
+                continue
+
+            config = rule.config
+            if processed_item.get('project_name') == config.get('source_project_name'):
+                processed_item['project_name'] = config.get('new_project_name')
+
+        for rule in move_rules:
+            if (rule.start_date and item_date < rule.start_date) or \
+               (rule.end_date and item_date > rule.end_date):
+                continue
+
+            config = rule.config
+            if (processed_item.get('project_name') == config.get('from_project') and
+                processed_item.get('service_description') in config.get('services', [])):
+                processed_item['project_name'] = config.get('to_project')
+
+        initial_transformed_data.append(processed_item)
+
+    final_data = []
+    for rule in distribute_rules:
+        config = rule.config
+        source_project = config.get('source_project')
+        target_project_names = config.get('target_project_names', [])
+
+        items_from_this_source = []
+        remaining_items = []
+
+        for item in initial_transformed_data:
+            try:
+                item_month_index = MONTHS.index(item.get('billing_month'))
+                item_date = date(item.get('billing_year'), item_month_index + 1, 1)
+            except (ValueError, TypeError):
+                remaining_items.append(item)
+                continue
+
+            if (rule.start_date and item_date < rule.start_date) or \
+               (rule.end_date and item_date > rule.end_date):
+                remaining_items.append(item)
+                continue
+
+            if item.get('project_name') == source_project:
+                items_from_this_source.append(item)
+            else:
+                remaining_items.append(item)
+
+        num_targets = len(target_project_names)
+        if num_targets > 0:
+            for source_item in items_from_this_source:
+                cost_per_target = source_item.get('cost', 0) / num_targets
+                for target_name in target_project_names:
+                    new_item = source_item.copy()
+                    new_item['project_name'] = target_name
+                    new_item['cost'] = cost_per_target
+                    new_item['id'] = f"dist-{source_item.get('id', '')}-{target_name}"
+                    new_item['project_id'] = project_map.get(target_name)
+
+                    final_data.append(new_item)
+
+        initial_transformed_data = remaining_items
+
+    final_data.extend(initial_transformed_data)
+
+    return final_data
@@ -0,0 +1,120 @@
+import io
+import sys
+import os
+from contextlib import contextmanager
+import pytest
+
+# Add the project root to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import jwt
+from flask import Flask
+from sqlalchemy import event
+from config import Config
+from models import db, User
+from routes.users import users_bp
+from routes.billing import billing_bp
+from routes.projects import projects_bp
+from routes.budgets import budgets_bp
+from routes.forecasting import forecasting_bp
+from routes.anomalies import anomalies_bp
+from routes.business_rules import business_rules_bp
+from routes.reports import reports_bp
+from services.auth_service import clear_principal_cache
+from services.forecast_cache import clear_local_cache
+from services.ingest_service import ingest_billing_csv
+from services.password_service import hash_password
+
+CSV_HEADER = "Project name,Service description,SKU description,Credit type,Cost ($)\n"
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A Flask app bound to a throwaway SQLite database with all tables created."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY="test-secret-key-long-enough-for-hs256",
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+    )
+    db.init_app(app)
+
+    for blueprint in (users_bp, billing_bp, projects_bp, budgets_bp, forecasting_bp,
+                      anomalies_bp, business_rules_bp, reports_bp):
+        app.register_blueprint(blueprint)
+
+    # Cached forecasts are keyed by data version and principals by user id,
+    # which both restart with every database
+    clear_local_cache()
+    clear_principal_cache()
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Creates a user and returns (user, request headers carrying a valid token)."""
+    def _make_user(username="admin", role="superadmin", platforms=("GCP", "AWS"), projects=()):
+        user = User(username=username, email=f"{username}@example.com", role=role,
+                    accessible_platforms=list(platforms))
+        user.password_hash = hash_password("secret")
+        user.assigned_projects = list(projects)
+        db.session.add(user)
+        db.session.commit()
+        token = jwt.encode({'public_id': user.id, 'role': user.role},
+                           app.config['SECRET_KEY'], algorithm="HS256")
+        return user, {'x-access-token': token}
+    return _make_user
+
+
+@pytest.fixture
+def billing_csv():
+    """
+    Builds an uploaded billing CSV from its rows: a string of CSV lines, or
+    (project, service, sku, cost) tuples.
+    """
+    def _billing_csv(rows):
+        body = rows if isinstance(rows, str) else "".join(f"{p},{s},{k},,{c}\n" for p, s, k, c in rows)
+        return io.BytesIO((CSV_HEADER + body).encode("utf-8"))
+    return _billing_csv
+
+
+@pytest.fixture
+def upload(app, billing_csv):
+    """Ingests billing CSV rows (see billing_csv) for a month; keyword options go to ingest_billing_csv."""
+    def _upload(month, rows, year=2025, platform="GCP", **options):
+        return ingest_billing_csv(billing_csv(rows), platform=platform, year=year, month=month, **options)
+    return _upload
+
+
+@pytest.fixture
+def sql_statements(app):
+    """
+    Records the SQL statements run inside a block, optionally only those
+    starting with a keyword:  with sql_statements("SELECT") as selects: ...
+    With `parameters`, records (statement, parameters) pairs instead.
+    """
+    @contextmanager
+    def _record(keyword=None, parameters=False):
+        statements = []
+
+        def record(conn, cursor, statement, params, *args):
+            if keyword is None or statement.lstrip().upper().startswith(keyword):
+                statements.append((statement, params) if parameters else statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+    return _record
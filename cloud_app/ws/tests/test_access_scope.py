@@ -0,0 +1,58 @@
+from models import db, Anomaly, Budget, BillingMonthlyRollup, Project
+from services.periods import period_month_name
+
+
+def add_project(name, platform, cost=100):
+    project = Project(project_name=name, platform=platform, team="core")
+    db.session.add(project)
+    db.session.flush()
+    db.session.add(Budget(project_id=project.id, year=2025, month="jan", period=202501, amount=cost,
+                          platform=platform))
+    db.session.add(Anomaly(project_id=project.id, billing_year=2025, billing_month="mar", period=202503,
+                           anomalous_cost=cost * 3, average_cost=cost, platform=platform))
+    for period in (202501, 202502, 202503):
+        db.session.add(BillingMonthlyRollup(
+            project_id=project.id, platform=platform, period=period, billing_year=2025,
+            billing_month=period_month_name(period), total_cost=cost, line_items=1,
+        ))
+    return project
+
+
+def test_user_scope_is_applied_in_every_read_query(app, client, make_user, sql_statements):
+    alpha, beta = add_project("alpha", "GCP", 100), add_project("beta", "GCP", 200)
+    _, headers = make_user(username="viewer", role="user", platforms=["GCP"], projects=[alpha])
+
+    with sql_statements() as statements:
+        budgets = client.get("/api/budgets/2025", headers=headers).get_json()
+    assert [b["project_id"] for b in budgets] == [alpha.id]
+    assert any("budgets.project_id IN" in s for s in statements)
+
+    report = client.get("/api/reports/grouped_cost?year=2025", headers=headers).get_json()
+    assert report == [{"groupName": "core", "totalCost": 300.0}]
+    anomalies = client.get("/api/anomalies/unread?platform=GCP", headers=headers).get_json()
+    assert [a["project_name"] for a in anomalies] == ["alpha"]
+    assert list(client.get("/api/projects/meta/all", headers=headers).get_json()) == ["alpha"]
+
+    assert client.get(f"/api/project/{alpha.id}?year=2025", headers=headers).status_code == 200
+    assert client.get(f"/api/project/{beta.id}?year=2025", headers=headers).status_code == 404
+    assert client.get(f"/api/forecasting/project/{beta.id}/2025", headers=headers).status_code == 404
+    forecast = client.get("/api/forecasting/all/2025", headers=headers).get_json()["forecast"]
+    assert [round(f["cost"]) for f in forecast] == [100, 100, 100]
+
+
+def test_accessible_platforms_limit_everyone_but_superadmins(app, client, make_user):
+    gcp, aws = add_project("gcp-project", "GCP"), add_project("aws-project", "AWS")
+    _, admin_headers = make_user(username="gcp-admin", role="admin", platforms=["GCP"])
+    _, superadmin_headers = make_user(username="root", role="superadmin", platforms=["GCP"])
+    _, unrestricted_headers = make_user(username="any-admin", role="admin", platforms=[])
+
+    def budget_projects(headers):
+        return sorted(b["project_id"] for b in client.get("/api/budgets/2025", headers=headers).get_json())
+
+    assert budget_projects(admin_headers) == [gcp.id]
+    assert budget_projects(superadmin_headers) == sorted([gcp.id, aws.id])
+    assert budget_projects(unrestricted_headers) == sorted([gcp.id, aws.id])
+
+    anomaly = Anomaly.query.filter_by(project_id=aws.id).one()
+    assert client.put(f"/api/anomalies/{anomaly.id}/acknowledge", headers=admin_headers).status_code == 404
+    assert client.get(f"/api/project/{aws.id}?year=2025", headers=admin_headers).status_code == 404
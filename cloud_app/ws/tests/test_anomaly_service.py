@@ -0,0 +1,105 @@
+import statistics
+
+from models import db, Anomaly, Billing, BillingMonthlyRollup, Project, Service, Sku
+from services.anomaly_service import check_for_anomalies, check_for_series_anomalies, run_anomaly_scan
+from services.periods import period_month_name, shift_period
+
+
+def add_months(project, costs, last_period=202507, service=None):
+    first = shift_period(last_period, -(len(costs) - 1))
+    for step, cost in enumerate(costs):
+        if cost is None:
+            continue
+        period = shift_period(first, step)
+        db.session.add(BillingMonthlyRollup(
+            project_id=project.id, platform=project.platform, period=period, billing_year=period // 100,
+            billing_month=period_month_name(period), total_cost=cost, line_items=1,
+            service_id=service.id if service else None,
+        ))
+
+
+def test_platform_scan_flags_spikes_in_two_queries(app, sql_statements):
+    projects = {name: Project(project_name=name, platform=platform) for name, platform in (
+        ("spike", "GCP"), ("steady", "GCP"), ("flat-spike", "GCP"), ("short", "GCP"),
+        ("small-spike", "GCP"), ("aws-spike", "AWS"),
+    )}
+    db.session.add_all(projects.values())
+    db.session.flush()
+    add_months(projects["spike"], [100, 110, 90, 105, 95, 100, 400])
+    add_months(projects["steady"], [100, 110, 90, 105, 95, 100, 120])
+    add_months(projects["flat-spike"], [200, 200, 200, None, None, None, 300])
+    add_months(projects["short"], [None, None, None, None, 10, 10, 1000])
+    add_months(projects["small-spike"], [10, 11, 9, 10, 10, 10, 40])
+    add_months(projects["aws-spike"], [100, 100, 100, 100, 100, 100, 900])
+    db.session.commit()
+
+    with sql_statements("SELECT") as selects:
+        summary = check_for_anomalies(2025, "jul", "GCP")
+
+    assert len(selects) == 2
+    assert summary == {"platform": "GCP", "period": 202507, "projects_scanned": 5,
+                       "anomalies_found": 2, "anomalies_created": 2}
+    found = {a.project.project_name: (float(a.anomalous_cost), float(a.average_cost)) for a in Anomaly.query}
+    assert found == {
+        "spike": (400.0, round(statistics.mean([100, 110, 90, 105, 95, 100]), 2)),
+        "flat-spike": (300.0, 200.0),
+    }
+
+    # Scanning again doesn't duplicate recorded anomalies
+    assert check_for_anomalies(2025, "jul", "GCP")["anomalies_created"] == 0
+    assert Anomaly.query.count() == 2
+
+
+def test_service_scan_finds_a_spike_hidden_in_the_project_total(app, sql_statements):
+    project = Project(project_name="big", platform="GCP")
+    compute, storage, network = Service(name="Compute"), Service(name="Storage"), Service(name="Network")
+    db.session.add_all([project, compute, storage, network])
+    db.session.flush()
+    add_months(project, [1000, 1300, 800, 1150, 850, 1000, 1000], service=compute)
+    add_months(project, [20, 21, 19, 20, 22, 20, 200], service=storage)
+    # One earlier spike doesn't raise the baseline
+    add_months(project, [100, 100, 600, 100, 100, 100, 300], service=network)
+    db.session.commit()
+
+    assert check_for_anomalies(2025, "jul", "GCP")["anomalies_found"] == 0
+
+    with sql_statements("SELECT") as selects:
+        summary = check_for_series_anomalies(2025, "jul", "GCP", "service")
+
+    assert len(selects) == 2
+    assert summary == {"platform": "GCP", "period": 202507, "granularity": "service",
+                       "series_scanned": 3, "anomalies_found": 2, "anomalies_created": 2}
+    found = {a.service.name: (a.granularity, float(a.anomalous_cost), float(a.average_cost)) for a in Anomaly.query}
+    assert found == {"Storage": ("service", 200.0, 20.0), "Network": ("service", 300.0, 100.0)}
+
+    assert check_for_series_anomalies(2025, "jul", "GCP", "service")["anomalies_created"] == 0
+
+
+def test_sku_scan_reads_billing_data(app, client, make_user, sql_statements):
+    project = Project(project_name="big", platform="GCP")
+    storage, standard, archive = Service(name="Storage"), Sku(name="Standard"), Sku(name="Archive")
+    db.session.add_all([project, storage, standard, archive])
+    db.session.flush()
+    for sku, costs in ((standard, [20, 21, 19, 20, 22, 20, 200]), (archive, [5, 5, 5, 5, 5, 5, 5])):
+        for step, cost in enumerate(costs):
+            period = shift_period(202501, step)
+            # Two line items per month, summed per series
+            db.session.add_all(Billing(
+                project_id=project.id, billing_year=2025, billing_month=period_month_name(period), period=period,
+                platform="GCP", service_id=storage.id, sku_id=sku.id, cost=cost / 2,
+            ) for _ in range(2))
+    db.session.commit()
+
+    run = run_anomaly_scan(2025, "jul", "GCP", granularities=("project", "sku"))
+    assert (run.status, run.series_scanned, run.anomalies_created) == ("completed", 2, 1)
+    anomaly = Anomaly.query.one()
+    assert (anomaly.granularity, anomaly.service.name, anomaly.sku.name) == ("sku", "Storage", "Standard")
+
+    _, headers = make_user()
+    client.get("/api/anomalies/unread?platform=GCP", headers=headers)  # caches the principal
+    db.session.expunge_all()
+    with sql_statements("SELECT") as selects:
+        unread = client.get("/api/anomalies/unread?platform=GCP", headers=headers).get_json()
+    assert [(a["granularity"], a["service"], a["sku"]) for a in unread] == [("sku", "Storage", "Standard")]
+    # Project, service and SKU names are read with the anomalies
+    assert len(selects) == 1
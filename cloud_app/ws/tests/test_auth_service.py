@@ -0,0 +1,126 @@
+from flask import jsonify
+
+from models import db, Budget, Project, User
+from services.auth_service import get_principal, token_required
+
+
+def test_principal_is_resolved_in_one_query_and_cached(app, make_user, sql_statements):
+    projects = [Project(project_name="alpha", platform="GCP"), Project(project_name="beta", platform="GCP")]
+    user, _ = make_user(username="viewer", role="user", platforms=["GCP"], projects=projects)
+
+    with sql_statements() as statements:
+        principal = get_principal(user.id)
+        cached = get_principal(user.id)
+
+    assert len(statements) == 1
+    assert cached is principal
+    assert (principal.role, principal.accessible_platforms) == ("user", ("GCP",))
+    assert principal.project_names == {"alpha", "beta"}
+    assert principal.project_ids == {p.id for p in projects}
+    assert get_principal(user.id + 100) is None
+
+
+def test_user_changes_invalidate_the_cached_principal(app, client, make_user):
+    alpha, beta = Project(project_name="alpha", platform="GCP"), Project(project_name="beta", platform="GCP")
+    db.session.add_all([alpha, beta])
+    db.session.flush()
+    db.session.add_all([
+        Budget(project_id=alpha.id, year=2025, month="jan", period=202501, amount=10, platform="GCP"),
+        Budget(project_id=beta.id, year=2025, month="jan", period=202501, amount=20, platform="GCP"),
+    ])
+    _, admin_headers = make_user()
+    viewer, headers = make_user(username="viewer", role="user", projects=[alpha])
+
+    def visible_budgets():
+        return sorted(b["amount"] for b in client.get("/api/budgets/2025", headers=headers).get_json())
+
+    assert visible_budgets() == [10.0]
+    client.put(f"/api/users/{viewer.id}", json={"assigned_project_ids": [beta.id]}, headers=admin_headers)
+    assert visible_budgets() == [20.0]
+
+    client.delete(f"/api/users/{viewer.id}", headers=admin_headers)
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 401
+
+
+@token_required
+def whoami(current_user):
+    return jsonify({"role": current_user.role, "platforms": list(current_user.accessible_platforms),
+                    "projects": sorted(current_user.project_ids)})
+
+
+def login(client, username):
+    return {"x-access-token": client.post("/api/login", json={"username": username, "password": "secret"})
+            .get_json()["token"]}
+
+
+def test_stateless_token_authorizes_without_queries(app, client, make_user, sql_statements):
+    app.config.update(AUTH_STATELESS_TOKENS=True)
+    alpha = Project(project_name="alpha", platform="GCP")
+    viewer, _ = make_user(username="viewer", role="user", platforms=["GCP"], projects=[alpha])
+    headers = login(client, "viewer")
+
+    with app.test_request_context(headers=headers):
+        whoami()  # loads the token versions
+    with sql_statements() as statements, app.test_request_context(headers=headers):
+        response = whoami()
+
+    assert statements == []
+    assert response.get_json() == {"role": "user", "platforms": ["GCP"], "projects": [alpha.id]}
+
+
+def test_stateless_token_is_revoked_when_access_changes(app, client, make_user):
+    app.config.update(AUTH_STATELESS_TOKENS=True)
+    _, admin_headers = make_user()
+    viewer, _ = make_user(username="viewer", role="user")
+    headers = login(client, "viewer")
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 200
+
+    client.put(f"/api/users/{viewer.id}", json={"role": "admin"}, headers=admin_headers)
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 401
+    assert client.get("/api/users", headers=login(client, "viewer")).status_code == 200
+
+
+def test_password_change_revokes_other_sessions(app, client, make_user):
+    app.config.update(AUTH_STATELESS_TOKENS=True)
+    make_user(username="viewer", role="user")
+    other_session = login(client, "viewer")
+    this_session = login(client, "viewer")
+
+    response = client.put("/api/profile", json={"current_password": "secret", "new_password": "changed"},
+                          headers=this_session)
+    assert response.status_code == 200
+    assert client.get("/api/budgets/2025", headers=other_session).status_code == 401
+    assert client.get("/api/budgets/2025", headers=this_session).status_code == 401
+    fresh = {"x-access-token": response.get_json()["token"]}
+    assert client.get("/api/budgets/2025", headers=fresh).status_code == 200
+
+    # Other profile changes keep the sessions
+    response = client.put("/api/profile", json={"email": "viewer@example.com"}, headers=fresh)
+    assert "token" not in response.get_json()
+    assert client.get("/api/budgets/2025", headers=fresh).status_code == 200
+
+
+def test_edits_that_keep_access_keep_tokens_valid(app, client, make_user):
+    _, admin_headers = make_user()
+    viewer, _ = make_user(username="viewer", role="user")
+    headers = login(client, "viewer")
+
+    response = client.put(f"/api/users/{viewer.id}", json={"email": "new@example.com", "role": "user"},
+                          headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 200
+
+    client.put(f"/api/users/{viewer.id}", json={"accessible_platforms": ["GCP"]}, headers=admin_headers)
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 401
+
+
+def test_stateless_token_revoked_by_another_process(app, client, make_user):
+    # Versions are reloaded on every request
+    app.config.update(AUTH_STATELESS_TOKENS=True, TOKEN_VERSIONS_REFRESH=0)
+    viewer, _ = make_user(username="viewer", role="user")
+    headers = login(client, "viewer")
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 200
+
+    db.session.get(User, viewer.id).token_version += 1
+    db.session.commit()
+    assert client.get("/api/budgets/2025", headers=headers).status_code == 401
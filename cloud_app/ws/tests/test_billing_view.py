@@ -0,0 +1,150 @@
+import json
+
+from models import db, Billing, BillingRuleApplied, BillingViewState, Project
+from services.billing_view_service import refresh_view_range
+from services.job_service import process_next_job
+
+
+def services(client, headers, year=2025):
+    response = client.get(f"/api/billing/services?platform=GCP&year={year}", headers=headers)
+    assert response.status_code == 200
+    return sorted((i["project_name"], i["billing_month"], i["cost"], str(i["id"])) for i in response.get_json())
+
+
+def test_view_is_built_on_first_read_and_refreshed_on_upload(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,10\n")
+    assert BillingViewState.query.count() == 0
+
+    first = services(client, headers)
+    assert [(name, month, cost) for name, month, cost, _ in first] == [("alpha", "jan", 10.0)]
+    # Only years with data get a slice
+    assert {s.billing_year for s in BillingViewState.query} == {2025}
+
+    upload("jan", "alpha,Compute,N1,,12\n")
+    assert [cost for _, _, cost, _ in services(client, headers)] == [12.0]
+
+
+def test_open_ended_range_only_builds_years_with_data(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,10\n")
+
+    response = client.get("/api/billing/services?from=1000-01&to=2999-12", headers=headers)
+    assert [i["cost"] for i in response.get_json()] == [10.0]
+    assert [(s.platform, s.billing_year) for s in BillingViewState.query] == [("GCP", 2025)]
+
+
+def test_rule_changes_recompute_the_view(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "shared,Compute,N1,,10\nalpha,Compute,N1,,4\n")
+    upload("jun", "shared,Compute,N1,,6\n")
+    services(client, headers)
+
+    response = client.post("/api/business-rules", headers=headers, json={
+        "name": "split shared", "rule_type": "DISTRIBUTE_COST", "platform": "GCP",
+        "config": {"source_project": "shared", "target_project_names": ["alpha", "beta"]},
+        "start_date": "2025-05-01",
+    })
+    assert response.status_code == 201
+    rule_id = response.get_json()["id"]
+    # The view is recomputed by a queued job, not by the request
+    assert [i[0] for i in services(client, headers)] == ["alpha", "shared", "shared"]
+    job = client.get(f"/api/billing/jobs/{response.get_json()['refresh_job_id']}", headers=headers).get_json()
+    assert (job["kind"], job["status"], job["first_period"], job["last_period"]) == ("view_refresh", "queued", 202505, None)
+    assert process_next_job(app) is True
+
+    alpha_id = Project.query.filter_by(project_name="alpha").one().id
+    shared_jan = [i for i in services(client, headers) if i[1] == "jan"]
+    jun = [i for i in services(client, headers) if i[1] == "jun"]
+    assert [i[0] for i in shared_jan] == ["alpha", "shared"]
+    assert jun == [("alpha", "jun", 3.0, f"dist-{_billing_id('jun')}-alpha"),
+                   ("beta", "jun", 3.0, f"dist-{_billing_id('jun')}-beta")]
+    assert db.session.query(BillingRuleApplied.project_id).filter_by(project_name="alpha", billing_month="jun").scalar() == alpha_id
+
+    # Moving the rule's start back to January must recompute January too
+    client.put(f"/api/business-rules/{rule_id}", headers=headers, json={"start_date": "2025-01-01"})
+    process_next_job(app)
+    jan = [i[:3] for i in services(client, headers) if i[1] == "jan"]
+    assert jan == [("alpha", "jan", 4.0), ("alpha", "jan", 5.0), ("beta", "jan", 5.0)]
+
+    # Deactivating it restores the raw data everywhere
+    client.put(f"/api/business-rules/{rule_id}", headers=headers, json={"is_active": False})
+    process_next_job(app)
+    assert [i[0] for i in services(client, headers)] == ["alpha", "shared", "shared"]
+
+
+def _billing_id(month):
+    return Billing.query.join(Project).filter(Project.project_name == "shared", Billing.billing_month == month).one().id
+
+
+def test_services_filters_paginates_and_projects(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,1\nalpha,Storage,S1,,2\nbeta,Compute,N1,,3\n")
+    upload("mar", "alpha,Compute,N1,,4\n")
+
+    response = client.get("/api/billing/services?year=2025&project=alpha&service=Compute"
+                          "&fields=project_name,billing_month,cost", headers=headers)
+    assert response.get_json() == [
+        {"project_name": "alpha", "billing_month": "jan", "cost": 1.0},
+        {"project_name": "alpha", "billing_month": "mar", "cost": 4.0},
+    ]
+
+    response = client.get("/api/billing/services?from=2025-02&to=2025-03&fields=cost", headers=headers)
+    assert response.get_json() == [{"cost": 4.0}]
+
+    costs, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/api/billing/services?year=2025&fields=cost&limit=3&cursor={cursor}",
+                          headers=headers).get_json()
+        assert len(page["items"]) <= 3
+        costs.extend(item["cost"] for item in page["items"])
+        cursor = page["next_cursor"]
+    assert costs == [1.0, 2.0, 3.0, 4.0]
+
+    assert client.get("/api/billing/services?year=2025&fields=bogus", headers=headers).status_code == 400
+    assert client.get("/api/billing/services?year=2025&limit=3&cursor=12", headers=headers).status_code == 400
+    assert client.get("/api/billing/services?from=2025-13&to=2025-12", headers=headers).status_code == 400
+
+
+def test_cursor_keeps_its_place_when_the_view_is_rebuilt(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,1\nalpha,Storage,S1,,2\nbeta,Compute,N1,,3\n")
+    upload("feb", "alpha,Compute,N1,,4\n")
+    url = "/api/billing/services?year=2025&fields=cost&limit=2"
+
+    first = client.get(url, headers=headers).get_json()
+    refresh_view_range()  # e.g. a rule change, which re-inserts every row
+    second = client.get(f"{url}&cursor={first['next_cursor']}", headers=headers).get_json()
+    assert [i["cost"] for i in first["items"] + second["items"]] == [1.0, 2.0, 3.0, 4.0]
+    assert second["next_cursor"] is None
+
+
+def test_services_project_filter_is_limited_to_assigned_projects(app, client, make_user, upload):
+    upload("jan", "alpha,Compute,N1,,1\nbeta,Compute,N1,,3\n")
+    alpha = Project.query.filter_by(project_name="alpha").one()
+    _, headers = make_user("viewer", role="user", projects=[alpha])
+
+    response = client.get("/api/billing/services?year=2025&project=alpha,beta&fields=project_name", headers=headers)
+    assert response.get_json() == [{"project_name": "alpha"}]
+
+    response = client.get("/api/billing/services?year=2025&project=beta&limit=10", headers=headers)
+    assert response.get_json() == {"items": [], "next_cursor": None}
+
+
+def test_services_streaming_formats(app, client, make_user, monkeypatch, upload):
+    monkeypatch.setattr("routes.billing.STREAM_CHUNK_ROWS", 2)
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,1\nalpha,Storage,S1,,2\nbeta,Compute,N1,,3\n")
+    expected = client.get("/api/billing/services?year=2025", headers=headers).get_json()
+
+    response = client.get("/api/billing/services?year=2025&format=json-stream", headers=headers)
+    assert response.is_streamed
+    assert json.loads(response.get_data(as_text=True)) == expected
+
+    response = client.get("/api/billing/services?year=2025", headers={**headers, "Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == expected
+
+    response = client.get("/api/billing/services?year=2025&project=nobody&format=json-stream", headers=headers)
+    assert response.get_data(as_text=True) == "[]"
+    assert client.get("/api/billing/services?year=2025&format=ndjson&limit=5", headers=headers).status_code == 400
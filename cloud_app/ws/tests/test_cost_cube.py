@@ -0,0 +1,67 @@
+from models import db, BillingMonthlyRollup, Project, Service
+from services.periods import period_month_name
+
+
+def add_costs(project, service, costs):
+    for period, cost in costs.items():
+        db.session.add(BillingMonthlyRollup(
+            project_id=project.id, platform=project.platform, period=period, billing_year=period // 100,
+            billing_month=period_month_name(period), total_cost=cost, line_items=1,
+            service_id=service.id if service else None,
+        ))
+
+
+def setup_costs():
+    core = Project(project_name="core-api", platform="GCP", team="core", environment="prod")
+    web = Project(project_name="web", platform="GCP", team="web", environment="prod")
+    lab = Project(project_name="lab", platform="AWS", environment="dev")
+    compute, storage = Service(name="Compute"), Service(name="Storage")
+    db.session.add_all([core, web, lab, compute, storage])
+    db.session.flush()
+    add_costs(core, compute, {202501: 100, 202502: 120})
+    add_costs(core, storage, {202501: 10, 202502: 10})
+    add_costs(web, compute, {202501: 50})
+    add_costs(lab, None, {202502: 7})
+    # Outside the requested range
+    add_costs(web, compute, {202412: 999})
+    db.session.commit()
+    return core, web, lab
+
+
+def test_cube_returns_costs_with_rollup_subtotals(app, client, make_user):
+    setup_costs()
+    _, headers = make_user()
+
+    response = client.get("/api/reports/cube?groupBy=team,service&year=2025", headers=headers).get_json()
+    assert response["dimensions"] == ["team", "service"]
+    assert [(r["team"], r["service"], r["cost"], r["level"]) for r in response["rows"]] == [
+        (None, None, 297.0, 0),
+        ("Unassigned", None, 7.0, 1),
+        ("Unassigned", "Unassigned", 7.0, 2),
+        ("core", None, 240.0, 1),
+        ("core", "Compute", 220.0, 2),
+        ("core", "Storage", 20.0, 2),
+        ("web", None, 50.0, 1),
+        ("web", "Compute", 50.0, 2),
+    ]
+
+    response = client.get(
+        "/api/reports/cube?groupBy=month&groupBy=environment&from=2025-01&to=2025-02&platform=GCP"
+        "&service=Compute&rollup=false", headers=headers,
+    ).get_json()
+    assert [(r["month"], r["environment"], r["cost"]) for r in response["rows"]] == [
+        ("2025-01", "prod", 150.0),
+        ("2025-02", "prod", 120.0),
+    ]
+
+
+def test_cube_is_limited_to_the_users_scope(app, client, make_user):
+    core, _, _ = setup_costs()
+    _, headers = make_user(username="viewer", role="user", projects=[core])
+
+    rows = client.get("/api/reports/cube?groupBy=platform&year=2025", headers=headers).get_json()["rows"]
+    assert [(r["platform"], r["cost"]) for r in rows] == [(None, 240.0), ("GCP", 240.0)]
+
+    assert client.get("/api/reports/cube?groupBy=region&year=2025", headers=headers).status_code == 400
+    assert client.get("/api/reports/cube?groupBy=team,team&year=2025", headers=headers).status_code == 400
+    assert client.get("/api/reports/cube?groupBy=team", headers=headers).status_code == 400
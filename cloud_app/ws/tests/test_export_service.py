@@ -0,0 +1,52 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from models import Project
+
+
+def test_raw_export_as_arrow_keeps_decimal_costs(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,10.25\nbeta,Compute,N1,,0.10\n")
+
+    response = client.get("/api/billing/export?source=raw&year=2025", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+
+    assert table.schema.field("cost").type == pa.decimal128(10, 2)
+    assert pa.types.is_dictionary(table.schema.field("project_name").type)
+    assert table.column("cost").to_pylist() == [Decimal("10.25"), Decimal("0.10")]
+    assert table.column("project_name").to_pylist() == ["alpha", "beta"]
+
+
+def test_rule_applied_export_as_parquet(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jun", "shared,Compute,N1,,10\nalpha,Storage,S1,,1\n")
+    client.post("/api/business-rules", headers=headers, json={
+        "name": "split shared", "rule_type": "DISTRIBUTE_COST", "platform": "GCP",
+        "config": {"source_project": "shared", "target_project_names": ["alpha", "beta", "gamma"]},
+    })
+
+    response = client.get("/api/billing/export?format=parquet&year=2025&service=Compute", headers=headers)
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.get_data()))
+
+    assert table.schema.field("cost").type == pa.decimal128(18, 6)
+    assert table.column("project_name").to_pylist() == ["alpha", "beta", "gamma"]
+    assert table.column("cost").to_pylist() == [Decimal("3.333333")] * 3
+    assert table.column("is_distributed").to_pylist() == [True] * 3
+
+
+def test_export_is_limited_to_assigned_projects(app, client, make_user, upload):
+    upload("jan", "alpha,Compute,N1,,1\nbeta,Compute,N1,,2\n")
+    alpha = Project.query.filter_by(project_name="alpha").one()
+    _, headers = make_user("viewer", role="user", projects=[alpha])
+
+    response = client.get("/api/billing/export?source=raw&year=2025", headers=headers)
+    assert pa.ipc.open_stream(response.get_data()).read_all().column("project_name").to_pylist() == ["alpha"]
+    assert client.get("/api/billing/export?format=csv&year=2025", headers=headers).status_code == 400
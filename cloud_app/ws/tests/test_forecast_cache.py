@@ -0,0 +1,50 @@
+from models import db, ForecastCacheEntry, Project
+from services import forecast_cache
+from services.data_version import current_data_version
+from services.forecast_cache import cached_forecast, clear_local_cache
+
+
+def test_forecasts_are_cached_until_billing_data_changes(app, upload):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [len(calls)]
+
+    assert current_data_version() == 0
+    assert cached_forecast("all", compute) == [1]
+    assert cached_forecast("all", compute) == [1]
+
+    # Another process with an empty LRU finds the shared entry
+    clear_local_cache()
+    assert cached_forecast("all", compute) == [1]
+    assert len(calls) == 1
+
+    upload("jan", [("alpha", "Compute", "N1", 10)])
+    assert current_data_version() == 1
+    assert cached_forecast("all", compute) == [2]
+    assert db.session.get(ForecastCacheEntry, "all").data_version == 1
+
+
+def test_local_cache_is_bounded(app):
+    app.config["FORECAST_CACHE_SIZE"] = 2
+    app.config["FORECAST_CACHE_SHARED"] = False
+    for key in ("a", "b", "c"):
+        cached_forecast(key, lambda: key)
+    assert [key for key, _ in forecast_cache._entries] == ["b", "c"]
+    assert ForecastCacheEntry.query.count() == 0
+
+
+def test_project_forecast_endpoint_refreshes_after_upload(app, client, make_user, upload):
+    _, headers = make_user()
+    for month, cost in (("jan", 10), ("feb", 20), ("mar", 30)):
+        upload(month, [("alpha", "Compute", "N1", cost)])
+    project_id = Project.query.filter_by(project_name="alpha").one().id
+
+    first = client.get(f"/api/forecasting/project/{project_id}/2025", headers=headers).get_json()
+    assert [round(f["cost"], 2) for f in first["forecast"]] == [40.0, 50.0, 60.0]
+    assert client.get(f"/api/forecasting/project/{project_id}/2025", headers=headers).get_json() == first
+
+    upload("apr", [("alpha", "Compute", "N1", 10)])
+    second = client.get(f"/api/forecasting/project/{project_id}/2025", headers=headers).get_json()
+    assert [f["month_str"] for f in second["forecast"]] == ["may", "jun", "jul"]
@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+
+from models import db, BillingMonthlyRollup, Project
+from services.forecast_service import forecast_all_projects, history_matrix
+from services.periods import period_month_name, shift_period
+
+
+def add_history(project, periods, rng):
+    for period in periods:
+        db.session.add(BillingMonthlyRollup(
+            project_id=project.id, platform="GCP", period=period,
+            billing_year=period // 100, billing_month=period_month_name(period),
+            service_id=None, total_cost=round(rng.uniform(0, 500), 2), line_items=1,
+        ))
+
+
+def test_batched_forecast_matches_per_project_regression(app):
+    rng = random.Random(7)
+    projects = [Project(project_name=f"p{i}", platform="GCP") for i in range(12)]
+    db.session.add_all(projects)
+    db.session.flush()
+    for index, project in enumerate(projects):
+        months = [shift_period(202201, m) for m in range(30)]
+        # Different lengths (some too short to forecast) and gaps between months
+        periods = sorted(rng.sample(months, [1, 2, 3, 5, 12, 13, 30][index % 7]))
+        add_history(project, periods, rng)
+    db.session.commit()
+
+    batched = forecast_all_projects()
+    for project in projects:
+        history = BillingMonthlyRollup.query.filter_by(project_id=project.id)\
+            .order_by(BillingMonthlyRollup.period).all()[-12:]
+        if len(history) < 3:
+            assert project.id not in batched
+            continue
+        # Reference: an independent least-squares fit per project
+        slope, intercept = np.polyfit(np.arange(len(history)), [float(h.total_cost) for h in history], 1)
+        expected = [max(0.0, intercept + slope * x) for x in range(len(history), len(history) + 3)]
+        assert [p for p, _ in batched[project.id]] == [shift_period(history[-1].period, s) for s in (1, 2, 3)]
+        assert [c for _, c in batched[project.id]] == pytest.approx(expected, abs=1e-6)
+
+
+def test_all_projects_forecast_sums_project_trends(app, client, make_user):
+    _, headers = make_user()
+    alpha = Project(project_name="alpha", platform="GCP")
+    beta = Project(project_name="beta", platform="GCP")
+    db.session.add_all([alpha, beta])
+    db.session.flush()
+    for project, costs in ((alpha, [10, 20, 30]), (beta, [5, 5, 5, 5])):
+        for month, cost in enumerate(costs, start=1):
+            db.session.add(BillingMonthlyRollup(
+                project_id=project.id, platform="GCP", period=202500 + month, billing_year=2025,
+                billing_month=period_month_name(202500 + month), total_cost=cost, line_items=1,
+            ))
+    db.session.commit()
+
+    forecast = client.get("/api/forecasting/all/2025", headers=headers).get_json()["forecast"]
+    # alpha continues 40, 50, 60 from April; beta stays at 5 from May
+    assert [(f["year"], f["month_str"], round(f["cost"], 6)) for f in forecast] == [
+        (2025, "apr", 40.0), (2025, "may", 55.0), (2025, "jun", 65.0), (2025, "jul", 5.0),
+    ]
+
+
+def test_seasonal_engines_read_calendar_aligned_history(app):
+    periods = np.array([shift_period(202301, step) for step in range(15) if step != 5])
+    costs = np.array([float(period % 100 + 12 * (period // 100 - 2023)) for period in periods])
+
+    _, _, packed, lengths = history_matrix(np.zeros(14, dtype=np.int64), periods, costs, 12)
+    assert lengths.tolist() == [12] and packed[0].tolist() == [3, 4, 5, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+    _, _, calendar, lengths = history_matrix(np.zeros(14, dtype=np.int64), periods, costs, 12, calendar=True)
+    assert lengths.tolist() == [12] and calendar[0].tolist() == [4, 5, 0, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+
+    project = Project(project_name="gappy", platform="GCP")
+    db.session.add(project)
+    db.session.flush()
+    for period, cost in zip(periods.tolist(), costs):
+        db.session.add(BillingMonthlyRollup(
+            project_id=project.id, platform="GCP", period=period, billing_year=period // 100,
+            billing_month=period_month_name(period), total_cost=cost, line_items=1,
+        ))
+    db.session.commit()
+
+    # The same months a year earlier; June 2023 had no costs
+    forecast = forecast_all_projects(engine="seasonal_naive")[project.id]
+    assert forecast == [(202404, 4.0), (202405, 5.0), (202406, 0.0)]
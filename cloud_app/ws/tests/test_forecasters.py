@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from models import db, BillingMonthlyRollup, Project
+from services.forecasters import FORECASTERS, Forecaster, backtest, get_forecaster
+from services.periods import period_month_name, shift_period
+
+
+def seasonal_series(months, base=100.0, slope=2.0, amplitude=30.0):
+    t = np.arange(months)
+    return base + slope * t + amplitude * np.sin(2 * np.pi * t / 12)
+
+
+def test_seasonal_naive_repeats_last_year():
+    costs = np.arange(1, 15, dtype=float)[None, :]
+    forecast = get_forecaster("seasonal_naive").forecast(costs, np.array([14]), 3)
+    assert forecast.tolist() == [[3.0, 4.0, 5.0]]
+
+
+def test_holt_winters_follows_trend_and_season():
+    history = seasonal_series(48)
+    actual = seasonal_series(51)[48:]
+    forecast = get_forecaster("holt_winters").forecast(history[None, :], np.array([48]), 3)[0]
+    linear = get_forecaster("linear").forecast(history[None, -12:], np.array([12]), 3)[0]
+    assert np.abs(forecast - actual).max() < 3
+    assert np.abs(forecast - actual).max() < np.abs(linear - actual).max()
+
+
+def test_engines_handle_rows_of_different_lengths():
+    costs = np.vstack([seasonal_series(36), np.r_[seasonal_series(24), np.zeros(12)]])
+    lengths = np.array([36, 24])
+    for engine in FORECASTERS.values():
+        rows = costs[:, :engine.history_limit]
+        forecast = engine.forecast(rows, np.minimum(lengths, engine.history_limit), 2)
+        assert forecast.shape == (2, 2)
+        assert (forecast >= 0).all()
+    with pytest.raises(ValueError):
+        get_forecaster("prophet")
+    with pytest.raises(TypeError):
+        Forecaster()
+
+
+def test_backtest_scores_rows_the_engine_can_fit():
+    costs = np.vstack([seasonal_series(40), np.r_[seasonal_series(20), np.zeros(20)]])
+    rows, mae, wape = backtest(get_forecaster("holt_winters"), costs, np.array([40, 20]), 3)
+    assert rows.tolist() == [0]
+    assert mae[0] < 5 and wape[0] < 0.05
+
+
+def test_forecast_endpoint_engine_selection(app, client, make_user):
+    _, headers = make_user()
+    short = Project(project_name="short", platform="GCP")
+    long = Project(project_name="long", platform="GCP")
+    db.session.add_all([short, long])
+    db.session.flush()
+    for project, months in ((short, 4), (long, 24)):
+        for step, cost in enumerate(seasonal_series(months)):
+            period = shift_period(202301, step)
+            db.session.add(BillingMonthlyRollup(
+                project_id=project.id, platform="GCP", period=period, billing_year=period // 100,
+                billing_month=period_month_name(period), total_cost=round(cost, 2), line_items=1,
+            ))
+    db.session.commit()
+
+    def forecast(project, engine):
+        response = client.get(f"/api/forecasting/project/{project.id}/2024?engine={engine}", headers=headers)
+        return [round(f["cost"], 2) for f in response.get_json()["forecast"]]
+
+    assert forecast(long, "seasonal_naive") == [round(c, 2) for c in seasonal_series(24)[12:15]]
+    # Too little history for seasonal engines falls back to the linear trend
+    assert forecast(short, "holt_winters") == forecast(short, "linear")
+    assert client.get("/api/forecasting/all/2024?engine=bogus", headers=headers).status_code == 400
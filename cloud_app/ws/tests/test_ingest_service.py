@@ -0,0 +1,138 @@
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+
+from models import db, Billing, BillingStaging, Project, Service, Sku
+from services.dimension_service import service_cache
+from services.ingest_service import iter_csv_batches, ingest_billing_csv
+
+
+def test_iter_csv_batches_splits_rows(billing_csv):
+    stream = billing_csv([(f"p{i}", "Compute Engine", "N1", 1) for i in range(7)])
+    batches = list(iter_csv_batches(stream, batch_size=3))
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert batches[0][0]["Project name"] == "p0"
+    # The caller's stream must remain usable after iteration.
+    assert not stream.closed
+
+
+def test_ingest_creates_projects_and_inserts_in_batches(app, billing_csv):
+    db.session.add(Project(project_name="existing", platform="GCP"))
+    db.session.commit()
+
+    stream = billing_csv([
+        ("existing", "Compute Engine", "N1", "10.50"),
+        ("new-project", "Cloud Storage", "Standard", "2.25"),
+        ("", "Orphan", "Orphan", "1"),
+        ("existing", "BigQuery", "Analysis", "3"),
+    ])
+    result = ingest_billing_csv(stream, platform="GCP", year=2025, month="jan", batch_size=2)
+
+    assert result["rows_parsed"] == 4
+    assert result["rows_inserted"] == 3
+    assert result["new_projects"] == ["new-project"]
+    assert Project.query.filter_by(project_name="new-project").one().platform == "GCP"
+
+    total = db.session.query(db.func.sum(Billing.cost)).scalar()
+    assert float(total) == 15.75
+
+
+def test_failed_upload_keeps_previous_month(app, billing_csv):
+    project = Project(project_name="existing", platform="GCP")
+    db.session.add(project)
+    db.session.commit()
+    ingest_billing_csv(billing_csv([("existing", "Compute Engine", "N1", "5")]),
+                       platform="GCP", year=2025, month="jan")
+
+    bad = billing_csv([("existing", "Compute Engine", "N1", "7"),
+                       ("existing", "Compute Engine", "N1", "not-a-number")])
+    try:
+        ingest_billing_csv(bad, platform="GCP", year=2025, month="jan", batch_size=1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected the malformed cost to abort the upload")
+
+    costs = [float(b.cost) for b in Billing.query.all()]
+    assert costs == [5.0]
+    assert BillingStaging.query.count() == 0
+
+
+def test_upload_without_usable_rows_keeps_previous_month(app, upload):
+    upload("jan", [("existing", "Compute Engine", "N1", "5")])
+    try:
+        upload("jan", [("", "Compute Engine", "N1", "7"), ("", "Compute Engine", "N1", "8")])
+    except ValueError as e:
+        assert "None of the 2 rows" in str(e)
+    else:
+        raise AssertionError("expected a file without project names to be refused")
+
+    assert [float(b.cost) for b in Billing.query.all()] == [5.0]
+    assert BillingStaging.query.count() == 0
+
+
+def test_reupload_replaces_only_its_month_and_platform(app, billing_csv):
+    db.session.add(Project(project_name="existing", platform="GCP"))
+    db.session.commit()
+    ingest_billing_csv(billing_csv([("existing", "A", "a", "1")]), platform="GCP", year=2025, month="jan")
+    ingest_billing_csv(billing_csv([("existing", "A", "a", "2")]), platform="GCP", year=2025, month="feb")
+    ingest_billing_csv(billing_csv([("existing", "A", "a", "3")]), platform="GCP", year=2025, month="jan")
+
+    rows = sorted((b.billing_month, float(b.cost)) for b in Billing.query.all())
+    assert rows == [("feb", 2.0), ("jan", 3.0)]
+
+
+def test_services_and_skus_are_stored_once_and_referenced_by_id(app, billing_csv):
+    ingest_billing_csv(billing_csv([
+        ("alpha", "Compute Engine", "N1", 1),
+        ("alpha", "Compute Engine", "N2", 2),
+        ("beta", "Cloud Storage", "", 3),
+    ]), platform="GCP", year=2025, month="jan", batch_size=2)
+    ingest_billing_csv(billing_csv([("alpha", "Compute Engine", "N1", 4)]), platform="GCP", year=2025, month="feb")
+
+    assert sorted(s.name for s in Service.query) == ["Cloud Storage", "Compute Engine"]
+    assert sorted(s.name for s in Sku.query) == ["N1", "N2"]
+
+    rows = db.session.query(Billing.period, Service.name, Sku.name)\
+        .outerjoin(Service, Billing.service_id == Service.id)\
+        .outerjoin(Sku, Billing.sku_id == Sku.id)\
+        .order_by(Billing.id).all()
+    assert rows == [
+        (202501, "Compute Engine", "N1"),
+        (202501, "Compute Engine", "N2"),
+        (202501, "Cloud Storage", None),
+        (202502, "Compute Engine", "N1"),
+    ]
+
+
+def test_dimension_cache_creates_new_names_when_another_collides(app):
+    cache = service_cache()
+    lookups = []
+    load = cache._load
+
+    def load_after_concurrent_insert(names):
+        # Another upload creates "Existing" between the lookup and the insert
+        if not lookups:
+            db.session.add(Service(name="Existing"))
+            db.session.flush()
+        lookups.append(names)
+        if len(lookups) > 1:
+            load(names)
+
+    cache._load = load_after_concurrent_insert
+    cache.resolve(["Existing", "Brand new"])
+
+    assert cache.get("Brand new") == Service.query.filter_by(name="Brand new").one().id
+    assert cache.get("Existing") == Service.query.filter_by(name="Existing").one().id
+
+
+def test_dimension_cache_keeps_names_that_differ_only_in_case(app):
+    cache = service_cache()
+    cache.resolve(["Compute", "compute", "Compute "])
+    cache.resolve(["COMPUTE", "compute"])
+
+    ids = {name: cache.get(name) for name in ("Compute", "compute", "Compute ", "COMPUTE")}
+    assert len(set(ids.values())) == 4
+    assert ids == {name: Service.query.filter_by(name=name).one().id for name in ids}
+    # MySQL's default collation would treat these as one name
+    ddl = str(CreateTable(Service.__table__).compile(dialect=mysql.dialect()))
+    assert "COLLATE utf8mb4_0900_bin" in ddl
@@ -0,0 +1,143 @@
+import io
+import os
+
+from werkzeug.datastructures import FileStorage
+
+from models import db, Anomaly, AnomalyScanRun, Billing, BillingViewState, IngestJob
+from services import ingest_service, job_service
+from services.billing_view_service import ensure_view_built
+from services.job_service import (
+    enqueue_ingest_job, enqueue_view_refresh_job, claim_next_job, process_next_job, run_ingest_job, touch_job,
+)
+
+CSV = (
+    "Project name,Service description,SKU description,Credit type,Cost ($)\n"
+    "alpha,Compute Engine,N1,,4.00\n"
+    "beta,Cloud Storage,Standard,,1.50\n"
+)
+
+
+def upload(app, tmp_path, content=CSV):
+    storage = FileStorage(stream=io.BytesIO(content.encode("utf-8")), filename="billing.csv")
+    return enqueue_ingest_job(storage, "GCP", 2025, "mar", None, str(tmp_path / "uploads"))
+
+
+def test_queued_job_is_processed_and_file_removed(app, tmp_path):
+    job = upload(app, tmp_path)
+    assert job.status == "queued"
+    assert os.path.exists(job.file_path)
+
+    assert process_next_job(app) is True
+    assert process_next_job(app) is False
+
+    db.session.expire_all()
+    job = db.session.get(IngestJob, job.id)
+    assert job.status == "completed"
+    assert (job.rows_parsed, job.rows_inserted) == (2, 2)
+    assert job.new_projects == ["alpha", "beta"]
+    assert job.finished_at is not None
+    assert not os.path.exists(job.file_path)
+    assert Billing.query.count() == 2
+
+
+def test_failed_job_records_error(app, tmp_path):
+    job = upload(app, tmp_path, CSV + "alpha,Compute Engine,N1,,oops\n")
+    process_next_job(app)
+
+    db.session.expire_all()
+    job = db.session.get(IngestJob, job.id)
+    assert job.status == "failed"
+    assert "oops" in job.error
+    assert Billing.query.count() == 0
+
+
+def test_failed_view_refresh_still_completes_the_job(app, tmp_path, monkeypatch):
+    ensure_view_built("GCP", 2025)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("view is locked")
+
+    monkeypatch.setattr(ingest_service, "refresh_view_range", fail)
+    job = upload(app, tmp_path)
+    assert process_next_job(app) is True
+    assert process_next_job(app) is False
+
+    db.session.expire_all()
+    job = db.session.get(IngestJob, job.id)
+    assert job.status == "completed" and job.error is None
+    assert "view is locked" in job.warnings[0]
+    assert Billing.query.count() == 2
+    # The slice is rebuilt, with the new month, on its next read
+    assert BillingViewState.query.count() == 0
+
+
+def test_failed_view_refresh_job_leaves_its_slices_to_be_rebuilt(app, monkeypatch):
+    ensure_view_built("GCP", 2024)
+    ensure_view_built("GCP", 2025)
+    ensure_view_built("AWS", 2025)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("view is locked")
+
+    monkeypatch.setattr(job_service, "refresh_view_range", fail)
+    job = enqueue_view_refresh_job(202503, None, None)
+    assert process_next_job(app) is True
+    assert process_next_job(app) is False
+
+    db.session.expire_all()
+    job = db.session.get(IngestJob, job.id)
+    assert (job.kind, job.status, job.error) == ("view_refresh", "failed", "view is locked")
+    # Only the slices before the rule's range keep their rows
+    assert [(s.platform, s.billing_year) for s in BillingViewState.query] == [("GCP", 2024)]
+
+
+def test_job_is_claimed_only_once(app, tmp_path):
+    upload(app, tmp_path)
+    assert claim_next_job(stale_after_seconds=900) is not None
+    assert claim_next_job(stale_after_seconds=900) is None
+
+
+def test_worker_stops_once_its_job_is_reclaimed(app, tmp_path):
+    upload(app, tmp_path)
+    job = claim_next_job(stale_after_seconds=900)
+    db.session.expunge(job)  # this worker's copy of its claim
+    assert job.attempts == 1 and touch_job(job)
+
+    # The job looks stale to another worker, which claims it again
+    reclaimed = claim_next_job(stale_after_seconds=-1)
+    assert reclaimed.id == job.id and reclaimed.attempts == 2
+
+    assert not touch_job(job)
+    assert run_ingest_job(job, batch_size=1) is None
+    db.session.expire_all()
+    current = db.session.get(IngestJob, job.id)
+    assert (current.status, current.rows_parsed, current.finished_at) == ("running", 0, None)
+    assert os.path.exists(current.file_path)
+    assert Billing.query.count() == 0
+
+
+def test_completed_job_scans_the_uploaded_month_for_anomalies(app, client, make_user, tmp_path):
+    _, headers = make_user()
+    for month, cost in (("jan", 100), ("feb", 105), ("mar", 95)):
+        storage = FileStorage(stream=io.BytesIO(
+            f"Project name,Service description,SKU description,Credit type,Cost ($)\nalpha,Compute,N1,,{cost}\n"
+            .encode("utf-8")), filename="billing.csv")
+        enqueue_ingest_job(storage, "GCP", 2025, month, None, str(tmp_path / "uploads"))
+    storage = FileStorage(stream=io.BytesIO(
+        b"Project name,Service description,SKU description,Credit type,Cost ($)\nalpha,Compute,N1,,900\n"),
+        filename="billing.csv")
+    job = enqueue_ingest_job(storage, "GCP", 2025, "apr", None, str(tmp_path / "uploads"))
+    while process_next_job(app):
+        pass
+
+    db.session.expire_all()
+    runs = AnomalyScanRun.query.order_by(AnomalyScanRun.id).all()
+    assert [r.billing_month for r in runs] == ["jan", "feb", "mar", "apr"]
+    assert all(r.status == "completed" and r.projects_scanned == 1 and r.series_scanned == 1 for r in runs)
+    # The project total and its only service both spike
+    anomalies = Anomaly.query.order_by(Anomaly.granularity).all()
+    assert [(a.granularity, a.billing_month) for a in anomalies] == [("project", "apr"), ("service", "apr")]
+
+    status = client.get(f"/api/billing/jobs/{job.id}", headers=headers).get_json()
+    assert status["anomaly_scan"]["anomalies_created"] == 2
+    assert status["anomaly_scan"]["duration_seconds"] >= 0
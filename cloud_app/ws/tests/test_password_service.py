@@ -0,0 +1,59 @@
+import fcntl
+import os
+
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+
+
+def login(client, password="secret"):
+    return client.post("/api/login", json={"username": "viewer", "password": password})
+
+
+def test_login_upgrades_hashes_made_with_another_method(app, client, make_user):
+    app.config.update(PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    viewer, _ = make_user(username="viewer", role="user")
+    viewer.password_hash = generate_password_hash("secret", "pbkdf2:sha256:2000")
+    db.session.commit()
+
+    assert login(client, "wrong").status_code == 401
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, viewer.id).password_hash.startswith("pbkdf2:sha256:1000$")
+    assert login(client).status_code == 200
+
+
+def test_short_method_names_do_not_rehash_on_every_login(app, client, make_user):
+    app.config.update(PASSWORD_HASH_METHOD="pbkdf2:sha256")
+    viewer, _ = make_user(username="viewer", role="user")
+    viewer.password_hash = generate_password_hash("secret", "pbkdf2:sha256")
+    db.session.commit()
+    stored = viewer.password_hash
+
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, viewer.id).password_hash == stored
+
+
+def test_login_is_rejected_while_every_hashing_slot_is_taken(app, client, make_user, tmp_path):
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_WAIT_SECONDS=0.05, PASSWORD_HASH_LOCK_DIR=str(tmp_path))
+    make_user(username="viewer", role="user")
+    _, admin_headers = make_user()
+    before = client.get("/api/login/metrics", headers=admin_headers).get_json()
+
+    # flock locks belong to the open file, so this holds the slot just like
+    # another worker process hashing a password would
+    held = os.open(tmp_path / "slot-0.lock", os.O_RDWR | os.O_CREAT)
+    fcntl.flock(held, fcntl.LOCK_EX)
+    response = login(client)
+    os.close(held)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert login(client).status_code == 200
+
+    metrics = client.get("/api/login/metrics", headers=admin_headers).get_json()
+    assert metrics["rejected"] - before["rejected"] == 1
+    assert metrics["succeeded"] - before["succeeded"] == 1
+    assert metrics["latency_ms"]["max"] >= metrics["latency_ms"]["p50"] > 0
+    assert metrics["password_hash_workers"] == 1
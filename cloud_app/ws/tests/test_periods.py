@@ -0,0 +1,29 @@
+import pytest
+
+from services.periods import (
+    month_number, to_period, shift_period, period_month_name, quarter_range, year_range,
+)
+
+
+def test_to_period_accepts_names_and_numbers():
+    assert to_period(2025, "jan") == 202501
+    assert to_period(2025, "Dec") == 202512
+    assert to_period("2024", 7) == 202407
+
+
+def test_unknown_month_raises():
+    with pytest.raises(ValueError):
+        month_number("janu")
+
+
+def test_shift_period_crosses_year_boundaries():
+    assert shift_period(202501, -1) == 202412
+    assert shift_period(202412, 1) == 202501
+    assert shift_period(202503, -15) == 202312
+    assert shift_period(202511, 14) == 202701
+
+
+def test_ranges_and_names():
+    assert quarter_range(2025, "Q3") == (202507, 202509)
+    assert year_range(2024) == (202401, 202412)
+    assert period_month_name(202410) == "oct"
@@ -0,0 +1,72 @@
+import re
+
+from models import db, Budget, Project
+from services.anomaly_service import run_anomaly_scan
+
+
+def query_plan(statement, parameters):
+    """Returns SQLite's EXPLAIN QUERY PLAN output for a recorded statement as one string."""
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def plans_on(statements, table):
+    """Plans of the recorded reads, updates and deletes that touch `table`."""
+    touches = re.compile(rf"\b(FROM|JOIN|UPDATE) {table}\b")
+    plans = [query_plan(statement, parameters) for statement, parameters in statements
+             if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and touches.search(statement)]
+    assert plans, f"no statement touched {table}"
+    return plans
+
+
+def test_reupload_replaces_the_month_through_the_period_index(app, upload, sql_statements):
+    upload("jan", "alpha,Compute,N1,,1\n")
+    with sql_statements(parameters=True) as statements:
+        upload("jan", "alpha,Compute,N1,,2\n")
+
+    for plan in plans_on(statements, "billing_data"):
+        assert "USING INDEX ix_billing_data_platform_period" in plan
+    for plan in plans_on(statements, "billing_monthly_rollup"):
+        assert "USING INDEX ix_billing_monthly_rollup_platform_period" in plan
+
+
+def test_billing_services_reads_use_indexes(app, client, make_user, upload, sql_statements):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,1\n")
+    with sql_statements(parameters=True) as statements:
+        response = client.get("/api/billing/services?platform=GCP&year=2025&limit=5", headers=headers)
+    assert response.status_code == 200
+
+    # Building the view slice reads the raw data by platform and period
+    for plan in plans_on(statements, "billing_data"):
+        assert "USING INDEX ix_billing_data_platform_period" in plan
+    for plan in plans_on(statements, "billing_rule_applied"):
+        assert "USING INDEX ix_billing_rule_applied_" in plan
+
+
+def test_anomaly_scan_uses_indexes(app, upload, sql_statements):
+    for month, cost in (("jan", 100), ("feb", 110), ("mar", 90), ("apr", 900)):
+        upload(month, [("alpha", "Compute", "N1", cost)])
+    with sql_statements(parameters=True) as statements:
+        run = run_anomaly_scan(2025, "apr", "GCP", granularities=("project", "sku"))
+    assert run.anomalies_created == 2
+
+    for plan in plans_on(statements, "anomalies"):
+        assert "USING INDEX ix_anomalies_" in plan
+    for plan in plans_on(statements, "billing_data"):
+        assert "USING INDEX ix_billing_data_" in plan
+
+
+def test_scoped_budget_read_uses_index(app, client, make_user, sql_statements):
+    alpha = Project(project_name="alpha", platform="GCP")
+    db.session.add(alpha)
+    db.session.flush()
+    db.session.add(Budget(project_id=alpha.id, year=2025, month="jan", period=202501, amount=10, platform="GCP"))
+    _, headers = make_user(username="viewer", role="user", platforms=["GCP"], projects=[alpha])
+
+    with sql_statements(parameters=True) as statements:
+        response = client.get("/api/budgets/2025", headers=headers)
+    assert response.status_code == 200
+
+    for plan in plans_on(statements, "budgets"):
+        assert "USING INDEX ix_budgets_project_year_month" in plan
@@ -0,0 +1,51 @@
+from models import db, BillingMonthlyRollup, Project, Service
+
+
+def rollup_rows():
+    return sorted(
+        (r.period, r.project_id, name, float(r.total_cost), r.line_items)
+        for r, name in db.session.query(BillingMonthlyRollup, Service.name).join(Service)
+    )
+
+
+def test_upload_builds_rollup_per_project_and_service(app, upload):
+    upload("jan", "alpha,Compute,N1,,1.25\nalpha,Compute,N2,,2.00\nalpha,Storage,S,,0.50\nbeta,Compute,N1,,4\n")
+
+    alpha = Project.query.filter_by(project_name="alpha").one().id
+    beta = Project.query.filter_by(project_name="beta").one().id
+    assert rollup_rows() == sorted([
+        (202501, alpha, "Compute", 3.25, 2),
+        (202501, alpha, "Storage", 0.5, 1),
+        (202501, beta, "Compute", 4.0, 1),
+    ])
+
+
+def test_reupload_refreshes_only_the_affected_month(app, upload):
+    upload("jan", "alpha,Compute,N1,,1\n")
+    upload("feb", "alpha,Compute,N1,,2\n")
+    upload("jan", "alpha,Compute,N1,,5\nalpha,Compute,N1,,5\n")
+    upload("jan", "alpha,Compute,N1,,7\n", platform="AWS")
+
+    totals = sorted((r.platform, r.period, float(r.total_cost)) for r in BillingMonthlyRollup.query.all())
+    assert totals == [("AWS", 202501, 7.0), ("GCP", 202501, 10.0), ("GCP", 202502, 2.0)]
+
+
+def test_read_endpoints_use_rollup_totals(app, client, make_user, upload):
+    _, headers = make_user()
+    upload("jan", "alpha,Compute,N1,,10\nalpha,Storage,S,,5\n")
+    upload("feb", "alpha,Compute,N1,,20\n")
+    upload("mar", "alpha,Compute,N1,,30\n")
+    project = Project.query.filter_by(project_name="alpha").one()
+    project.team = "platform"
+    db.session.commit()
+
+    report = client.get("/api/reports/grouped_cost?groupBy=team&year=2025&quarter=Q1", headers=headers).get_json()
+    assert report == [{"groupName": "platform", "totalCost": 65.0}]
+
+    details = client.get(f"/api/project/{project.id}?year=2025", headers=headers).get_json()
+    assert details["costHistory"]["jan"] == 15.0
+    assert details["costHistory"]["mar"] == 30.0
+
+    forecast = client.get(f"/api/forecasting/project/{project.id}/2025", headers=headers).get_json()
+    assert [f["month_str"] for f in forecast["forecast"]] == ["apr", "may", "jun"]
+    assert round(forecast["forecast"][0]["cost"], 2) == 36.67
@@ -0,0 +1,111 @@
+import random
+from datetime import date
+from types import SimpleNamespace
+
+from services.rule_engine import compile_rules, apply_rules_reference
+from services.rule_engine_pandas import apply_rules_frame
+
+PROJECTS = [f"proj-{i}" for i in range(8)] + ["[Charges not specific to a project]"]
+SERVICES = ["Compute Engine", "Cloud Storage", "BigQuery", "Cloud IDS", "Networking"]
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def rule(rule_type, config, start=None, end=None):
+    return SimpleNamespace(rule_type=rule_type, config=config, start_date=start, end_date=end)
+
+
+def random_date(rng):
+    if rng.random() < 0.3:
+        return None
+    return date(rng.choice([2023, 2024, 2025]), rng.randint(1, 12), rng.choice([1, 1, 15, 28]))
+
+
+def random_rules(rng, count):
+    rules = []
+    for _ in range(count):
+        kind = rng.choice(["RENAME_PROJECT", "MOVE_SERVICE", "DISTRIBUTE_COST", "UNKNOWN"])
+        if kind == "RENAME_PROJECT":
+            config = {"source_project_name": rng.choice(PROJECTS), "new_project_name": rng.choice(PROJECTS)}
+        elif kind == "MOVE_SERVICE":
+            config = {"from_project": rng.choice(PROJECTS), "to_project": rng.choice(PROJECTS),
+                      "services": rng.sample(SERVICES, rng.randint(0, 3))}
+        elif kind == "DISTRIBUTE_COST":
+            config = {"source_project": rng.choice(PROJECTS),
+                      "target_project_names": rng.sample(PROJECTS, rng.randint(0, 3))}
+        else:
+            config = {}
+        rules.append(rule(kind, config, random_date(rng), random_date(rng)))
+    return rules
+
+
+def random_items(rng, count):
+    items = []
+    for i in range(count):
+        items.append({
+            "id": i,
+            "project_id": rng.randint(1, 9),
+            "project_name": rng.choice(PROJECTS) if rng.random() > 0.02 else None,
+            "billing_year": rng.choice([2023, 2024, 2025, None]) if rng.random() < 0.05 else rng.choice([2023, 2024, 2025]),
+            "billing_month": rng.choice(MONTHS + ["bad"]) if rng.random() < 0.05 else rng.choice(MONTHS),
+            "service_description": rng.choice(SERVICES),
+            "cost": round(rng.uniform(0, 100), 2),
+        })
+    return items
+
+
+def test_compiled_rules_match_reference_on_random_data():
+    rng = random.Random(1234)
+    project_map = {name: i for i, name in enumerate(PROJECTS)}
+    for _ in range(50):
+        rules = random_rules(rng, rng.randint(1, 25))
+        items = random_items(rng, 300)
+        expected = apply_rules_reference(items, rules, project_map)
+        assert compile_rules(rules).apply(items, project_map) == expected
+
+
+def test_pandas_engine_matches_dict_engine_on_random_data():
+    rng = random.Random(4321)
+    project_map = {name: i for i, name in enumerate(PROJECTS[:-2])}
+    for _ in range(50):
+        rules = random_rules(rng, rng.randint(1, 25))
+        items = random_items(rng, 300)
+        expected = compile_rules(rules).apply(items, project_map)
+        assert apply_rules_frame(items, rules, project_map) == expected
+
+
+def test_pandas_engine_falls_back_for_mixed_records():
+    rules = [rule("RENAME_PROJECT", {"source_project_name": "a", "new_project_name": "b"})]
+    items = [{"project_name": "a", "billing_year": 2025, "billing_month": "jan"}]
+    assert apply_rules_frame(items, rules, {}) == [{"project_name": "b", "billing_year": 2025, "billing_month": "jan"}]
+
+
+def test_chained_renames_and_mid_month_start():
+    rules = [
+        rule("RENAME_PROJECT", {"source_project_name": "a", "new_project_name": "b"}),
+        rule("RENAME_PROJECT", {"source_project_name": "b", "new_project_name": "c"}, start=date(2025, 3, 2)),
+    ]
+    items = [
+        {"project_name": "a", "billing_year": 2025, "billing_month": "mar"},
+        {"project_name": "a", "billing_year": 2025, "billing_month": "apr"},
+    ]
+    result = compile_rules(rules).apply(items, {})
+    assert [i["project_name"] for i in result] == ["b", "c"]
+    assert items[0]["project_name"] == "a"
+
+
+def test_distribution_splits_cost_and_drops_items_without_targets():
+    rules = [
+        rule("DISTRIBUTE_COST", {"source_project": "shared", "target_project_names": ["x", "y"]}),
+        rule("DISTRIBUTE_COST", {"source_project": "void", "target_project_names": []}),
+    ]
+    items = [
+        {"id": 1, "project_name": "shared", "billing_year": 2025, "billing_month": "jan", "cost": 10.0},
+        {"id": 2, "project_name": "void", "billing_year": 2025, "billing_month": "jan", "cost": 5.0},
+        {"id": 3, "project_name": "other", "billing_year": 2025, "billing_month": "jan", "cost": 1.0},
+    ]
+    result = compile_rules(rules).apply(items, {"x": 7})
+    assert [(i["id"], i["project_name"], i["cost"], i.get("project_id")) for i in result] == [
+        ("dist-1-x", "x", 5.0, 7),
+        ("dist-1-y", "y", 5.0, None),
+        (3, "other", 1.0, None),
+    ]
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+WS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_importing_the_app_does_not_load_analytics_libraries():
+    probe = (
+        "import sys; import ws; "
+        "print(','.join(m for m in ('numpy', 'pandas', 'sklearn', 'pyarrow') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True, text=True, cwd=WS_DIR,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_importing_the_app_does_not_start_ingest_workers():
+    probe = (
+        "import threading; import ws; "
+        "print(','.join(t.name for t in threading.enumerate() if t.name.startswith('ingest-worker')))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=WS_DIR)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
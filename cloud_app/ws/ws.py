@@ -1,8 +1,10 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from models import db
 from config import Config
 from flask_migrate import Migrate # 👈 1. ADD THIS IMPORT
+from services.job_service import start_ingest_workers
 
 # Blueprints
 from routes.users import users_bp
@@ -43,4 +45,10 @@ app.register_blueprint(reports_bp)
 if __name__ == "__main__":
     # The db.create_all() command is removed.
     # Use 'flask db upgrade' to create/update tables.
+    # Background workers that process queued billing uploads are started by
+    # the server process only: here in the reloader's child, and under
+    # gunicorn by the hook in gunicorn.conf.py. Importing the app (e.g. for
+    # 'flask db upgrade') starts none.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_ingest_workers(app)
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file